@@ -0,0 +1,99 @@
+# Native-python libs:
+import os
+import json
+import hashlib
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+
+
+# Cache setup:
+# The circuit data derived by the DSS class (elements, connections, kV bases,
+# distances, protection zones...) is saved in a .npz file whose name has the
+# hash of the DSS files contents. Changing any of the files gives a new hash,
+# so a cache file is never used for a different circuit.
+# CACHE_VERSION must be increased whenever the cached data format changes.
+CACHE_VERSION = 2
+
+
+def dss_files(filename):
+    #This subroutine returns the given DSS file and all the files included by it
+    #through Redirect and Compile commands (recursively), in reading order.
+    #FileNotFoundError is raised in case any of the files is not found, so a
+    #cache key is never calculated from an incomplete list of files.
+
+    files = list()
+    pending = [os.path.abspath(filename)]
+    while pending:
+        file_path = pending.pop(0)
+        if file_path in files:
+            continue
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError("DSS file not found: '" + file_path + "'")
+        files.append(file_path)
+        folder = os.path.dirname(file_path)
+        with open(file_path, errors='ignore') as inFile:
+            for line in inFile:
+                #Removing the comments:
+                line = line.split('!')[0].split('//')[0].strip()
+                fields = line.split(None, 1)
+                if len(fields) == 2 and fields[0].lower() in ['redirect', 'compile']:
+                    include = fields[1].strip().strip('"\'()[]{}').strip()
+                    include = include.replace('\\', os.sep)
+                    pending.append(os.path.normpath(os.path.join(folder, include)))
+    return files
+
+
+def files_hash(files, *extra):
+    #This subroutine calculates the hash of the contents of the given files.
+    #extra - other values that change the cached data (e.g. the std unit).
+
+    the_hash = hashlib.sha256()
+    the_hash.update(str(CACHE_VERSION).encode())
+    for value in extra:
+        the_hash.update(str(value).encode())
+    for file_path in files:
+        with open(file_path, 'rb') as inFile:
+            for chunk in iter(lambda: inFile.read(1 << 20), b''):
+                the_hash.update(chunk)
+    return the_hash.hexdigest()
+
+
+def cache_filename(cache_dir, dss_filename, *extra):
+    #This subroutine returns the cache file name of the given DSS circuit.
+
+    key = files_hash(dss_files(dss_filename), *extra)
+    short_filename = os.path.splitext(os.path.basename(dss_filename))[0]
+    return os.path.join(cache_dir, short_filename + '_' + key[:20] + '.npz')
+
+
+def save_cache(file_path, data, arrays):
+    #This subroutine saves the cache file.
+    #data - dictionary with the JSON-serializable data
+    #arrays - dictionary with the NumPy arrays
+    #The file is written with a temporary name and then renamed, so parallel
+    #jobs never read an incomplete cache file.
+
+    if not os.path.exists(os.path.dirname(file_path)):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tmp_path = file_path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'wb') as outFile:
+        np.savez(outFile, __data__=np.array(json.dumps(data)), **arrays)
+    os.replace(tmp_path, file_path)
+
+
+def load_cache(file_path):
+    #This subroutine loads a cache file and returns the (data, arrays) tuple.
+    #None is returned in case the file does not exist.
+
+    if not os.path.isfile(file_path):
+        return None
+    with np.load(file_path, allow_pickle=False) as inFile:
+        data = json.loads(str(inFile['__data__']))
+        arrays = dict()
+        for key in inFile.files:
+            if key != '__data__':
+                arrays[key] = inFile[key]
+    return (data, arrays)
@@ -0,0 +1,164 @@
+# Native-python libs:
+import os
+import sys
+import importlib
+
+# Third-party libraries:
+
+# My libraries:
+
+
+# Engine setup:
+# The DSS class talks to OpenDSS through the interfaces of the COM object
+# "OpenDSSEngine.DSS" (Text, ActiveCircuit, ClearAll, Version...). Any object
+# exposing those same interfaces can be used as the DSS engine, e.g. an
+# in-process DSS C-API object (DSS-Python style) or a recorded/fake engine.
+# The engines are given to the DSS class by name:
+#   'com'        - the OpenDSS COM object (Windows only)
+#   'dss_python' - the in-process engine of DSS-Python (any system)
+#   'package.module:factory' - any other engine, created by calling the given
+#                  factory (a callable with no arguments) of an importable
+#                  module. Worker processes (e.g. the parallel fault sweep)
+#                  import the module themselves, so this is the way to use an
+#                  engine of your own in parallel runs.
+# Names can also be added with register_engine, but the worker processes only
+# know them when the registration is done on import of a module they import.
+ENGINES = dict()
+# Name of the DSS-Python module when it is imported by dss_python_engine (its
+# own name, "dss", is the name of this package):
+DSS_PYTHON_MODULE = 'dss_python_api'
+# Text commands that only read information (they don't change the circuit or
+# its solution):
+QUERY_COMMANDS = ['?', 'get', 'show', 'export', 'plot', 'help', 'about', 'visualize',
+                  'fileedit', 'dump', 'summary']
+# Solution interface methods that give a new solution:
+SOLVE_METHODS = ['Solve', 'SolveSnap', 'SolveDirect', 'SolvePflow', 'SolveNoControl',
+                 'SolvePlusControl', 'SolveAll', 'DoControlActions', 'CheckControls']
+
+
+def register_engine(name, factory):
+    #This subroutine registers a new engine factory under the given name.
+    #factory - callable with no arguments that returns a new engine object.
+
+    ENGINES[name.lower()] = factory
+
+
+def com_engine():
+    #This subroutine creates a new instance of the OpenDSS COM engine.
+    #win32com is only imported here so the other engines can be used on
+    #systems without COM support (e.g. Linux).
+
+    import win32com.client
+    return win32com.client.Dispatch("OpenDSSEngine.DSS")
+
+
+def dss_python_engine():
+    #This subroutine creates the in-process engine of DSS-Python (the
+    #"dss_python" package, with the same interfaces of the COM object). The
+    #DSS-Python module is also named "dss", so it is loaded from its installed
+    #folder under the DSS_PYTHON_MODULE name.
+
+    if DSS_PYTHON_MODULE not in sys.modules:
+        import importlib.util
+        import importlib.metadata
+        try:
+            files = importlib.metadata.distribution('dss_python').files
+        except importlib.metadata.PackageNotFoundError:
+            raise ImportError("The 'dss_python' engine needs the DSS-Python package (pip install dss_python).")
+        init_file = [file for file in files if str(file).replace('\\', '/') == 'dss/__init__.py'][0].locate()
+        spec = importlib.util.spec_from_file_location(DSS_PYTHON_MODULE, init_file,
+                                                      submodule_search_locations=[os.path.dirname(init_file)])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[DSS_PYTHON_MODULE] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[DSS_PYTHON_MODULE]
+            raise
+    return sys.modules[DSS_PYTHON_MODULE].DSS
+
+
+def import_factory(path):
+    #This subroutine returns the engine factory of the given import path
+    #('package.module:factory').
+
+    (module_name, factory_name) = path.split(':', 1)
+    factory = importlib.import_module(module_name)
+    for attr in factory_name.split('.'):
+        factory = getattr(factory, attr)
+    return factory
+
+
+def start_engine(engine='com'):
+    #This subroutine returns the engine object that will be used by the DSS class.
+    #engine - name of a registered engine, import path of an engine factory
+    #('package.module:factory', see ENGINES) or an already created engine object.
+
+    if isinstance(engine, str):
+        if ':' in engine:
+            engine = import_factory(engine)()
+        elif engine.lower() in ENGINES:
+            engine = ENGINES[engine.lower()]()
+        else:
+            raise ValueError("Unknown DSS engine: '" + engine + "'. Available engines: " + ", ".join(ENGINES) +
+                             " or 'package.module:factory'")
+    #Checking the minimum interfaces required:
+    for interface in ['Text', 'ActiveCircuit', 'ClearAll']:
+        if not hasattr(engine, interface):
+            raise TypeError("The DSS engine given has no '" + interface + "' interface.")
+    return engine
+
+
+def is_query(command):
+    #This subroutine checks if the given text command is just a query.
+
+    command = command.strip().lower()
+    if command.startswith('?'):
+        return True
+    return command.split(None, 1)[0] in QUERY_COMMANDS if command else True
+
+
+class WatchedInterface(object):
+    # Class WatchedInterface definitions:
+    # This class wraps one of the engine interfaces, calling on_change after
+    # each call of the given methods (e.g. Solution.Solve). Everything else is
+    # passed to the interface unchanged.
+
+    def __init__(self, interface, on_change, methods=None):
+        object.__setattr__(self, 'interface', interface)
+        object.__setattr__(self, 'on_change', on_change)
+        object.__setattr__(self, 'methods', set(methods) if methods is not None else set())
+
+    def __getattr__(self, attr):
+        value = getattr(self.interface, attr)
+        if attr in self.methods:
+            def watched_method(*args, **kwargs):
+                result = value(*args, **kwargs)
+                self.on_change()
+                return result
+            return watched_method
+        return value
+
+    def __setattr__(self, attr, value):
+        setattr(self.interface, attr, value)
+
+
+class WatchedText(WatchedInterface):
+    # Class WatchedText definitions:
+    # This class wraps the Text interface, calling on_change after each command
+    # that isn't a query (see QUERY_COMMANDS).
+
+    def __setattr__(self, attr, value):
+        setattr(self.interface, attr, value)
+        if attr == 'Command' and not is_query(value):
+            self.on_change()
+
+
+def is_windows():
+    #This subroutine checks if the current system is a Windows one.
+
+    return os.name == 'nt'
+
+
+register_engine('com', com_engine)
+register_engine('dss_python', dss_python_engine)
@@ -0,0 +1,344 @@
+# Native-python libs:
+import os
+import csv
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+from dss.master import DSS
+
+
+# Fault study setup:
+# Fault types (in the order of the results cube) and the number of phases of
+# the bus each one needs:
+FAULT_TYPES = ['1ph','2ph','3ph']
+FAULT_PHASES = {'1ph': 1, '2ph': 2, '3ph': 3}
+# Columns of the OpenDSS fault study report (Export Faultstudy) of each type:
+FAULTSTUDY_COLUMNS = {'1ph': '1-phase', '2ph': 'l-l', '3ph': '3-phase'}
+# Name of the fault object placed by the fault study:
+FAULT_NAME = 'fault.dss_faultstudy'
+# State of each worker process of the parallel fault sweep (see 
+# DSS_Faultanalysis.run_faults_parallel): its own DSS_Faultanalysis object and
+# the names of the shared results arrays.
+WORKER = dict()
+
+
+class DSS_Faultanalysis(DSS):
+    # Class DSS_Faultanalysis definitions:
+    # This class places 1ph, 2ph and 3ph faults in the buses of the circuit lines
+    # and gets the fault currents seen by each protection device. The bus
+    # short-circuit levels can also be obtained in one solution with the
+    # OpenDSS Faultstudy mode.
+
+    def __init__(self, dssFileName, std_unit = 'km', Dssview_disable = False, engine = 'com', cache_dir = None, lazy = False, fault_r = 0.0001):
+        #This subroutine initializes the DSS_Faultanalysis object.
+        #fault_r - resistance of the faults [ohm]
+
+        DSS.__init__(self,dssFileName,std_unit,Dssview_disable,engine,cache_dir,lazy)
+        self.fault_r = fault_r
+        self.fault_defined = False
+        #Arguments used to create the same object in the worker processes:
+        self.init_args = (dssFileName,std_unit,False,engine,cache_dir,lazy,fault_r)
+
+
+    def get_fault_buses(self):
+        #This subroutine returns the buses where the faults are placed: the buses
+        #of all lines (switches excluded), in the self.allBuses order.
+
+        line_buses = set()
+        for line in self.allLines:
+            line_buses.update(self.PD_elements['line.'+line][2])
+        return [bus for bus in self.allBuses if bus in line_buses]
+
+
+    def get_fault_devices(self):
+        #This subroutine returns the protection devices and the elements they
+        #monitor (two lists in the same order).
+
+        devices = list(self.Protect_elements)
+        monitored = list()
+        for device in devices:
+            (element_type,monitobj,switchobj) = self.Protect_elements[device][:3]
+            monitored.append(monitobj if monitobj in self.allElements else switchobj)
+        return (devices,monitored)
+
+
+    def place_fault(self,bus,fault_type):
+        #This subroutine places a fault of the given type in the bus (the fault
+        #placed before is moved). It returns False in case the bus doesn't have
+        #the phases required by the fault type.
+
+        phases = self.get_bus_phases(bus)
+        if len(phases) < FAULT_PHASES[fault_type]:
+            return False
+        if fault_type == '1ph':
+            fault = 'phases=1 bus1='+bus+'.'+str(phases[0])+' bus2='+bus+'.0'
+        elif fault_type == '2ph':
+            fault = 'phases=1 bus1='+bus+'.'+str(phases[0])+' bus2='+bus+'.'+str(phases[1])
+        else:
+            fault = 'phases=3 bus1='+bus+'.1.2.3 bus2='+bus+'.0.0.0'
+        if self.fault_defined:
+            self.dssText.Command = 'Edit '+FAULT_NAME+' '+fault+' r='+str(self.fault_r)+' enabled=yes'
+        else:
+            self.dssText.Command = 'New '+FAULT_NAME+' '+fault+' r='+str(self.fault_r)
+            self.fault_defined = True
+        return True
+
+
+    def remove_fault(self):
+        #This subroutine removes the fault placed by place_fault. The fault
+        #object is only disabled: it stays in the circuit (OpenDSS can't delete
+        #an object without compiling the circuit again) and it is moved by the
+        #next place_fault.
+
+        if self.fault_defined:
+            self.dssText.Command = 'Edit '+FAULT_NAME+' enabled=no'
+
+
+    def run_faults(self,buses=None,fault_types=FAULT_TYPES,restore=True):
+        #This subroutine places each fault type in each bus, solves the circuit
+        #and gets the fault current (greatest current of all phases and
+        #terminals) in the element monitored by each protection device.
+        #buses - buses of the faults. If None, get_fault_buses() is used.
+        #restore - if True, the fault is removed (disabled) and the pre-fault
+        #circuit is solved again at the end. If False, the last fault stays
+        #placed (one solution less, e.g. for the chunks of a parallel sweep).
+        #The results are stored in:
+        #   self.fault_buses      - buses of the faults (n_buses)
+        #   self.fault_kvbases    - kV base of each fault bus (NaN if unknown)
+        #   self.fault_types      - types of the faults (n_types)
+        #   self.fault_devices    - protection devices (n_devices)
+        #   self.fault_currents   - (n_buses x n_types x n_devices) array [A],
+        #                           NaN for the faults not possible in a bus
+        #   self.fault_placed     - (n_buses x n_types) array, True for the 
+        #                           faults placed (possible in the bus)
+        #   self.fault_converged  - (n_buses x n_types) array, True when the
+        #                           solution of the fault converged
+        #The fault_currents array is returned.
+
+        if buses is None:
+            buses = self.get_fault_buses()
+        (devices,monitored) = self.get_fault_devices()
+        fault_currents = np.full((len(buses),len(fault_types),len(devices)),np.nan)
+        fault_placed = np.zeros((len(buses),len(fault_types)),dtype=bool)
+        fault_converged = np.zeros((len(buses),len(fault_types)),dtype=bool)
+        #The kV bases are obtained before any fault is placed (lazy init):
+        self.run_stage('kvbases')
+        self.run_stage('vbases')
+        for i,bus in enumerate(buses):
+            for k,fault_type in enumerate(fault_types):
+                fault_placed[i,k] = self.place_fault(bus,fault_type)
+                if not fault_placed[i,k]:
+                    continue
+                self.solve()
+                fault_converged[i,k] = self.get_snapshot().converged
+                if len(devices) > 0:
+                    fault_currents[i,k] = self.get_ICCcurrents(monitored)
+        #Back to the pre-fault condition:
+        if restore:
+            self.remove_fault()
+            self.solve()
+        self.fault_buses = list(buses)
+        self.fault_kvbases = np.array([self.bus_kvbases.get(bus,np.nan) for bus in buses],dtype=float)
+        self.fault_types = list(fault_types)
+        self.fault_devices = devices
+        self.fault_currents = fault_currents
+        self.fault_placed = fault_placed
+        self.fault_converged = fault_converged
+        return fault_currents
+
+
+    def run_faultstudy(self):
+        #This subroutine gets the short-circuit currents [A] of all buses with a
+        #single solution in the OpenDSS Faultstudy mode.
+        #The results are stored in self.bus_isc: (n_Buses x n_types) array in the
+        #self.allBuses and FAULT_TYPES orders (NaN for the values not given).
+        #The bus_isc array is returned (None in case the report is not found).
+
+        self.dssText.Command = "Set mode=Faultstudy"
+        self.solve()
+        self.dssText.Command = "Export Faultstudy"
+        report_file = self.dssText.Result
+        bus_isc = None
+        if report_file != '' and os.path.isfile(report_file):
+            bus_isc = self.read_faultstudy(report_file)
+        else:
+            print('\nFault study report not found!')
+        #Back to the snapshot mode:
+        self.dssText.Command = "Set mode=Snapshot"
+        self.solve()
+        self.bus_isc = bus_isc
+        return bus_isc
+
+
+    def read_faultstudy(self,report_file):
+        #This subroutine reads the fault study report exported by OpenDSS and
+        #returns the (n_Buses x n_types) short-circuit currents array.
+
+        bus_isc = np.full((self.n_Buses,len(FAULT_TYPES)),np.nan)
+        with open(report_file,errors='ignore') as inFile:
+            rows = csv.reader(inFile)
+            header = [field.strip().lower() for field in next(rows)]
+            columns = [header.index(FAULTSTUDY_COLUMNS[fault_type]) if FAULTSTUDY_COLUMNS[fault_type] in header else -1 for fault_type in FAULT_TYPES]
+            for row in rows:
+                if len(row) == 0:
+                    continue
+                bus = row[0].strip().strip('"').lower()
+                if bus not in self.bus_index:
+                    continue
+                for k,column in enumerate(columns):
+                    if 0 <= column < len(row) and row[column].strip() != '':
+                        bus_isc[self.bus_index[bus],k] = float(row[column])
+        return bus_isc
+
+
+    def get_fault_actiontimes(self,fault_currents=None):
+        #This subroutine calculates the action time [ms] of each protection device
+        #for the fault currents (the fastest of its TCC curves, see 
+        #get_protactiontimes). The TCC models must be built (buid_TCCmodels).
+        #fault_currents - (n_buses x n_types x n_devices) array. If None, 
+        #self.fault_currents is used.
+        #It returns an array with the same shape (NaN for the faults not
+        #possible, infinite for the devices that don't act).
+
+        if fault_currents is None:
+            fault_currents = self.fault_currents
+        Icc = fault_currents.reshape(-1,fault_currents.shape[-1])
+        action_time = self.get_devices_actiontimes(self.fault_devices,np.nan_to_num(Icc))
+        action_time[np.isnan(Icc)] = np.nan
+        self.fault_actiontimes = action_time.reshape(fault_currents.shape)
+        return self.fault_actiontimes
+
+
+    def get_devices_actiontimes(self,devices,Icc,curve_types=None):
+        #This subroutine calculates the action time [ms] of each protection device
+        #(the fastest of its TCC curves) with a single call of get_protactiontimes
+        #for all the devices curves.
+        #devices - list of protection devices (n_devices)
+        #Icc - (n_values x n_devices) array with the current seen by each device
+        #curve_types - curve types considered (e.g. ['phasedelayed']). If None,
+        #all of them are considered.
+        #The devices without TCC models get infinite times.
+
+        Icc = np.asarray(Icc,dtype=float).reshape(-1,len(devices))
+        curves = list()
+        owner = list()
+        for j,device in enumerate(devices):
+            for curve in self.Protect_elements[device][3]:
+                curve_type = curve[0].lower()
+                if device+' '+curve_type in self.TCC_models and (curve_types is None or curve_type in curve_types):
+                    curves.append((device,curve_type))
+                    owner.append(j)
+        action_time = np.full(Icc.shape,np.inf)
+        if len(curves) > 0:
+            owner = np.array(owner,dtype=np.int64)
+            times = self.get_protactiontimes(curves,Icc[:,owner])
+            #Fastest curve of each device (the curves of a device are together):
+            starts = np.flatnonzero(np.append(True,np.diff(owner) != 0))
+            action_time[:,owner[starts]] = np.minimum.reduceat(times,starts,axis=1)
+        return action_time
+
+
+    def run_faults_parallel(self,n_workers=None,buses=None,fault_types=FAULT_TYPES,chunk_size=None):
+        #This subroutine runs the same fault sweep of run_faults in parallel. 
+        #Each worker process creates its own engine and DSS_Faultanalysis object
+        #once and runs the faults of the chunks of buses it receives. The fault
+        #currents are written directly in shared memory arrays.
+        #n_workers - number of worker processes (default: number of CPUs)
+        #chunk_size - number of buses of each chunk (default: 4 chunks per worker)
+        #The engine must be given by name (see dss.engine) and the use of a 
+        #cache_dir is recommended, so the workers don't rebuild the circuit data.
+        #The throughput of each worker is stored in self.fault_sweep_stats.
+        #The fault_currents array is returned.
+
+        if not isinstance(self.init_args[3],str):
+            raise ValueError("The parallel fault sweep needs the DSS engine given by name or 'package.module:factory' import path (see dss.engine).")
+        if buses is None:
+            buses = self.get_fault_buses()
+        (devices,monitored) = self.get_fault_devices()
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        n_workers = max(1,min(n_workers,len(buses)))
+        if chunk_size is None:
+            chunk_size = max(1,int(np.ceil(len(buses)/(4*n_workers))))
+        chunks = [list(range(i,min(i+chunk_size,len(buses)))) for i in range(0,len(buses),chunk_size)]
+        #Shared results arrays:
+        shapes = {'currents': ((len(buses),len(fault_types),len(devices)),np.float64),
+                  'placed': ((len(buses),len(fault_types)),np.bool_),
+                  'converged': ((len(buses),len(fault_types)),np.bool_)}
+        shms = dict()
+        arrays = dict()
+        start_time = time.perf_counter()
+        try:
+            for key in shapes:
+                (shape,dtype) = shapes[key]
+                shms[key] = shared_memory.SharedMemory(create=True,size=max(1,int(np.prod(shape))*np.dtype(dtype).itemsize))
+                arrays[key] = np.ndarray(shape,dtype=dtype,buffer=shms[key].buf)
+            arrays['currents'][:] = np.nan
+            arrays['placed'][:] = False
+            arrays['converged'][:] = False
+            shm_info = dict((key,(shms[key].name,shapes[key][0],shapes[key][1])) for key in shapes)
+            with multiprocessing.Pool(n_workers,initializer=init_worker,initargs=(self.init_args,shm_info,buses,list(fault_types))) as pool:
+                stats = dict()
+                for (pid,n_faults,busy_time) in pool.imap_unordered(run_worker_chunk,chunks):
+                    (total_faults,total_time) = stats.get(pid,(0,0.0))
+                    stats[pid] = (total_faults+n_faults,total_time+busy_time)
+            self.fault_currents = arrays['currents'].copy()
+            self.fault_placed = arrays['placed'].copy()
+            self.fault_converged = arrays['converged'].copy()
+        finally:
+            arrays.clear()
+            for key in shms:
+                shms[key].close()
+                shms[key].unlink()
+        wall_time = time.perf_counter() - start_time
+        self.fault_buses = list(buses)
+        self.fault_kvbases = np.array([self.bus_kvbases.get(bus,np.nan) for bus in buses],dtype=float)
+        self.fault_types = list(fault_types)
+        self.fault_devices = devices
+        #Throughput report:
+        n_faults = sum(stats[pid][0] for pid in stats)
+        self.fault_sweep_stats = {'workers': stats,'n_faults': n_faults,'wall_time': wall_time}
+        print('\nParallel fault sweep:',n_faults,'faults in',round(wall_time,2),'[s] with',n_workers,'workers ('+str(round(n_faults/max(wall_time,1e-9),1))+' faults/s)')
+        for pid in stats:
+            (worker_faults,busy_time) = stats[pid]
+            print('Worker',pid,':',worker_faults,'faults,',round(worker_faults/max(busy_time,1e-9),1),'faults/s')
+        return self.fault_currents
+
+
+def init_worker(init_args,shm_info,buses,fault_types):
+    #This subroutine initializes a worker process of the parallel fault sweep:
+    #it creates the DSS_Faultanalysis object (and its engine). The shared
+    #results arrays are attached by each chunk (see run_worker_chunk).
+
+    WORKER['dss'] = DSS_Faultanalysis(*init_args)
+    WORKER['buses'] = buses
+    WORKER['fault_types'] = fault_types
+    WORKER['shm_info'] = shm_info
+
+
+def run_worker_chunk(bus_ids):
+    #This subroutine runs the faults of the given buses (indexes in the buses
+    #list of the sweep) in a worker process and writes the results in the shared
+    #arrays, whose handles are closed before returning. The pre-fault circuit
+    #isn't solved again after the chunk (the next chunk moves the fault).
+    #It returns the (process id, n° of faults, time [s]) tuple.
+
+    start_time = time.perf_counter()
+    dss = WORKER['dss']
+    dss.run_faults([WORKER['buses'][i] for i in bus_ids],WORKER['fault_types'],restore=False)
+    results = {'currents': dss.fault_currents,'placed': dss.fault_placed,'converged': dss.fault_converged}
+    for key in WORKER['shm_info']:
+        (name,shape,dtype) = WORKER['shm_info'][key]
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            array = np.ndarray(shape,dtype=dtype,buffer=shm.buf)
+            array[bus_ids] = results[key]
+            del array
+        finally:
+            shm.close()
+    return (os.getpid(),int(np.count_nonzero(dss.fault_placed)),time.perf_counter()-start_time)
@@ -0,0 +1,254 @@
+# Native-python libs:
+import os
+import math
+import time
+import multiprocessing
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+from dss.master import DSS
+
+
+# Hosting capacity setup:
+# Name of the DG placed by the sweep (a generator with unity power factor):
+HC_DG_NAME = 'generator.dss_hostingcap'
+# Metrics of each bus (columns of the results array):
+#   'hc_kw'       - hosting capacity [kW] (largest DG size with no violation)
+#   'vmax_pu'     - maximum node voltage [pu] with the DG of hc_kw
+#   'vmin_pu'     - minimum node voltage [pu] with the DG of hc_kw
+#   'loading_max' - maximum loading [%] of the lines with the DG of hc_kw
+#   'limit'       - limit that stopped the search (see HC_LIMITS)
+#   'n_solves'    - number of solutions of the bus search
+#   'time'        - time [s] of the bus search
+HC_METRICS = ['hc_kw','vmax_pu','vmin_pu','loading_max','limit','n_solves','time']
+# Limits checked in each solution (code of the 'limit' metric): the search
+# ends with 'none' when the largest size tested has no violation.
+HC_LIMITS = ['none','overvoltage','undervoltage','thermal','not converged']
+# State of each worker process of the parallel sweep (see
+# DSS_hostingcapacity.run_hostingcapacity): its own DSS_hostingcapacity object
+# and the sweep settings.
+WORKER = dict()
+
+
+class DSS_hostingcapacity(DSS):
+    # Class DSS_hostingcapacity definitions:
+    # This class calculates the DG hosting capacity of the circuit buses. One DG
+    # is defined once and then moved and resized with Edit commands between the
+    # solutions (the circuit is never compiled again). The size of each bus is
+    # found by a bisection search between zero and the largest size tested.
+
+    def __init__(self, dssFileName, std_unit = 'km', Dssview_disable = False, engine = 'com', cache_dir = None, lazy = False):
+        #This subroutine initializes the DSS_hostingcapacity object.
+
+        DSS.__init__(self,dssFileName,std_unit,Dssview_disable,engine,cache_dir,lazy)
+        self.hc_dg_defined = False
+        self.hc_norm_amps = None
+        #Arguments used to create the same object in the worker processes:
+        self.init_args = (dssFileName,std_unit,False,engine,cache_dir,lazy)
+
+
+    def get_hc_buses(self):
+        #This subroutine returns the candidate buses of the sweep: all buses with
+        #a kV base (self.allBuses order), except the substation bus.
+
+        source_bus = self.subs[2][0]
+        return [bus for bus in self.allBuses if bus in self.bus_kvbases and bus != source_bus]
+
+
+    def place_dg(self,bus,kw):
+        #This subroutine places the DG of the sweep in the bus with the given
+        #size [kW] (the DG placed before is moved). It returns False in case the
+        #bus doesn't have phases A, B or C.
+
+        phases = self.get_bus_phases(bus)
+        if len(phases) == 0:
+            return False
+        #kV of the DG: line-to-neutral for single-phase buses and line-to-line
+        #for the others (self.bus_kvbases has the line-to-neutral values):
+        kv = self.bus_kvbases[bus]*(math.sqrt(3) if len(phases) > 1 else 1)
+        dg = ('phases='+str(len(phases))+' bus1='+bus+'.'+'.'.join(str(phase) for phase in phases)+
+              ' kv='+repr(float(kv))+' kW='+repr(float(kw)))
+        if self.hc_dg_defined:
+            self.dssText.Command = 'Edit '+HC_DG_NAME+' '+dg+' enabled=yes'
+        else:
+            self.dssText.Command = 'New '+HC_DG_NAME+' '+dg+' pf=1 model=1'
+            self.hc_dg_defined = True
+        return True
+
+
+    def set_dg_size(self,kw):
+        #This subroutine changes the size [kW] of the DG of the sweep.
+
+        self.dssText.Command = 'Edit '+HC_DG_NAME+' kW='+repr(float(kw))
+
+
+    def remove_dg(self):
+        #This subroutine removes the DG placed by place_dg.
+
+        if self.hc_dg_defined:
+            self.dssText.Command = 'Edit '+HC_DG_NAME+' enabled=no'
+
+
+    def check_limits(self,v_max,v_min,loading_limit):
+        #This subroutine solves the circuit and checks the limits (v_min and
+        #loading_limit aren't checked when they are None). It returns the code of
+        #the first limit violated (see HC_LIMITS, 0 if none) and the (vmax_pu,
+        #vmin_pu, loading_max) values of the solution.
+
+        self.solve()
+        snapshot = self.get_snapshot()
+        if not snapshot.converged:
+            return (HC_LIMITS.index('not converged'),(np.nan,np.nan,np.nan))
+        vmag_pu = snapshot.node_vmag[self.node_abc]/self.node_vbase[self.node_abc]
+        vmag_pu = vmag_pu[vmag_pu > 0]
+        vmax = float(np.max(vmag_pu)) if len(vmag_pu) > 0 else np.nan
+        vmin = float(np.min(vmag_pu)) if len(vmag_pu) > 0 else np.nan
+        #Normal ampacity of the lines (read once):
+        if self.hc_norm_amps is None:
+            self.hc_lines = ['line.'+line for line in self.allLines]
+            self.hc_norm_amps = np.zeros(len(self.hc_lines))
+            for i,line in enumerate(self.hc_lines):
+                self.dssCircuit.SetActiveElement(line)
+                self.hc_norm_amps[i] = self.dssCktElement.NormalAmps
+            self.hc_norm_amps[self.hc_norm_amps <= 0] = np.nan
+        loading_max = np.nan
+        if loading_limit is not None and len(self.hc_lines) > 0:
+            loading = 100*self.get_ICCcurrents(self.hc_lines)/self.hc_norm_amps
+            if np.any(~np.isnan(loading)):
+                loading_max = float(np.nanmax(loading))
+        values = (vmax,vmin,loading_max)
+        if vmax > v_max:
+            return (HC_LIMITS.index('overvoltage'),values)
+        if v_min is not None and vmin < v_min:
+            return (HC_LIMITS.index('undervoltage'),values)
+        if loading_limit is not None and loading_max > loading_limit:
+            return (HC_LIMITS.index('thermal'),values)
+        return (0,values)
+
+
+    def search_bus(self,bus,max_kw,tol_kw,v_max,v_min,loading_limit):
+        #This subroutine finds the hosting capacity of one bus. The largest size
+        #is tested first and, if it violates a limit, the size is bisected until
+        #the interval is smaller than tol_kw. It returns the row of the bus in
+        #the results array (see HC_METRICS).
+
+        start_time = time.perf_counter()
+        row = np.full(len(HC_METRICS),np.nan)
+        if not self.place_dg(bus,max_kw):
+            return row
+        n_solves = 1
+        (limit,values) = self.check_limits(v_max,v_min,loading_limit)
+        (lo,hi) = (0.0,float(max_kw))
+        if limit == 0:
+            lo = hi
+            lo_values = values
+        else:
+            lo_values = None
+            while hi - lo > tol_kw:
+                mid = (lo + hi)/2
+                self.set_dg_size(mid)
+                n_solves += 1
+                (mid_limit,mid_values) = self.check_limits(v_max,v_min,loading_limit)
+                if mid_limit == 0:
+                    (lo,lo_values) = (mid,mid_values)
+                else:
+                    (hi,limit) = (mid,mid_limit)
+            #Values of the circuit with no DG (no size without violation found):
+            if lo_values is None:
+                self.set_dg_size(0)
+                n_solves += 1
+                lo_values = self.check_limits(v_max,v_min,loading_limit)[1]
+        self.remove_dg()
+        row[:] = [lo,lo_values[0],lo_values[1],lo_values[2],limit,n_solves,time.perf_counter()-start_time]
+        return row
+
+
+    def run_hc_buses(self,buses,max_kw,tol_kw,v_max,v_min,loading_limit):
+        #This subroutine runs the search of each given bus and returns the
+        #(n_buses x n_metrics) results array.
+
+        results = np.full((len(buses),len(HC_METRICS)),np.nan)
+        for i,bus in enumerate(buses):
+            results[i] = self.search_bus(bus,max_kw,tol_kw,v_max,v_min,loading_limit)
+        #Back to the circuit without the DG:
+        self.solve()
+        return results
+
+
+    def run_hostingcapacity(self,buses=None,max_kw=5000.0,tol_kw=None,v_max=1.05,v_min=None,loading_limit=100.0,
+                            n_workers=1,chunk_size=None):
+        #This subroutine calculates the hosting capacity of the buses.
+        #buses - candidate buses. If None, get_hc_buses() is used.
+        #max_kw - largest DG size tested [kW]
+        #tol_kw - size tolerance of the bisection [kW] (default: 1% of max_kw)
+        #v_max - overvoltage limit [pu]
+        #v_min - undervoltage limit [pu] (None: not checked)
+        #loading_limit - thermal limit [%] of the lines (None: not checked)
+        #n_workers - number of worker processes (1: the buses are searched by
+        #this object; None: number of CPUs). The engine must be given by name
+        #(see dss.engine) to use more than one worker.
+        #chunk_size - number of buses of each chunk (default: 4 chunks per worker)
+        #The results are stored in:
+        #   self.hc_buses    - buses searched (n_buses)
+        #   self.hc_results  - (n_buses x n_metrics) array (see HC_METRICS), NaN
+        #                      for the buses without phases A, B or C
+        #   self.hc_stats    - timing of the sweep (wall time, solutions and
+        #                      buses/time of each worker)
+        #The hc_results array is returned.
+
+        if buses is None:
+            buses = self.get_hc_buses()
+        if tol_kw is None:
+            tol_kw = max_kw/100
+        settings = (max_kw,tol_kw,v_max,v_min,loading_limit)
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        n_workers = max(1,min(n_workers,len(buses)))
+        if n_workers > 1 and not isinstance(self.init_args[3],str):
+            raise ValueError("The parallel hosting capacity sweep needs the DSS engine given by name or 'package.module:factory' import path (see dss.engine).")
+        if chunk_size is None:
+            chunk_size = max(1,int(np.ceil(len(buses)/(4*n_workers))))
+        chunks = [list(range(i,min(i+chunk_size,len(buses)))) for i in range(0,len(buses),chunk_size)]
+        self.hc_results = np.full((len(buses),len(HC_METRICS)),np.nan)
+        stats = dict()
+        start_time = time.perf_counter()
+        if n_workers == 1:
+            self.hc_results[:] = self.run_hc_buses(buses,*settings)
+            stats[os.getpid()] = (len(buses),time.perf_counter()-start_time)
+        else:
+            with multiprocessing.Pool(n_workers,initializer=init_hc_worker,initargs=(self.init_args,buses,settings)) as pool:
+                for (bus_ids,results,pid,busy_time) in pool.imap_unordered(run_hc_chunk,chunks):
+                    self.hc_results[bus_ids] = results
+                    (total_buses,total_time) = stats.get(pid,(0,0.0))
+                    stats[pid] = (total_buses+len(bus_ids),total_time+busy_time)
+        wall_time = time.perf_counter() - start_time
+        self.hc_buses = list(buses)
+        #Timing report:
+        n_solves = int(np.nansum(self.hc_results[:,HC_METRICS.index('n_solves')]))
+        self.hc_stats = {'workers': stats,'n_buses': len(buses),'n_solves': n_solves,'wall_time': wall_time}
+        print('\nHosting capacity sweep:',len(buses),'buses,',n_solves,'solutions in',round(wall_time,2),'[s] with',n_workers,'workers ('+str(round(n_solves/max(wall_time,1e-9),1))+' solutions/s)')
+        for pid in stats:
+            (worker_buses,busy_time) = stats[pid]
+            print('Worker',pid,':',worker_buses,'buses,',round(worker_buses/max(busy_time,1e-9),2),'buses/s')
+        return self.hc_results
+
+
+def init_hc_worker(init_args,buses,settings):
+    #This subroutine initializes a worker process of the parallel hosting
+    #capacity sweep: it creates the DSS_hostingcapacity object (and its engine).
+
+    WORKER['dss'] = DSS_hostingcapacity(*init_args)
+    WORKER['buses'] = buses
+    WORKER['settings'] = settings
+
+
+def run_hc_chunk(bus_ids):
+    #This subroutine searches the given buses (indexes in the buses list of the
+    #sweep) in a worker process. It returns the (bus ids, results, process id,
+    #time [s]) tuple.
+
+    start_time = time.perf_counter()
+    results = WORKER['dss'].run_hc_buses([WORKER['buses'][i] for i in bus_ids],*WORKER['settings'])
+    return (bus_ids,results,os.getpid(),time.perf_counter()-start_time)
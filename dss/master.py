@@ -1,8 +1,7 @@
 # Native-python libs:
 import os
-import pylab
 import math
-import win32com.client
+import json
 
 # Third-party libraries:
 import matplotlib.pyplot as plt
@@ -11,10 +10,71 @@ import numpy as np
 
 # My libraries:
 from dss import aux_lib as aux                      
+from dss import engine as dss_engine
+from dss import cache as dss_cache
+from dss.topology import Topology
+from dss.snapshot import SolutionSnapshot
+from dss import tcc
 
 
 # Basic setup:
 plt.rcParams.update({'font.size': 14, 'figure.figsize': (10,8)})
+# Line length units (the position in the list is the OpenDSS unit code) and
+# the factors to convert each one to km:
+LINE_UNITS = ['none','mi','kft','km','m','ft','in','cm']
+LINE_UNITS_TO_KM = np.array([0.0, 1.6093, 0.3048, 1, 1/1000, 0.3048/1000, 0.0254/1000, 1/100000])
+# Circuit information derived by init_system that is saved in the cache files:
+CACHE_ATTRS = ['allLines','allSwitches','disabled_lines','feeder_length','n_Lines',
+               'PD_elements','n_PDs','PC_elements','n_PCs','Protect_elements','DG_Protect',
+               'Other_elements','subs','Bus_connect','bus_kvbases','HV_buses','MV_buses',
+               'LV_buses','allTransfs','allTransfskva','HV_lines','MV_lines','LV_lines',
+               'length_HV','length_MV','length_LV','n_HVLines','n_MVLines','n_LVLines',
+               'bus_dist2subs','Protect_interrupt','allTransfs_sec_buses','psystem','freq',
+               'cycle','allDGs','n_DGs','DG_power']
+# Init stages of the circuit information (see DSS.run_stage):
+# stage: (method, attributes created, stages it depends on)
+INIT_STAGES = {'lines': ('get_linesinfo',['allLines','allSwitches','feeder_length','n_Lines','lines_table'],[]),
+               'elements': ('get_elementsinfo',['PD_elements','n_PDs','PC_elements','n_PCs','Protect_elements',
+                                                'DG_Protect','Other_elements','subs'],['lines']),
+               'busconnect': ('get_busconnect',['Bus_connect','topology'],['elements']),
+               'kvbases': ('get_kvbases',['bus_kvbases','HV_buses','MV_buses','LV_buses','allTransfs',
+                                          'allTransfskva','HV_lines','MV_lines','LV_lines','disabled_lines',
+                                          'length_HV','length_MV','length_LV','n_HVLines','n_MVLines',
+                                          'n_LVLines'],['lines','busconnect']),
+               'dist2subs': ('calc_bus_dist2subs',['bus_dist2subs'],['lines','busconnect']),
+               'interrupt': ('get_busesinterrupted',['Protect_interrupt'],['busconnect']),
+               'secnets': ('get_Transfs_sec_nets',['allTransfs_sec_buses'],['kvbases']),
+               'systinfo': ('get_systinfo',['psystem','freq','cycle'],['elements']),
+               'dginfo': ('get_dginfo',['allDGs','n_DGs','DG_power'],['elements']),
+               'vbases': ('get_node_vbases',['bus_vbase','node_vbase'],['kvbases'])}
+STAGE_OF_ATTR = dict()
+for stage in INIT_STAGES:
+    for attr in INIT_STAGES[stage][1]:
+        STAGE_OF_ATTR[attr] = stage
+# Init stages that depend on the open/closed state of the PD-elements (see
+# DSS.set_element_open): the secondary networks, the distances to the 
+# substation and the protection zones. Bus_connect keeps all the connections
+# (enabled and disabled) and the kV bases walks go through the open elements
+# too, so they aren't built again after an edit (a de-energized bus keeps its
+# kV base and its voltage is 0 pu).
+SWITCHING_STAGES = ['secnets','dist2subs','interrupt']
+# Circuit edits applied by DSS.apply_edits (action: method):
+EDIT_ACTIONS = {'open': 'open_switch','close': 'close_switch','load_kw': 'set_load_kw',
+                'tap': 'set_tap','enable': 'enable_element','disable': 'disable_element'}
+# Properties read in bulk from each element class by get_elementsinfo (the
+# lines are read by get_linesinfo, see get_classdata):
+ELEMENT_PROPS = {'line': ['switch','length','units'], 'capacitor': [], 'reactor': [], 'transformer': [],
+                 'generator': [], 'load': [], 'pvsystem': [], 'storage': [], 'indmach012': [],
+                 'fuse': ['MonitoredObj','SwitchedObj','FuseCurve','RatedCurrent','Delay'],
+                 'recloser': ['MonitoredObj','SwitchedObj','Delay','PhaseFast','PhaseTrip',
+                              'TDPhFast','PhaseDelayed','TDPhDelayed','RecloseIntervals'],
+                 'relay': ['type','MonitoredObj','SwitchedObj','Delay','Phasecurve','PhaseTrip',
+                           'TDPhase','RecloseIntervals','undervoltcurve','overvoltcurve','kvbase'],
+                 'vsource': []}
+# Options of the JSON export of a whole class by the engines that have it
+# (ActiveClass.ToJSON of the DSS C-API engines, e.g. DSS-Python): all the
+# properties, including the ones with default values (DSSJSONFlags.Full).
+CLASS_JSON_OPTIONS = 1
 
 
 class DSS(object):
@@ -23,28 +83,47 @@ class DSS(object):
     # information. It gives the support for other classes to inherit from it 
     # and perform more complex tasks.
 
-    def __init__(self, dssFileName, std_unit = 'km', Dssview_disable = False):
+    def __init__(self, dssFileName, std_unit = 'km', Dssview_disable = False, engine = 'com', cache_dir = None, lazy = False):
         #This subroutine initializes the DSS object
+        #engine - name of a registered engine ('com', 'dss_python'...), import
+        #path of an engine factory ('package.module:factory', see dss.engine)
+        #or an engine object with the same interfaces of the OpenDSS COM object.
+        #cache_dir - folder of the circuit data cache files (see dss.cache).
+        #If None, the cache is not used.
+        #lazy - if True, the circuit information (lines, elements, kV bases, 
+        #distances...) is only obtained when it is accessed for the first time.
+        #By default all of it is obtained during the initialization.
 
         #Getting the DSPA current working directory:
         self.DSS_cwd =  os.getcwd()
-        self.DSS_LVRT_filename = self.DSS_cwd + '\__LVRTcurves__\LVRT_Curve.dss'
-        self.pv_irradtempeff_file = self.DSS_cwd + '\__timeconditions\irrad_standard_dss.dss'
-        #File name and file path related variables:
-        self.filename = dssFileName
-        self.filepath = os.path.dirname(dssFileName)
+        self.DSS_LVRT_filename = os.path.join(self.DSS_cwd,'__LVRTcurves__','LVRT_Curve.dss')
+        self.pv_irradtempeff_file = os.path.join(self.DSS_cwd,'__timeconditions','irrad_standard_dss.dss')
+        #File name and file path related variables (absolute paths, since the
+        #OpenDSS Compile command changes the working directory):
+        self.filename = os.path.abspath(dssFileName)
+        self.filepath = os.path.dirname(self.filename)
         self.short_filename = self.filename[len(self.filepath)+1:-4]        
         #Closing the DSSView if required:
-        if Dssview_disable == True:
+        if Dssview_disable == True and dss_engine.is_windows():
             os.system("TASKKILL /F /IM DSSView.exe")
             
         #Create a new instance of the DSS
-        self.dssObj = win32com.client.Dispatch("OpenDSSEngine.DSS")           
+        self.dssObj = dss_engine.start_engine(engine)
+        #Solution counter (used to know when the stored results are old). It is
+        #increased by the Text, Circuit, CktElement and Solution interfaces 
+        #below on every command or call that may change the solution. Changes
+        #made through other interfaces must call self.circuit_changed().
+        self.solution_version = 0
+        self.snapshot = None
+        #Analytic inverse-time curves of the protection devices (see 
+        #config_TCCcurves):
+        self.TCC_analytic = dict()
+        self.TCC_analytic_curves = dict()
         #Assign a variable to some important interfaces for easier access:
-        self.dssText = self.dssObj.Text
-        self.dssCircuit = self.dssObj.ActiveCircuit
-        self.dssCktElement = self.dssCircuit.ActiveCktElement
-        self.dssSolution = self.dssCircuit.Solution
+        self.dssText = dss_engine.WatchedText(self.dssObj.Text,self.circuit_changed)
+        self.dssCircuit = dss_engine.WatchedInterface(self.dssObj.ActiveCircuit,self.circuit_changed,['Enable','Disable'])
+        self.dssCktElement = dss_engine.WatchedInterface(self.dssCircuit.ActiveCktElement,self.circuit_changed,['Open','Close'])
+        self.dssSolution = dss_engine.WatchedInterface(self.dssCircuit.Solution,self.circuit_changed,dss_engine.SOLVE_METHODS)
         self.dssCtrlQueue = self.dssCircuit.CtrlQueue
         self.dssBus = self.dssCircuit.ActiveBus
         self.dssMonitors = self.dssCircuit.Monitors
@@ -69,6 +148,12 @@ class DSS(object):
         self.std_unit_len = std_unit
         #"Infinite" resistance value:
         self.Rinf = 1000000000
+        #Circuit data cache:
+        self.cache_dir = os.path.abspath(cache_dir) if cache_dir is not None else None
+        self.cache_file = None
+        self.lazy = lazy
+        #PD-elements opened or disabled by the circuit edits (see apply_edits):
+        self.open_elements = set()
 
         #Innitializing the system:
         self.init_system()
@@ -77,6 +162,30 @@ class DSS(object):
         print("\nDSS started successfully!")
 
 
+    def solve(self):
+        # This subroutine solves the circuit. The solution counter is updated by
+        # the Solution interface, so the results stored from previous solutions
+        # are not used anymore.
+
+        self.dssSolution.Solve()
+
+
+    def circuit_changed(self):
+        # This subroutine updates the solution counter after a change in the
+        # circuit or a new solution.
+
+        self.solution_version += 1
+
+
+    def get_snapshot(self):
+        # This subroutine returns the results of the current solution (see
+        # dss.snapshot). They are read from the engine once for each solution.
+
+        if self.snapshot is None or not self.snapshot.is_valid():
+            self.snapshot = SolutionSnapshot(self)
+        return self.snapshot
+
+
     def dss_version(self):
         # This subroutine prints the OpenDSS program version.
         
@@ -99,7 +208,7 @@ class DSS(object):
             self.dssText.Command = "calcv"
             self.dssText.Command = "Set mode=Snapshot"
             self.dssText.Command = "set controlmode=Time"
-            self.dssSolution.Solve()
+            self.solve()
 
             #IMPORTANT CIRCUIT Information:
             #The names of all circuit elements, such as buses, nodes and lines
@@ -122,91 +231,30 @@ class DSS(object):
             for node in self.dssCircuit.AllNodeNames:
                 self.allNodes.append(node.lower())
             self.n_Nodes = len(self.allNodes)
-            #Lines and switches names:
-            #All the switches are expected to be modeled as line-switches.
-            #The Line elements (current-carrying lines or "real lines") will be 
-            #separated from the switches. The swithces don't count for the  
-            #circuit length, and are expected to be defined as very short lines 
-            #(Recommended 1 meter long). 
-            #The short-circuits won't be applied in them, just in ordinary lines.
-            self.allLines = dict()
-            self.allSwitches = list()
-            self.disabled_lines = dict()
-            self.feeder_length = 0
-            self.n_Lines = 0
-            #Getting the lines information:
-            self.get_linesinfo()
-
-            #Systematic elements info:
-            #Dictionary with all PD-Elements bus connections info:
-            self.PD_elements = dict()
-            self.n_PDs = 0
-            #Dictionary with all PC-Elements bus connections info:
-            self.PC_elements = dict()
-            self.n_PCs = 0
-            #Dictionary with all Protection Elements info:
-            self.Protect_elements = dict()
-            #Dictionary with all DG anti-islanding protection elements info:
-            self.DG_Protect = dict()
-            #Dictionary with all other Elements info:
-            self.Other_elements = dict()
-            #Substation bus information:
-            self.subs = tuple()            
-            #Getting the elements info:
-            self.get_elementsinfo()
-            #Buses connections dictionary:
-            self.Bus_connect = dict()
-            #Getting all the buses connections info:
-            #self.Bus_connect must contain all the buses connections (enabled and disabled).
-            self.get_busconnect()
-            
-            #Getting the voltage base values for each bus and classifying the 
-            #lines as low, medium or high-voltage lines:
-            #Voltage base kv values for each bus:
-            self.bus_kvbases = dict() 
-            #HV, MV and LV lines:
-            self.HV_buses = list()
-            self.MV_buses = list()
-            self.LV_buses = list()
-            #Transformers voltages dictionary:
-            self.allTransfs = dict()
-            self.allTransfskva = dict()
-            #HV, MV and LV lines:
-            self.HV_lines = dict()
-            self.MV_lines = dict()
-            self.LV_lines = dict()
-            #Circuit length per voltage level:
-            self.length_HV = 0
-            self.length_MV = 0
-            self.length_LV = 0
-            #Number of lines in each voltage lines:
-            self.n_HVLines = 0
-            self.n_MVLines = 0
-            self.n_LVLines = 0
-            #Getting the voltage base values:
-            self.get_kvbases()
-
-            #Calculating the distance from each bus to the substation bus:
-            self.bus_dist2subs = dict()
-            self.calc_bus_dist2subs()
-            #Buses interrupted by each protection device action.
-            self.Protect_interrupt = dict()
-            self.get_busesinterrupted()
-            #Getting the buses that are part of each secondary network:
-            self.allTransfs_sec_buses = dict()
-            self.get_Transfs_sec_nets()
-            
-            #Circuit general information:
-            self.psystem = dict()
-            #Getting system info:
-            self.get_systinfo()
-            #Dictionary with all Distributed generators info:
-            self.allDGs = dict()
-            self.n_DGs = 0
-            #Distributed generation power in the system:
-            self.DG_power = [0,0]     #[kva,kw]
-            #Getting DGs info:
-            self.get_dginfo()
+            #Buses indexes and the node -> (bus index, phase) map:
+            self.get_nodemap()
+            #Node voltages [V] of the initial solution. The kV bases are found
+            #from them (see get_kvbases), so they don't depend on the solution
+            #loaded when the kvbases stage is run (e.g. with a fault placed):
+            volts = np.asarray(self.dssCircuit.AllBusVolts,dtype=float)
+            self.init_vmag = np.hypot(volts[0::2],volts[1::2])
+            #The rest of the circuit information is obtained by the init stages
+            #(see INIT_STAGES), which are run on the first access to any of the
+            #attributes they create, unless lazy is False.
+            self.stages_done = set()
+            #The rest of the circuit information may be loaded from the cache
+            #in case the DSS files haven't changed:
+            if self.load_cache():
+                for stage in INIT_STAGES:
+                    if all(attr in self.__dict__ for attr in INIT_STAGES[stage][1]):
+                        self.stages_done.add(stage)
+                return
+            #The cache needs all the stages:
+            if not self.lazy or self.cache_dir is not None:
+                for stage in INIT_STAGES:
+                    self.run_stage(stage)
+            #Saving the circuit information in the cache:
+            self.save_cache()
 
 #            #Protection curves info:
 #            self.TCC_curves = dict()
@@ -233,34 +281,211 @@ class DSS(object):
 #            self.build_graphs()
 
 
+    def __getattr__(self,attr):
+        #This subroutine is only called when attr is not found in the object. 
+        #In case attr is created by one of the init stages, the stage (and the 
+        #stages it depends on) is run and attr is returned.
+
+        if attr in STAGE_OF_ATTR and 'stages_done' in self.__dict__:
+            self.run_stage(STAGE_OF_ATTR[attr])
+            if attr in self.__dict__:
+                return self.__dict__[attr]
+        raise AttributeError("'"+type(self).__name__+"' object has no attribute '"+attr+"'")
+
+
+    def run_stage(self,stage):
+        #This subroutine runs one of the init stages (see INIT_STAGES) after
+        #running the stages it depends on. Stages already done are not run again.
+
+        if stage in self.stages_done:
+            return
+        (method,attrs,deps) = INIT_STAGES[stage]
+        for dep in deps:
+            self.run_stage(dep)
+        getattr(self,method)()
+        self.stages_done.add(stage)
+
+
+    def invalidate(self,*stages):
+        #This subroutine discards the attributes created by the given init stages
+        #and by all the stages that depend on them (e.g. after a topology edit).
+        #They will be calculated again on the next access.
+
+        invalid = set(stages)
+        #Adding the dependent stages:
+        found = True
+        while found:
+            found = False
+            for stage in INIT_STAGES:
+                if stage not in invalid and invalid.intersection(INIT_STAGES[stage][2]):
+                    invalid.add(stage)
+                    found = True
+        for stage in invalid:
+            for attr in INIT_STAGES[stage][1]:
+                self.__dict__.pop(attr,None)
+            self.stages_done.discard(stage)
+        return invalid
+
+
+    def load_cache(self):
+        #This subroutine loads the circuit information derived in init_system
+        #from the cache file, in case it exists for the current DSS files.
+        #It returns True if the information was loaded.
+
+        if self.cache_dir is None:
+            return False
+        try:
+            self.cache_file = dss_cache.cache_filename(self.cache_dir,self.filename,self.std_unit_len)
+        except FileNotFoundError as error:
+            #The cache can't tell this circuit from others, so it isn't used:
+            print('\nWarning: circuit data cache disabled.',error)
+            self.cache_dir = None
+            return False
+        cache = dss_cache.load_cache(self.cache_file)
+        if cache is None:
+            return False
+        (data,arrays) = cache
+        for attr in CACHE_ATTRS:
+            setattr(self,attr,data[attr])
+        #JSON saves the tuples as lists:
+        for attr in ['PD_elements','PC_elements','Protect_elements','DG_Protect','Other_elements','allDGs']:
+            elements = getattr(self,attr)
+            for element in elements:
+                elements[element] = tuple(elements[element])
+        for elements in [self.Protect_elements,self.DG_Protect]:
+            for element in elements:
+                curves_info = [tuple(curve) for curve in elements[element][3]]
+                elements[element] = elements[element][:3]+(curves_info,)+elements[element][4:]
+        self.subs = tuple(self.subs)
+        #Lines table and topology arrays:
+        self.lines_table = dict()
+        for key in arrays:
+            if key.startswith('lines_'):
+                self.lines_table[key[len('lines_'):]] = arrays[key]
+        for key in ['names','unit_names','bus1','bus2']:
+            self.lines_table[key] = self.lines_table[key].tolist()
+        topo_arrays = dict()
+        for key in arrays:
+            if key.startswith('topo_'):
+                topo_arrays[key[len('topo_'):]] = arrays[key]
+        self.topology = Topology.from_arrays(topo_arrays)
+        self.set_topology_open()
+        return True
+
+
+    def save_cache(self):
+        #This subroutine saves the circuit information derived in init_system 
+        #in the cache file.
+
+        if self.cache_dir is None:
+            return
+        if self.cache_file is None:
+            self.cache_file = dss_cache.cache_filename(self.cache_dir,self.filename,self.std_unit_len)
+        data = dict()
+        for attr in CACHE_ATTRS:
+            data[attr] = getattr(self,attr)
+        arrays = dict()
+        for key in self.lines_table:
+            arrays['lines_'+key] = np.asarray(self.lines_table[key])
+        topo_arrays = self.topology.get_arrays()
+        for key in topo_arrays:
+            arrays['topo_'+key] = topo_arrays[key]
+        dss_cache.save_cache(self.cache_file,data,arrays)
+
+
 ###############################################################################
 #Basic info subroutines:
 ###############################################################################
             
+    def get_nodemap(self):
+        #This subroutine builds the self.bus_index dictionary (position of each 
+        #bus in self.allBuses) and the bus index and phase of each node in
+        #self.allNodes. The nodes are in the same order of the whole-circuit
+        #arrays given by the engine (e.g. AllBusVmag).
+
+        self.bus_index = dict()
+        for i,bus in enumerate(self.allBuses):
+            self.bus_index[bus] = i
+        node_bus = list()
+        node_phase = list()
+        for node in self.allNodes:
+            [bus,phase] = node.rsplit('.',1)
+            node_bus.append(self.bus_index[bus])
+            node_phase.append(int(phase))
+        self.node_bus = np.array(node_bus,dtype=np.int64)
+        self.node_phase = np.array(node_phase,dtype=np.int64)
+        #Nodes of the phases A, B and C:
+        self.node_abc = (self.node_phase >= 1) & (self.node_phase <= 3)
+        #Nodes sorted by bus and the first sorted node of each bus (segments
+        #used by the per-bus reductions, e.g. calc_minvbus):
+        self.node_sort = np.argsort(self.node_bus,kind='stable')
+        self.bus_n_nodes = np.bincount(self.node_bus,minlength=self.n_Buses)
+        self.bus_node_start = np.cumsum(self.bus_n_nodes)-self.bus_n_nodes
+
+
+    def get_init_busvmag(self,bus):
+        #This subroutine returns the phases and the voltage magnitudes [V] of the
+        #nodes of the given bus in the initial solution (self.init_vmag), in
+        #the engine nodes order.
+
+        i = self.bus_index[bus]
+        nodes = self.node_sort[self.bus_node_start[i]:self.bus_node_start[i]+self.bus_n_nodes[i]]
+        return (self.node_phase[nodes],self.init_vmag[nodes])
+
+
+    def get_bus_phases(self,bus):
+        #This subroutine returns the phases (1, 2 and/or 3) of the given bus.
+
+        i = self.bus_index[bus]
+        nodes = self.node_sort[self.bus_node_start[i]:self.bus_node_start[i]+self.bus_n_nodes[i]]
+        return sorted(int(phase) for phase in self.node_phase[nodes] if 1 <= phase <= 3)
+
+
+    def get_node_vbases(self):
+        #This subroutine builds the voltage base [V] arrays of all buses 
+        #(self.bus_vbase) and all nodes (self.node_vbase) from self.bus_kvbases.
+        #Buses without a kV base value get NaN.
+
+        self.bus_vbase = np.array([self.bus_kvbases.get(bus,np.nan)*1000 for bus in self.allBuses],dtype=float)
+        self.node_vbase = self.bus_vbase[self.node_bus]
+
+
     def get_linesinfo(self):
         #This subroutine gets some information related to the line objects.
         #It separates the ordinary current-carrying lines from the lines that 
         #are defined as switches.
         #It also gets the length and unit length of all lines.
-
-        switches = list()
-        real_Lines = list()
+        #The data is stored in the self.lines_table columns (NumPy arrays):
+        #   'index'     - position of the line name in self.lines_table['names']
+        #   'length'    - line length in the line unit
+        #   'unit'      - unit code (see LINE_UNITS, -1 for non-allowed units)
+        #   'length_km' - line length in km
+        #   'is_switch' - True for the lines defined as switches
+        #   'bus1'/'bus2' - buses (with nodes) of the lines (lists, as 'names')
+
+        #Lines and switches names:
+        #All the switches are expected to be modeled as line-switches.
+        #The Line elements (current-carrying lines or "real lines") will be 
+        #separated from the switches. The swithces don't count for the  
+        #circuit length, and are expected to be defined as very short lines 
+        #(Recommended 1 meter long). 
+        #The short-circuits won't be applied in them, just in ordinary lines.
+        #Reading all the lines in a single pass:
+        lines_data = self.get_classdata('line',ELEMENT_PROPS['line'])
+        units = [unit.lower() for unit in lines_data['units']]
+        self.lines_table = dict()
+        self.lines_table['names'] = lines_data['name']
+        self.lines_table['bus1'] = [buses[0] for buses in lines_data['buses']]
+        self.lines_table['bus2'] = [buses[1] if len(buses) > 1 else '' for buses in lines_data['buses']]
+        self.lines_table['unit_names'] = units
+        self.lines_table['index'] = np.arange(len(lines_data['name']))
+        self.lines_table['length'] = np.array(lines_data['length'],dtype=float)
+        self.lines_table['unit'] = np.array([LINE_UNITS.index(unit) if unit in LINE_UNITS else -1 for unit in units],dtype=int)
+        self.lines_table['length_km'] = np.zeros(len(lines_data['name']))
+        self.lines_table['is_switch'] = np.array([switch.lower() in ['true','yes'] for switch in lines_data['switch']],dtype=bool)
         #Identifying the switches and real lines:
-        for line in self.dssLines.AllNames:
-            line = line.lower()
-            self.dssText.Command = '? Line.'+line+'.switch'
-            if self.dssText.Result == 'True':
-                switches.append(line)
-            else:
-                real_Lines.append(line)
-        self.allSwitches = switches
-        self.n_Lines = len(real_Lines)
-        for line in real_Lines:
-            self.dssText.Command = '? Line.'+line+'.length'
-            line_length = self.dssText.Result
-            self.dssText.Command = '? Line.'+line+'.units'
-            line_unit = self.dssText.Result
-            self.allLines[line] = [0,'km',float(line_length),line_unit.lower()]
+        self.allSwitches = [self.lines_table['names'][i] for i in np.flatnonzero(self.lines_table['is_switch'])]
+        self.n_Lines = int(np.count_nonzero(~self.lines_table['is_switch']))
         #calculating the total circuit length:
         self.calc_circlength()
 
@@ -269,181 +494,229 @@ class DSS(object):
         # This subroutine converts all the line length units to km and calculates
         # the total circuit length
         
-        #Total feeder length:
-        feeder_length = 0.0
-        Unit_alarm = False
-        #Converting all the lengths to km
-        for line_key in self.allLines.keys():
-            line = self.allLines[line_key]
-            line_length = line[2]
-            if line[3] =='none':
-                temp_unit = self.std_unit_len
-                if Unit_alarm == False:
-                    Unit_alarm = True
-                    print('\nLine '+line_key+' unit length was not informed.\n'+self.std_unit_len+' will be considered in this case.')
+        table = self.lines_table
+        units = table['unit'].copy()
+        real_lines = np.flatnonzero(~table['is_switch'])
+        #Lines with no unit length informed will use the std_unit_len:
+        no_unit = real_lines[units[real_lines] == 0]
+        if len(no_unit) > 0:
+            print('\nLine '+table['names'][no_unit[0]]+' unit length was not informed.\n'+self.std_unit_len+' will be considered in this case.')
+            if self.std_unit_len in LINE_UNITS:
+                units[no_unit] = LINE_UNITS.index(self.std_unit_len)
             else:
-                temp_unit = line[3]
-            #re-calculating the distance values for all tha allowed units:
-            if temp_unit == 'mi':
-                conv_to_km = 1.6093
-            elif temp_unit == 'kft':
-                conv_to_km = 0.3048
-            elif temp_unit == 'km':
-                conv_to_km = 1
-            elif temp_unit == 'm':
-                conv_to_km = 1/1000
-            elif temp_unit == 'ft':
-                conv_to_km = (0.3048)/1000
-            elif temp_unit == 'in':
-                conv_to_km = (0.0254)/1000
-            elif temp_unit == 'cm':
-                conv_to_km = 1/100000
+                units[no_unit] = -1
+        #In case the unit informed for a line segment is not allowed, this
+        #line won't be considered in the length calculation and the user will
+        #receive a message.
+        for i in real_lines[units[real_lines] == -1]:
+            if table['unit'][i] == 0:
+                temp_unit = self.std_unit_len
             else:
-                #In case the unit informed for a line segment is not allowed, this
-                #line won't be considered in the length calculation and the user will
-                #receive a message.
-                conv_to_km = 0.0
-                print('\nLine '+line_key+' has a non-allowed length unit: '+temp_unit)
-                print('It will not  be considered in the circuit length calculation.')
-            #calculating the line length:
-            line_length = conv_to_km*line_length
-            feeder_length += line_length
-            #updating the line unit
-            self.allLines[line_key][0] = line_length
-        self.feeder_length = feeder_length
+                temp_unit = table['unit_names'][i]
+            print('\nLine '+table['names'][i]+' has a non-allowed length unit: '+temp_unit)
+            print('It will not  be considered in the circuit length calculation.')
+        #Converting all the lengths to km (the last factor is used by the -1 code):
+        conv_to_km = np.append(LINE_UNITS_TO_KM,0.0)[units]
+        table['length_km'] = conv_to_km*table['length']
+        #Total feeder length:
+        self.feeder_length = float(table['length_km'][real_lines].sum())
+        #Updating the lines dictionary:
+        self.allLines = dict()
+        for i in real_lines:
+            self.allLines[table['names'][i]] = [float(table['length_km'][i]),'km',float(table['length'][i]),table['unit_names'][i]]
+        
+
+    def get_classdata(self,class_name,properties=None):
+        #This subroutine gets the data of all elements of a DSS class in bulk.
+        #The engines with the JSON export of a whole class (ActiveClass.ToJSON,
+        #see get_classjson) give it in one call. The OpenDSS COM object doesn't
+        #have it, so the class elements are walked once in that case (one call
+        #per element property).
+        #The data is returned in columns (one list for each field):
+        #   columns['name']  - element names (lower case)
+        #   columns['buses'] - buses (with nodes) of each element terminal
+        #   columns[prop]    - value (string) of each property in properties
         
+        if properties is None:
+            properties = list()
+        columns = {'name':list(),'buses':list()}
+        for prop in properties:
+            columns[prop] = list()
+        #In case the class does not exist in the engine:
+        if self.dssCircuit.SetActiveClass(class_name) <= 0:
+            return columns
+        dssClass = self.dssObj.ActiveClass
+        if hasattr(dssClass,'ToJSON'):
+            return self.get_classjson(dssClass,columns,properties)
+        #Walking through all the class elements:
+        idx = dssClass.First
+        while idx > 0:
+            columns['name'].append(dssClass.Name.lower())
+            columns['buses'].append([bus.lower() for bus in self.dssCktElement.BusNames])
+            for prop in properties:
+                columns[prop].append(self.dssCktElement.Properties(prop).Val)
+            idx = dssClass.Next
+        return columns
+
+
+    def get_classjson(self,dssClass,columns,properties):
+        #This subroutine fills the get_classdata columns from the JSON export
+        #of the active class (a list with the properties of each element). The
+        #property values are converted to the strings given by the engine
+        #Properties interface (e.g. arrays as "[1, 2]").
+
+        for element in json.loads(dssClass.ToJSON(CLASS_JSON_OPTIONS)):
+            values = dict((key.lower(),value) for (key,value) in element.items())
+            columns['name'].append(str(values['name']).lower())
+            #Transformers have the buses array, the other elements bus1/bus2:
+            if isinstance(values.get('buses'),list):
+                buses = values['buses']
+            else:
+                buses = [values[key] for key in ['bus1','bus2'] if values.get(key)]
+            columns['buses'].append([str(bus).lower() for bus in buses])
+            for prop in properties:
+                value = values.get(prop.lower(),'')
+                if isinstance(value,list):
+                    value = '['+', '.join(str(item) for item in value)+']'
+                elif isinstance(value,bool):
+                    value = str(value).lower()
+                elif value is None:
+                    value = ''
+                columns[prop].append(str(value))
+        return columns
+
 
     def get_elementsinfo(self):
         #This subroutine gets the PD, PC, protection elements and substation
         #info, such as buses/terminals connections and nodes available.
         #Other elements are stored at the Other_elements dictionary.
+        #The elements data is read in bulk by class (see get_classdata).
         
         pd_elements = ['line','capacitor','reactor'] #2-terminal pds
         pc_elements = ['generator','load','pvsystem','storage','indmach012']
+        #Dictionary with all PD-Elements bus connections info:
+        self.PD_elements = dict()
+        #Dictionary with all PC-Elements bus connections info:
+        self.PC_elements = dict()
+        #Dictionary with all Protection Elements info:
+        self.Protect_elements = dict()
+        #Dictionary with all DG anti-islanding protection elements info:
+        self.DG_Protect = dict()
+        #Dictionary with all other Elements info:
+        self.Other_elements = dict()
+        #Substation bus information:
+        self.subs = tuple()            
+        #Reading the data of all the elements classes (the lines data is
+        #already in the lines table):
+        classes_data = dict()
+        elements_row = dict()
+        for class_name in ELEMENT_PROPS:
+            if class_name == 'line':
+                table = self.lines_table
+                classes_data[class_name] = {'name': table['names'],
+                                            'buses': [[bus1,bus2] for (bus1,bus2) in zip(table['bus1'],table['bus2'])]}
+            else:
+                classes_data[class_name] = self.get_classdata(class_name,ELEMENT_PROPS[class_name])
+            for i,name in enumerate(classes_data[class_name]['name']):
+                elements_row[class_name+'.'+name] = i
         for element in self.allElements:
             [element_type,element_name] = element.split(".")
             #print(element_type,element_name)
             Element_class = 0       #PD=1, PC=2, Dist-Protect=3, Substation=4, DG-Protect = 5, Other=0
             buses_12N = list()          #buses_12N may have the nodes information
             buses_orig_dest = list()    #buses_orig_dest just has the buses names            
+            #Element data (row of the class columns). The elements of the classes
+            #read in bulk but missing from their rows are skipped:
+            if element in elements_row:
+                data = classes_data[element_type]
+                row = elements_row[element]
+                buses = data['buses'][row]
+            elif element_type in ELEMENT_PROPS:
+                print('\nWarning: element not found in the class data:',element)
+                continue
+            else:
+                data = None
+                row = None
+                buses = list()
             #Getting the buses info of each element:
             #PDElements:
             if element_type in pd_elements:
                 Element_class = 1
-                self.dssText.Command = "? "+element+".bus1"
-                bus_1 = self.dssText.Result
-                self.dssText.Command = "? "+element+".bus2"
-                bus_2 = self.dssText.Result
                 #This may happen for capacitors or reactors when bus2 is not defined:
-                if bus_2 == '\x00\x00':
-                    buses_12N = [bus_1,'none']
+                if len(buses) < 2:
+                    buses_12N = [buses[0],'none']
                 else:
-                    buses_12N = [bus_1,bus_2]
+                    buses_12N = buses[:2]
             #Transformers (GICTransformers are not being considered):
             elif element_type == 'transformer':
                 #print('\n',element_type,element_name)
                 Element_class = 1
-                self.dssText.Command = "? "+element+".buses"
-                buses = self.dssText.Result
-                buses = buses.replace("[","").replace(" ]","").replace(",","")
-                buses_12N = buses.split(" ")
+                buses_12N = buses[:]
             #PCElements:
             elif element_type in pc_elements:
                 Element_class = 2
-                self.dssText.Command = "? "+element+".bus1"
-                buses_12N = [self.dssText.Result]
+                buses_12N = buses[:1]
                 #print(element_type,element_name,buses_12N)
             #Protection Elements:
             elif element_type == 'fuse':
                 Element_class = 3
-                self.dssText.Command = "? "+element+".MonitoredObj"
-                monitobj = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".SwitchedObj"
-                switchobj = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".FuseCurve"
-                fuse_curve = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".RatedCurrent"
-                rated_current = float(self.dssText.Result)
-                self.dssText.Command = "? "+element+".Delay"
-                delay = float(self.dssText.Result)
+                monitobj = data['MonitoredObj'][row].lower()
+                switchobj = data['SwitchedObj'][row].lower()
+                fuse_curve = data['FuseCurve'][row].lower()
+                rated_current = float(data['RatedCurrent'][row])
+                delay = float(data['Delay'][row])
                 curves_info = [('fusecurve',fuse_curve,delay,rated_current,1)]
                 #Reclosing intervals [ms]:
                 recintervals =  0
             elif element_type == 'recloser':
                 Element_class = 3
-                self.dssText.Command = "? "+element+".MonitoredObj"
-                monitobj = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".SwitchedObj"
-                switchobj = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".Delay"
-                delay = float(self.dssText.Result)
+                monitobj = data['MonitoredObj'][row].lower()
+                switchobj = data['SwitchedObj'][row].lower()
+                delay = float(data['Delay'][row])
                 curves_info = list()
                 #Fast curve:
-                self.dssText.Command = "? "+element+".PhaseFast"
-                PhaseFast = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".PhaseTrip"
-                PhaseTrip = float(self.dssText.Result)   
-                self.dssText.Command = "? "+element+".TDPhFast"
-                TDPhFast = float(self.dssText.Result)  
+                PhaseFast = data['PhaseFast'][row].lower()
+                PhaseTrip = float(data['PhaseTrip'][row])
+                TDPhFast = float(data['TDPhFast'][row])
                 curves_info.append(('phasefast',PhaseFast,delay,PhaseTrip,TDPhFast))
                 #Delayed curve:
-                self.dssText.Command = "? "+element+".PhaseDelayed"
-                PhaseDelayed = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".TDPhDelayed"
-                TDPhDelayed = float(self.dssText.Result)               
+                PhaseDelayed = data['PhaseDelayed'][row].lower()
+                TDPhDelayed = float(data['TDPhDelayed'][row])
                 curves_info.append(('phasedelayed',PhaseDelayed,delay,PhaseTrip,TDPhDelayed))
                 #Reclosing intervals [ms]:
-                self.dssText.Command = "? "+element+".RecloseIntervals"
-                recintervals = aux.get_numvalues(self.dssText.Result)
+                recintervals = aux.get_numvalues(data['RecloseIntervals'][row])
             elif element_type == 'relay':
-                self.dssText.Command = "? "+element+".type"
-                if self.dssText.Result.lower() == 'current':
+                relay_type = data['type'][row].lower()
+                if relay_type == 'current':
                     Element_class = 3
-                    self.dssText.Command = "? "+element+".MonitoredObj"
-                    monitobj = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".SwitchedObj"
-                    switchobj = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".Delay"
-                    delay = float(self.dssText.Result)
+                    monitobj = data['MonitoredObj'][row].lower()
+                    switchobj = data['SwitchedObj'][row].lower()
+                    delay = float(data['Delay'][row])
                     curves_info = list()
                     #Phase curve:
-                    self.dssText.Command = "? "+element+".Phasecurve"
-                    Phasecurve = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".PhaseTrip"
-                    PhaseTrip = float(self.dssText.Result)   
-                    self.dssText.Command = "? "+element+".TDPhase"
-                    TDPhase = float(self.dssText.Result)
-                    if Phasecurve != '\x00\x00':
+                    Phasecurve = data['Phasecurve'][row].lower()
+                    PhaseTrip = float(data['PhaseTrip'][row])
+                    TDPhase = float(data['TDPhase'][row])
+                    if Phasecurve not in ['','\x00\x00']:
                         curves_info.append(('phasecurve',Phasecurve,delay,PhaseTrip,TDPhase))
                     #Reclosing intervals [ms]:
-                    self.dssText.Command = "? "+element+".RecloseIntervals"
-                    recintervals = aux.get_numvalues(self.dssText.Result)
-                elif self.dssText.Result.lower() == 'voltage':
+                    recintervals = aux.get_numvalues(data['RecloseIntervals'][row])
+                elif relay_type == 'voltage':
                     Element_class = 5
-                    self.dssText.Command = "? "+element+".MonitoredObj"
-                    monitobj = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".SwitchedObj"
-                    switchobj = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".Delay"
-                    delay = float(self.dssText.Result)
+                    monitobj = data['MonitoredObj'][row].lower()
+                    switchobj = data['SwitchedObj'][row].lower()
+                    delay = float(data['Delay'][row])
                     curves_info = list()
                     #Phase curve:
-                    self.dssText.Command = "? "+element+".undervoltcurve"
-                    undervoltcurve = self.dssText.Result.lower()
-                    self.dssText.Command = "? "+element+".overvoltcurve"
-                    overvoltcurve = self.dssText.Result .lower()  
-                    self.dssText.Command = "? "+element+".kvbase"
-                    kvbase = float(self.dssText.Result)
+                    undervoltcurve = data['undervoltcurve'][row].lower()
+                    overvoltcurve = data['overvoltcurve'][row].lower()
+                    kvbase = float(data['kvbase'][row])
                     #print(undervoltcurve,overvoltcurve,delay,kvbase)
                     curves_info.append((undervoltcurve,overvoltcurve,delay,kvbase))
             #Substation:
             elif element_type == 'vsource':
                 Element_class = 4
-                self.dssText.Command = "? "+element+".bus1"
-                bus_1 = self.dssText.Result.lower()
-                self.dssText.Command = "? "+element+".bus2"
-                bus_2 = self.dssText.Result.lower()
-                buses_12N = [bus_1,bus_2]
+                buses_12N = buses[:2]
                 
             #Adjusting the buses names:
             if buses_12N != list():
@@ -481,8 +754,10 @@ class DSS(object):
     def get_busconnect(self):
         #This subroutine builds the Bus_connect dictionary, using the data from
         #the previously buit PD_elements and PC_elements dictionary.
+        #self.Bus_connect must contain all the buses connections (enabled and disabled).
 
         #Innitializing the dictionary:
+        self.Bus_connect = dict()
         for bus in self.allBuses:
             self.Bus_connect[bus] = [list(),list()]
         #Adding the source element bus connection info:
@@ -509,12 +784,16 @@ class DSS(object):
         for pc_element in self.PC_elements.keys():
             [PC_bus] = self.PC_elements[pc_element][2]
             self.Bus_connect[PC_bus][1].append(pc_element)
+        #Compact topology (integer ids and CSR adjacency) used by the circuit walks:
+        self.topology = Topology(self.Bus_connect,self.PD_elements)
+        self.set_topology_open()
             
     
     def calc_bus_dist2subs(self):
         #This subroutine calculates the distance of each bus to the substation.
         
         #Adding the source_bus with 0 as a reference:
+        self.bus_dist2subs = dict()
         source_bus = self.subs[2][0]
         self.bus_dist2subs[source_bus] = 0        
         #Adding the next buses in the sequence:
@@ -523,66 +802,49 @@ class DSS(object):
 
     def calc_bus_dist2subs_sequence(self,bus):
         #This subroutine calculates the distance of each bus to the substation.
+        #All the buses reached from the given bus that don't have a distance yet
+        #are calculated (iterative walk through the circuit topology).
         
-        #Getting the PDs in the sequence:
-        next_PDs_fw = list()
-        for elmnt in self.Bus_connect[bus][1]:
-            if elmnt in self.PD_elements:
-                next_PDs_fw.append(elmnt)
-        next_PDs_bk = list()
-        for elmnt in self.Bus_connect[bus][0]:
-            if elmnt in self.PD_elements:
-                next_PDs_bk.append(elmnt)
-        #Checking all the PDs forward:        
-        for new_pd in next_PDs_fw:
-            #Checking all the buses in the sequence of the PD element selected:
-            for new_bus in self.PD_elements[new_pd][2][1:]:
-                #Checking if the new_bus is different of the bus given at 
-                #the subroutine call. 
-                if new_bus != bus and new_bus != 'none':
-                    #Checking if the PD element is a line. In this case the length 
-                    #of the line will be taken into account, if not, the length 
-                    #of the other elements, such as transformers, capacitors and 
-                    #swithces won't be counted.
-                    if new_pd.split('.')[0] == 'line' and new_pd.split('.')[1] in self.allLines and new_bus not in self.bus_dist2subs:
-                        self.bus_dist2subs[new_bus] = self.bus_dist2subs[bus] + self.allLines[new_pd.split('.')[1]][0]
-                        #print(new_bus,'=',self.bus_dist2subs[bus],'+',self.allLines[new_pd.split('.')[1]][0],'=',self.bus_dist2subs[new_bus],'km')
-                        self.calc_bus_dist2subs_sequence(new_bus)
-                    elif new_bus not in self.bus_dist2subs:
-                        self.bus_dist2subs[new_bus] = self.bus_dist2subs[bus] + 1/1000
-                        #print(new_bus,self.bus_dist2subs[new_bus])
-                        self.calc_bus_dist2subs_sequence(new_bus)
-        #Checking all the PDs backward:        
-        for new_pd in next_PDs_bk:
-            #Checking all the buses in the sequence of the PD element selected:
-            for new_bus in self.PD_elements[new_pd][2][0:1]:
-                #Checking if the new_bus is different of the bus given at 
-                #the subroutine call. 
-                if new_bus != bus and new_bus != 'none':
-                    #Checking if the PD element is a line. In this case the length 
-                    #of the line will be taken into account, if not, the length 
-                    #of the other elements, such as transformers, capacitors and 
-                    #swithces won't be counted.
-                    if new_pd.split('.')[0] == 'line' and new_pd.split('.')[1] in self.allLines and new_bus not in self.bus_dist2subs:
-                        self.bus_dist2subs[new_bus] = self.bus_dist2subs[bus] + self.allLines[new_pd.split('.')[1]][0]
-                        #print(new_bus,'=',self.bus_dist2subs[bus],'+',self.allLines[new_pd.split('.')[1]][0],'=',self.bus_dist2subs[new_bus],'km')
-                        self.calc_bus_dist2subs_sequence(new_bus)
-                    elif new_bus not in self.bus_dist2subs:
-                        self.bus_dist2subs[new_bus] = self.bus_dist2subs[bus] + 1/1000
-                        #print(new_bus,self.bus_dist2subs[new_bus])
-                        self.calc_bus_dist2subs_sequence(new_bus)
+        topo = self.topology
+        #Checking if the PD element is a line. In this case the length 
+        #of the line will be taken into account, if not, the length 
+        #of the other elements, such as transformers, capacitors and 
+        #swithces won't be counted (1 meter is used instead).
+        elem_length = list()
+        for i,pd in enumerate(topo.elements):
+            if topo.is_line[i] and pd.split('.')[1] in self.allLines:
+                elem_length.append(self.allLines[pd.split('.')[1]][0])
+            else:
+                elem_length.append(1/1000)
+        dist = dict()
+        for known_bus in self.bus_dist2subs:
+            dist[topo.bus_id[known_bus]] = self.bus_dist2subs[known_bus]
+        dist = topo.distances(topo.bus_id[bus],elem_length,dist)
+        for bus_id in dist:
+            self.bus_dist2subs[topo.buses[bus_id]] = dist[bus_id]
 
 
     def get_busesinterrupted(self):
         #This subroutine finds the buses affected by the openning action of each 
         #protection device.
         
+        self.Protect_interrupt = dict()
         for prot_device in self.Protect_elements:
-            affected_buses_list = list()
             switchobj = self.Protect_elements[prot_device][2]
-            affected_buses_list = self.get_interruption_path(switchobj,self.PD_elements[switchobj][2][1:],affected_buses_list)
-            self.Protect_interrupt[prot_device] = affected_buses_list
-            #print('Buses',len(affected_buses_list))
+            self.Protect_interrupt[prot_device] = self.get_protection_zone(switchobj)
+            #print('Buses',len(self.Protect_interrupt[prot_device]))
+
+
+    def get_protection_zone(self,pd_element):
+        #This subroutine finds the buses located downstream the given PD element,
+        #i.e. the buses interrupted by its openning. Any PD element can be given,
+        #not just the protection devices switched objects.
+        #The buses are taken from the feeder tree rooted at the substation bus.
+        
+        topo = self.topology
+        if topo.tree_root is None:
+            topo.build_tree(topo.bus_id[self.subs[2][0]])
+        return topo.get_names(topo.downstream(topo.element_id[pd_element]).tolist())
             
 
     def get_interruption_path(self,prev_PD,bus_affected,affected_buses_list):
@@ -590,23 +852,12 @@ class DSS(object):
         #that bus in a radial system. These buses will be affected by an 
         #interruption due to the openning of a switch locate just upstream the 
         #starting bus given.
+        #The prev_PD (the switch) is not walked through.
 
-        new_buses = list()
-        for bus in bus_affected:
-            if bus not in affected_buses_list and bus!='none':
-                affected_buses_list.append(bus)
-                new_buses.append(bus)
-        #Checking the circuit sequence:
-        for bus in new_buses:
-            #print(bus,self.Bus_connect[bus])
-            back_PDs = self.Bus_connect[bus][0]
-            next_PDs = self.Bus_connect[bus][1]
-            for PD in next_PDs:
-                if PD in self.PD_elements and PD != prev_PD:
-                    affected_buses_list = self.get_interruption_path(PD,self.PD_elements[PD][2][1:],affected_buses_list)
-            for PD in back_PDs:
-                if PD in self.PD_elements and PD != prev_PD:
-                    affected_buses_list = self.get_interruption_path(PD,self.PD_elements[PD][2][:1],affected_buses_list)
+        topo = self.topology
+        visited = set(topo.get_ids(affected_buses_list))
+        (new_buses,via) = topo.dfs(topo.get_ids(bus_affected),exclude_element=topo.element_id.get(prev_PD,-1),visited=visited)
+        affected_buses_list.extend(topo.get_names(new_buses))
         return affected_buses_list
 
 
@@ -614,6 +865,7 @@ class DSS(object):
         #This subroutine gets all the buses at each secondary network from each
         #transformer. Part 1.
         
+        self.allTransfs_sec_buses = dict()
         for transf in self.allTransfs:         
             #List of available buses:
             secnet_buses = list()
@@ -628,19 +880,13 @@ class DSS(object):
     def get_buses_in_sec_net(self,new_bus,secnet_buses):
         #This subroutine gets all the buses at each secondary network from each
         #transformer. Part 2.
+        #The walk goes forward through the non-transformer PDs and backward 
+        #through the lines only.
         
-        #Adding the new bus:
-        if new_bus not in secnet_buses:
-            secnet_buses.append(new_bus)
-        #Checking the new pds for more buses:
-        pds_fw = self.Bus_connect[new_bus][1]
-        for elmtn in pds_fw:
-            if elmtn in self.PD_elements and self.PD_elements[elmtn][0]!='transformer' and self.PD_elements[elmtn][2][0]!=self.PD_elements[elmtn][2][1] and self.PD_elements[elmtn][2][1] not in secnet_buses:
-                 secnet_buses = self.get_buses_in_sec_net(self.PD_elements[elmtn][2][1],secnet_buses)
-        pds_bk = self.Bus_connect[new_bus][0]
-        for elmtn in pds_bk:
-            if elmtn in self.PD_elements and self.PD_elements[elmtn][0]=='line' and self.PD_elements[elmtn][2][0] not in secnet_buses:
-                 secnet_buses = self.get_buses_in_sec_net(self.PD_elements[elmtn][2][0],secnet_buses)
+        topo = self.topology
+        visited = set(topo.get_ids(secnet_buses))
+        (new_buses,via) = topo.dfs(topo.get_ids([new_bus]),mode='sec_net',visited=visited)
+        secnet_buses.extend(topo.get_names(new_buses))
         return secnet_buses
     
 
@@ -651,7 +897,24 @@ class DSS(object):
         #Then, it gets the voltage base values for all buses starting from the 
         #substation and then, from each transformer until finding all buses kvBases
         #that are connected to the circuit.
-
+        #The lines are also classified as low, medium or high-voltage lines.
+
+        #Transformers voltages dictionary:
+        self.allTransfs = dict()
+        self.allTransfskva = dict()
+        #HV, MV and LV buses:
+        self.HV_buses = list()
+        self.MV_buses = list()
+        self.LV_buses = list()
+        #HV, MV and LV lines:
+        self.HV_lines = dict()
+        self.MV_lines = dict()
+        self.LV_lines = dict()
+        self.disabled_lines = dict()
+        #Circuit length per voltage level:
+        self.length_HV = 0
+        self.length_MV = 0
+        self.length_LV = 0
         #Getting the voltage kV and powerkVA values of each transformer:
         for PD in self.PD_elements:
             if self.PD_elements[PD][0] == 'transformer':
@@ -670,7 +933,8 @@ class DSS(object):
         source_bus = self.subs[2][0]
         self.dssCircuit.SetActiveBus(source_bus)
         sourcebus_kVBase = round(self.dssBus.kVBase,4)
-        KV_value = round(self.dssBus.VMagAngle[0]/1000,4)
+        (phases,vmag) = self.get_init_busvmag(source_bus)
+        KV_value = round(vmag[0]/1000,4)
         #Checking the bus kv Values:
         if abs(sourcebus_kVBase-KV_value)<0.1*sourcebus_kVBase:
             bus_kvbase = sourcebus_kVBase
@@ -682,18 +946,13 @@ class DSS(object):
                 if abs(value-KV_value)<0.1*value and abs(value-KV_value)<abs(KV_value-bus_kvbase):
                     bus_kvbase = value
         else:
-            avg_KV_value = 0
-            num_nodes_abc = 0
-            j=0
-            for node in self.dssBus.Nodes:
-                if node in[1,2,3]:
-                    avg_KV_value+=self.dssBus.VMagAngle[2*j]
-                    num_nodes_abc+=1
-                j+=1
-            bus_kvbase = round(avg_KV_value/(num_nodes_abc*1000),3)
+            abc = (phases >= 1) & (phases <= 3)
+            bus_kvbase = round(float(np.mean(vmag[abc]))/1000,3)
+        #Buses already visited by the find_circ_kvpath walks:
+        kv_visited = set()
         #Adding the kV base to all buses at the main trunk:
         if source_bus not in base_buses:
-            base_buses = self.find_circ_kvpath(source_bus,bus_kvbase,base_buses)
+            base_buses = self.find_circ_kvpath(source_bus,bus_kvbase,base_buses,kv_visited)
 
         #Adding the new buses kvBase values starting from the transformers in 
         #both directions to reach the buses with no kvBase values found yet:
@@ -704,7 +963,8 @@ class DSS(object):
                     transf_basekv = self.allTransfs[transformer][i]
                     self.dssCircuit.SetActiveBus(bus)
                     transfbus_kVBase = round(self.dssBus.kVBase,4)
-                    KV_value = round(self.dssBus.VMagAngle[0]/1000,4)
+                    (phases,vmag) = self.get_init_busvmag(bus)
+                    KV_value = round(vmag[0]/1000,4)
                     #Checking the bus kv Values:
                     if abs(transfbus_kVBase-KV_value)<0.2*transfbus_kVBase or KV_value==0.0:
                         bus_kvbase = transfbus_kVBase
@@ -716,16 +976,9 @@ class DSS(object):
                             if abs(value-KV_value)<0.1*value and abs(value-KV_value)<abs(KV_value-bus_kvbase):
                                 bus_kvbase = value
                     else:
-                        avg_KV_value = 0
-                        num_nodes_abc = 0
-                        j=0
-                        for node in self.dssBus.Nodes:
-                            if node in[1,2,3]:
-                                avg_KV_value+=self.dssBus.VMagAngle[2*j]
-                                num_nodes_abc+=1
-                            j+=1
-                        bus_kvbase = round(avg_KV_value/(num_nodes_abc*1000),3)
-                    base_buses = self.find_circ_kvpath(bus,bus_kvbase,base_buses)
+                        abc = (phases >= 1) & (phases <= 3)
+                        bus_kvbase = round(float(np.mean(vmag[abc]))/1000,3)
+                    base_buses = self.find_circ_kvpath(bus,bus_kvbase,base_buses,kv_visited)
 
         #Buses and lines will be classyfied as low voltage (LV), medium voltage (MV) 
         #or high voltage (HV) according to the following criteria:
@@ -776,32 +1029,28 @@ class DSS(object):
         self.n_LVLines = len(self.LV_lines)
 
 
-    def find_circ_kvpath(self,start_bus,kv_value,base_buses):
+    def find_circ_kvpath(self,start_bus,kv_value,base_buses,visited=None):
         #This subroutine should receive a start_bus, a voltage base value and
         #the base_buses dict. It will find the sequence of the circuit in both 
         #directions and assign a voltage base value to each bus until the circuit 
         #reaches a new transformer, another already indentified bus or the last
         #bus in the sequence.
-
-        base_buses[start_bus] = kv_value
-        #Checking the bus connections:
-        next_PDs_back = self.Bus_connect[start_bus][0]
-        next_PDs_forw = self.Bus_connect[start_bus][1]
-        #print('PDs back:',next_PDs_back)
-        #print('PDs forward:',next_PDs_forw)
+        #visited - set of bus ids already in base_buses (it avoids rebuilding
+        #it in each call).
         #----------------------------------------------------------------------
 #        Checking the other buses starting from the start_bus:
 #        (bus_back)       (start_bus)          (bus_forw)
 #            |-----PDs_back-----|-----PDs_forw-----|
         #----------------------------------------------------------------------
-        #Going forward:
-        for PD in next_PDs_forw:
-            if PD in self.PD_elements and self.PD_elements[PD][0]!='transformer' and (self.PD_elements[PD][2][1] not in base_buses) and (self.PD_elements[PD][2][1] != 'none'):
-                base_buses = self.find_circ_kvpath(self.PD_elements[PD][2][1],kv_value,base_buses)
-        #Going backward:
-        for PD in next_PDs_back:
-            if PD in self.PD_elements and self.PD_elements[PD][0]!='transformer' and (self.PD_elements[PD][2][0] not in base_buses) and (self.PD_elements[PD][2][1] != 'none'):
-                base_buses = self.find_circ_kvpath(self.PD_elements[PD][2][0],kv_value,base_buses)
+
+        topo = self.topology
+        if visited is None:
+            visited = set(topo.get_ids(base_buses))
+        start_id = topo.bus_id[start_bus]
+        visited.discard(start_id)
+        (new_buses,via) = topo.dfs([start_id],mode='no_transf',visited=visited,closed_only=False)
+        for bus in topo.get_names(new_buses):
+            base_buses[bus] = kv_value
         return base_buses
 
 
@@ -809,6 +1058,8 @@ class DSS(object):
         #This subroutine gets some important informations related to the 
         #electric system, like frequency, 1ph and 3pg short-circuit relation,etc.
         
+        #Circuit general information:
+        self.psystem = dict()
         #Getting the system frequency of operation and calculating its cycle:
         self.dssText.Command = "? "+self.subs[0]+"."+self.subs[-1]+".basefreq"
         self.freq = float(self.dssText.Result)
@@ -834,6 +1085,10 @@ class DSS(object):
         #This subroutine gets some important informations related to the 
         #distributed generators.
         dgs = ['generator','pvsystem']
+        #Dictionary with all Distributed generators info:
+        self.allDGs = dict()
+        #Distributed generation power in the system:
+        self.DG_power = [0,0]     #[kva,kw]
 
         for pc_elmnt in self.PC_elements:
             if self.PC_elements[pc_elmnt][0] in dgs:
@@ -856,22 +1111,55 @@ class DSS(object):
 #Protection-related subroutines:
 ###############################################################################
         
-    def config_TCCcurves(self):
+    def config_TCCcurves(self,analytic_curves=None):
         #This subroutine configures the TCC curves of all protection elements.
         #The curves will be read from a "TCC_Curve.dss" file in the same folder
         #of the circuit working directory and adpated according to each protection
         #element settings.
+        #analytic_curves - dictionary that maps the curves of the protection
+        #elements to the analytic inverse-time curves (see dss.tcc.ANALYTIC_CURVES),
+        #e.g. {'recloser.r1 phasefast': 'ieee_vi', 'fuse.f1': 'iec_ei', 'tlink': 'iec_vi'}.
+        #The keys may be a device curve ('device curve_type'), a device (all its
+        #curves) or a curve name of the OpenDSS settings, in this order of priority.
+        #The given mapping is stored in self.TCC_analytic_curves and used by the
+        #next calls. The mapped curves are evaluated with the pickup current, the
+        #delay and the time dial of the device settings (the points of the file
+        #are not used). Curves not found in the file but named as one of the 
+        #analytic curves are mapped to them.
+        #The settings of the analytic curves are stored in self.TCC_analytic.
         
-        if os.path.exists(self.filepath+'\TCC_Curve.dss'):
+        if analytic_curves is not None:
+            analytic_curves = dict((key.lower(),analytic_curves[key].lower()) for key in analytic_curves)
+            for key in analytic_curves:
+                if analytic_curves[key] not in tcc.ANALYTIC_CURVES:
+                    raise ValueError("Unknown analytic TCC curve '"+analytic_curves[key]+"' of '"+key+"'.")
+            self.TCC_analytic_curves = analytic_curves
+        TCC_info = dict()
+        if os.path.exists(os.path.join(self.filepath,'TCC_Curve.dss')):
             TCC_info = self.load_TCCfile()
-            #Adapting the curves from the file to the protection elements settings:
-            TCC_info_adjust = dict()
-            for elmnt in self.Protect_elements:
-                for curve in self.Protect_elements[elmnt][3]:
-                    T_delay = curve[2]
-                    I_mult = curve[3]
-                    T_mult = curve[4]
+        else: 
+            print('\nFile',os.path.join(self.filepath,'TCC_Curve.dss'),'not found!')
+        #Adapting the curves from the file to the protection elements settings:
+        TCC_info_adjust = dict()
+        TCC_analytic = dict()
+        for elmnt in self.Protect_elements:
+            for curve in self.Protect_elements[elmnt][3]:
+                T_delay = curve[2]
+                I_mult = curve[3]
+                T_mult = curve[4]
+                analytic_curve = None
+                for key in [elmnt+' '+curve[0].lower(),elmnt,curve[1]]:
+                    if key in self.TCC_analytic_curves:
+                        analytic_curve = self.TCC_analytic_curves[key]
+                        break
+                if analytic_curve is None and curve[1] not in TCC_info and curve[1] in tcc.ANALYTIC_CURVES:
+                    analytic_curve = curve[1]
+                if analytic_curve is not None:
+                    TCC_analytic[elmnt+' '+curve[0].lower()] = (analytic_curve,I_mult,T_delay,T_mult)
+                elif curve[1] in TCC_info:
                     TCC_info_adjust[elmnt+' '+curve[0].lower()] = (I_mult*np.array(TCC_info[curve[1]][1] ),T_delay+T_mult*np.array(TCC_info[curve[1]][2]))
+                else:
+                    print('\nTCC curve',curve[1],'of',elmnt,'not found!')
     
 #            #Plotting the Time-current curves:
 #            plt.figure('Time-current curves - Protection elements')    
@@ -904,93 +1192,35 @@ class DSS(object):
 #            plt.legend(loc='best');
 #            plt.show() 
     
-            self.TCC_curves = TCC_info_adjust
-        else: 
-            print('\nFile',self.filepath+'\TCC_Curve.dss not found!')
+        self.TCC_curves = TCC_info_adjust
+        self.TCC_analytic = TCC_analytic
 
 
-    def load_TCCfile(self,file_path=None):
+    def load_TCCfile(self,file_path=None,curve_classes=tcc.TCC_CLASSES):
         #This subroutine reads the TCC curves in the TCCCurve.dss file and returns
-        #the TCC_info list
+        #the TCC_info dictionary (curve name: (npts, C_array, T_array)).
+        #The file is read line by line by the dss.tcc parser.
+        #curve_classes - classes of the curves read from the file (None: any
+        #class, see dss.tcc.read_curves).
         
-        #TCC curves info list:
-        TCC_info = dict()
-        #Openning the file:
         if file_path == None:
-            inFile = open(self.filepath+'\TCC_Curve.dss')
-        else:
-            inFile = open(file_path)
-        #Each line is a string with the whole content of each line in the file
-        for line in inFile:
-            #Reading each line:
-            fields = line.split(' ')
-            #fields is a list of blocks of characters.
-            #Each block is determined by a blank space in the line.
-            if fields[0].lower() == 'new':
-                #Getting the TCC curve name:
-                #fields[1] contains TCC_curbe.TCC_name
-                TCC_name = fields[1].replace('"','').split('.')[-1].lower()
-                #Getting the number of points in each TCC curve:
-                #fields[2] = 'npts=number'
-                npts = int(fields[2].split('=')[-1])
-                fields3 = [x for x in fields[3:] if x != '']
-                array_len = int(len(fields3)/2)
-                #Getting the C_array and T_array in string forms:
-                #The C and T vectors must come in this order.
-                C_array_str = fields3[0:array_len]
-                T_array_str = fields3[array_len:]                
-                C_array = list()
-                T_array = list()
-                #Transforming the C_array_str in a list with numbers
-                for val in C_array_str:
-                   the_number = aux.get_numval(val)
-                   if the_number!= None:
-                       C_array.append(float(the_number))                       
-                #Transforming the T_array_str in a list with numbers
-                for val in T_array_str:
-                   the_number = aux.get_numval(val)
-                   if the_number!= None:
-                       T_array.append(float(the_number))                            
-                TCC_info[TCC_name] = (npts,C_array,T_array)            
-        return TCC_info
+            file_path = os.path.join(self.filepath,'TCC_Curve.dss')
+        return tcc.read_curves(file_path,curve_classes)
 
 
     def buid_TCCmodels(self):
         #This subroutine builds the TCC curves models of all protection elements.
         #These models will be used posteriorly to determine the time of the protection 
         #actuation.
+        #The curves given by points are interpolated in log-log scale and the 
+        #analytic ones are evaluated in closed form (see dss.tcc).
         
+        self.TCC_models = dict()
         for curve in self.TCC_curves:
-            (c_intervals,t_intervals) = aux.split_intervals_norepeat(self.TCC_curves[curve][0],self.TCC_curves[curve][1])
-            n_parts = len(c_intervals)
-            all_curvmodels = list()
-            for i in range(n_parts):
-                #print(c_intervals[i],t_intervals[i])
-                model = np.polyfit(c_intervals[i], t_intervals[i],1)
-                #estYVals = pylab.polyval(model, c_intervals[i])
-                #R2_new = aux.r_squared(t_intervals[i], estYVals)
-                all_curvmodels.append(model)
-                #print(model)
-            
-#            print(curve,len(self.TCC_curves[curve][0]),n_parts)
-            
-#            plt.close('TCC Polyfit test ' + curve)
-#            plt.figure('TCC Polyfit test ' + curve)    
-#            plt.clf()
-#            plt.plot(self.TCC_curves[curve][0],self.TCC_curves[curve][1],'ko',label = 'Orig. values', linewidth = 1.0)
-#            for i in range(n_parts):
-#                plt.plot(c_intervals[i],pylab.polyval(all_curvmodels[i], c_intervals[i]),label = 'interval:'+str(i+1), linewidth = 2.0)
-#            plt.title('Time-current plot - ' + curve)
-#            plt.xlabel('Current [A]')
-#            plt.ylabel('Time [s]')
-#            plt.yscale('log')
-#            plt.xscale('log')
-#            plt.grid(True)
-#            if len(all_curvmodels)<10:
-#                plt.legend(loc='upper center', bbox_to_anchor=(0.5, -0.19),fancybox=True, shadow=False, ncol=3)
-#            plt.show()
-                
-            self.TCC_models[curve] = (c_intervals[:len(all_curvmodels)],t_intervals[:len(all_curvmodels)],all_curvmodels)
+            self.TCC_models[curve] = tcc.points_model(self.TCC_curves[curve][0],self.TCC_curves[curve][1])
+        for curve in self.TCC_analytic:
+            (curve_name,I_pickup,T_delay,T_mult) = self.TCC_analytic[curve]
+            self.TCC_models[curve] = tcc.analytic_model(curve_name,I_pickup,T_delay,T_mult)
     
 
     def config_LVRTcurves(self):
@@ -999,7 +1229,7 @@ class DSS(object):
         #from a "LVRT_Curve.dss" file in the folder "__LVRTcurves__" which is 
         #in the same folder of the DSPA working directory.
         
-        LVRT_info = self.load_TCCfile(self.DSS_LVRT_filename)
+        LVRT_info = self.load_TCCfile(self.DSS_LVRT_filename,tcc.LVRT_CLASSES)
 
 #        #Plotting the Time-voltage curves:
 #        plt.figure('Voltage-current curves - Protection elements')    
@@ -1040,63 +1270,47 @@ class DSS(object):
         #This subroutine builds the LVRT-models of all LVRT curves.
         #These models will be used posteriorly to determine the time of the  
         #protection actuation.        
+        #Each model has the curve segments sorted by voltage: (v_lo, v_hi, slope,
+        #intercept), with time [s] = slope*voltage [pu] + intercept. Vertical 
+        #segments (repeated voltages) are discarded.
 
+        self.LVRT_models = dict()
         for curve in self.LVRT_curves:
-            v_intervals = aux.split_intervals(self.LVRT_curves[curve][1])
-            t_intervals = aux.split_intervals(self.LVRT_curves[curve][2])
-            n_parts = len(v_intervals)
-            all_curvmodels = list()
-            for i in range(n_parts):
-                model = np.polyfit(v_intervals[i], t_intervals[i],1)
-                #estYVals = pylab.polyval(model, c_intervals[i])
-                #R2_new = aux.r_squared(t_intervals[i], estYVals)
-                all_curvmodels.append(model)
-            
-#            plt.close('LVRT Polyfit test ' + curve)  
-#            plt.figure('LVRT Polyfit test ' + curve)    
-#            plt.clf()
-#            plt.plot(self.LVRT_curves[curve][1],self.LVRT_curves[curve][2],'ko',label = 'Orig. values', linewidth = 1.0)
-#            for i in range(n_parts):
-#                plt.plot(v_intervals[i],pylab.polyval(all_curvmodels[i], v_intervals[i]),label = 'interval:'+str(i+1), linewidth = 2.0)
-#            plt.title('Time-voltage plot - ' + curve)
-#            plt.xlabel('Voltage [pu]')
-#            plt.ylabel('Time [s]')
-#            plt.grid(True)
-#            plt.xlim([0,1])
-#            #plt.legend(loc='upper right')
-#            #plt.legend(loc='upper center', bbox_to_anchor=(0.5, -0.19),fancybox=True, shadow=False, ncol=3)
-#            plt.show()
-                
-            self.LVRT_models[curve] = (v_intervals,t_intervals,all_curvmodels)
+            v_points = np.asarray(self.LVRT_curves[curve][1],dtype=float)
+            t_points = np.asarray(self.LVRT_curves[curve][2],dtype=float)
+            order = np.argsort(v_points,kind='stable')
+            v_points = v_points[order]
+            t_points = t_points[order]
+            width = np.diff(v_points)
+            keep = width > 0
+            v_lo = v_points[:-1][keep]
+            v_hi = v_points[1:][keep]
+            slope = np.diff(t_points)[keep]/width[keep]
+            intercept = t_points[:-1][keep] - slope*v_lo
+            self.LVRT_models[curve] = (v_lo,v_hi,slope,intercept)
 
     
     def get_protactiontime(self,prot_device,curve_name,Icc):
         #This subroutine calculates the actuation time of a given curve of a given
         #protection device. 
         
-        #Current intervals:
-        c_intervals = self.TCC_models[prot_device+' '+curve_name][0]       
-        action_time = 0
-        model_number = 0
-        #In case the current is too small:
-        if Icc<c_intervals[0][0]:
-            action_time = math.inf #('infinite')
-        #In case the current is too large:
-        elif Icc>c_intervals[-1][1]:
-            Icc = c_intervals[-1][1]
-            model_number = len(c_intervals)-1
-        #General case:
-        else:
-            i=0
-            for interval in c_intervals:
-                if Icc>=interval[0] and Icc<=interval[1]:
-                    model_number = i
-                    break
-                i+=1
-        #Calculating the protection device action time:
-        if action_time == 0:
-            action_time = 1000*pylab.polyval(self.TCC_models[prot_device+' '+curve_name][2][model_number], Icc)
-        return action_time
+        return float(self.get_protactiontimes([(prot_device,curve_name)],[Icc])[0,0])
+
+
+    def get_protactiontimes(self,curves,Icc):
+        #This subroutine calculates the actuation times [ms] of the given curves 
+        #for several fault currents at once.
+        #curves - list of (prot_device, curve_name) tuples (n_devices).
+        #Icc - array with the fault currents (n_faults), the same for all devices,
+        #or a (n_faults x n_devices) array with the current seen by each device.
+        #It returns a (n_faults x n_devices) array (see dss.tcc.curves_times).
+        
+        Icc = np.asarray(Icc,dtype=float)
+        if Icc.ndim < 2:
+            Icc = Icc.reshape(-1,1)
+        Icc = np.broadcast_to(Icc,(Icc.shape[0],len(curves)))
+        models = [self.TCC_models[prot_device+' '+curve_name] for (prot_device,curve_name) in curves]
+        return 1000*tcc.curves_times(models,Icc)
 
 
     def get_DGprotactiontime(self,vmag_pu):
@@ -1104,29 +1318,69 @@ class DSS(object):
         #which follows both curves and with a voltage given by vmag_pu.
         
         disc_time = dict()
-        for curve in self.LVRT_models:
-            action_time = 0
-            model_number = 0
-            #Voltage intervals:
-            v_intervals = self.LVRT_models[curve][0]
-#            print(curve,v_intervals)
-            #In case the voltage is not low enough:
-            if vmag_pu>v_intervals[-1][-1]:
-                action_time = math.inf #('infinite')
-            #General case:
-            else:
-                i=0
-                for interval in v_intervals:
-                    if vmag_pu>=interval[0] and vmag_pu<=interval[1]:
-                        model_number = i
-                        break
-                    i+=1
-                #Calculating the protection device action time:
-                action_time = 1000*pylab.polyval(self.LVRT_models[curve][2][model_number], vmag_pu)
-            disc_time[curve] = action_time
+        for (curve,action_time) in self.get_DGprotactiontimes(vmag_pu).items():
+            disc_time[curve] = float(action_time)
         return disc_time            
 
 
+    def get_DGprotactiontimes(self,vmag_pu):
+        #This subroutine calculates the actuation times [ms] of the DG protection
+        #devices for an array of voltages [pu] (e.g. one value for each DG in
+        #self.allDGs, or a (n_steps x n_DGs) time series).
+        #It returns a dictionary with one array (with the shape of vmag_pu) for
+        #each LVRT curve. In case the voltage is not low enough the time is infinite.
+
+        vmag_pu = np.asarray(vmag_pu,dtype=float)
+        disc_time = dict()
+        for curve in self.LVRT_models:
+            (v_lo,v_hi,slope,intercept) = self.LVRT_models[curve]
+            segment = np.minimum(np.searchsorted(v_hi,vmag_pu,side='left'),len(v_hi)-1)
+            action_time = 1000*(slope[segment]*vmag_pu + intercept[segment])
+            disc_time[curve] = np.where(vmag_pu > v_hi[-1],np.inf,action_time)
+        return disc_time
+
+
+    def get_DGexposure(self,vmag_series,time_step):
+        #This subroutine calculates the cumulative exposure of the DGs to the
+        #LVRT curves along a voltage time series.
+        #vmag_series - (n_steps x n_DGs) array with the voltages [pu]
+        #time_step - time between two values of the series [s]
+        #At each step, the exposure grows by time_step/(actuation time) and it
+        #restarts whenever the voltage gets above the curve. The DG is 
+        #disconnected when the exposure reaches 1.
+        #It returns a dictionary with the (exposure, disconnection time [s]) of
+        #each LVRT curve: a (n_steps x n_DGs) array and a n_DGs array (infinite
+        #for the DGs not disconnected).
+
+        vmag_series = np.asarray(vmag_series,dtype=float)
+        if vmag_series.ndim < 2:
+            vmag_series = vmag_series.reshape(-1,1)
+        exposure = dict()
+        for (curve,action_time) in self.get_DGprotactiontimes(vmag_series).items():
+            #Exposure of each step (an instantaneous actuation counts as 1):
+            with np.errstate(divide='ignore'):
+                step_exposure = np.where(action_time > 0,1000*time_step/action_time,1.0)
+            step_exposure = np.minimum(step_exposure,1.0)
+            #Cumulative sum restarted at the steps above the curve:
+            total = np.cumsum(step_exposure,axis=0)
+            restart = np.maximum.accumulate(np.where(np.isinf(action_time),total,0),axis=0)
+            curve_exposure = total - restart
+            #Disconnection times:
+            disconnected = curve_exposure >= 1 - 1e-9    #(rounding tolerance)
+            disc_step = np.argmax(disconnected,axis=0)
+            disc_time = np.where(disconnected.any(axis=0),(disc_step+1)*time_step,np.inf)
+            exposure[curve] = (curve_exposure,disc_time)
+        return exposure
+
+
+    def get_DGvmin(self):
+        #This subroutine gets the minimum voltage [pu] in the bus of each DG (in
+        #the self.allDGs order) for the current solution.
+
+        Vmin_pu = self.calc_minvbus()
+        return np.array([Vmin_pu[self.bus_index[self.PC_elements[dg][2][0]]] for dg in self.allDGs])
+
+
 ###############################################################################
 #Circuit Graphics methods:
 ###############################################################################
@@ -1775,8 +2029,7 @@ class DSS(object):
         #Creating the X-axis ticks:
         X_axis_ticks = ['' for x in range(self.n_Buses)]
         for i,bus in enumerate(self.allBuses):
-            self.dssCircuit.SetActiveBus(bus)
-            X_axis_ticks[i] = bus + "\n("+str(len(self.dssBus.Nodes))+")"
+            X_axis_ticks[i] = bus + "\n("+str(self.bus_n_nodes[i])+")"
         #Calculating how many figures will be plotted in order to plot a max
         #amount of 10 buses per plot and trying to plot the same number of buses
         #voltages in all figures.
@@ -1947,31 +2200,14 @@ class DSS(object):
             
 
     def get_allvbus(self):
-        #This subroutine gets the voltages in all nodes of the circuit:
+        #This subroutine gets the voltages [pu] in all nodes of the circuit:
         #In case one phase is not defined for a specific bus, the voltage returned
         #for that phase will be zero.
+        #The values are taken from the snapshot of the current solution, one 
+        #NumPy array for each phase (in the self.allBuses order).
 
-        #Creating the lists that will contain all voltage values by phase:
-        VA_ = [0 for x in range(self.n_Buses)]
-        VB_ = [0 for x in range(self.n_Buses)]
-        VC_ = [0 for x in range(self.n_Buses)]
-        #Getting the voltage value by node in each bus:
-        for i in range(self.n_Buses):
-            #Setting the active bus:
-            active_bus = self.allBuses[i]
-            self.dssCircuit.SetActiveBus(active_bus)
-            for j in range(len(self.dssBus.Nodes)):
-                active_node = self.dssBus.Nodes[j]
-                #VA_:
-                if active_node==1:
-                    VA_[i] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[active_bus]*1000),6)
-                #VB_:
-                elif active_node==2:
-                    VB_[i] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[active_bus]*1000),6)
-                #VC_:  
-                elif active_node==3:
-                    VC_[i] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[active_bus]*1000),6)
-        return [VA_,VB_,VC_]
+        V_abc = self.get_snapshot().V_abc
+        return [V_abc[0].copy(),V_abc[1].copy(),V_abc[2].copy()]
 
 
     def get_minvbus(self,buses_selected=list()):
@@ -1981,66 +2217,89 @@ class DSS(object):
         if buses_selected==list():
             buses_selected=self.allBuses
             
+        #Min voltage values of all buses:
+        Vmin_pu = self.calc_minvbus()
         #Creating the dictionay that will contain the  min voltage values in each bus:
         VABC_min = dict()
-        #self.dssText.Command = "show voltages ln nodes"
-        #Getting the voltage values by node in each bus:
         for bus in buses_selected:
-            #Setting the active bus:
-            self.dssCircuit.SetActiveBus(bus)
-            VABC = list()
-            for j in range(len(self.dssBus.Nodes)):
-                active_node = self.dssBus.Nodes[j]
-                if active_node in [1,2,3] and math.isnan(self.dssBus.VMagAngle[2*j]) == False and self.dssBus.VMagAngle[2*j] > 0:
-                    VABC.append(self.dssBus.VMagAngle[2*j])
-            if len(VABC)>0:
-                VABC_min[bus] = round(min(VABC)/(self.bus_kvbases[bus]*1000),9)
+            Vmin = Vmin_pu[self.bus_index[bus]]
+            if not np.isnan(Vmin):
+                VABC_min[bus] = round(float(Vmin),9)
             else: 
                 #If something is very weird, say that the bus has 1 pu, this way
                 #it won't cause any harm. Also pray for it not to happen.
                 VABC_min[bus] = 1 
                 print('\nWarning: Bus with len(VABC_min)==0!')
-                print(bus,self.dssBus.VMagAngle)
+                print(bus)
         return VABC_min
+
+
+    def calc_minvbus(self,vmag=None,buses_mask=None):
+        # This subroutine calculates the minimum voltage [pu] of the phases A, B
+        # and C in each bus with a segmented reduction over the node voltages.
+        # vmag - node voltage magnitudes [V] in the self.allNodes order (e.g. a
+        # stored AllBusVmag array). If None, the current solution is used.
+        # buses_mask - boolean array (self.allBuses order) of the buses selected.
+        # It returns an array with the values of all buses (or the selected ones).
+        # The nodes with zero voltage are skipped, unless all phase A, B and C
+        # nodes of the bus have zero voltage (a de-energized bus gets 0). Buses
+        # with no valid node voltage (NaN) get NaN.
+
+        if vmag is None:
+            vmag = self.get_snapshot().node_vmag
+        vmag = np.asarray(vmag,dtype=float)[self.node_sort]
+        #Just the valid phase A, B and C nodes are considered:
+        abc = self.node_abc[self.node_sort] & ~np.isnan(vmag)
+        valid = abc & (vmag > 0)
+        vmag = np.where(valid,vmag,np.inf)
+        Vmin = np.full(self.n_Buses,np.inf)
+        has_nodes = self.bus_n_nodes > 0
+        if len(vmag) > 0:
+            Vmin[has_nodes] = np.minimum.reduceat(vmag,self.bus_node_start[has_nodes])
+            #De-energized buses:
+            zero = np.zeros(self.n_Buses,dtype=bool)
+            zero[has_nodes] = np.logical_or.reduceat(abc & ~valid,self.bus_node_start[has_nodes])
+            Vmin[np.isinf(Vmin) & zero] = 0.0
+        Vmin[np.isinf(Vmin)] = np.nan
+        Vmin_pu = Vmin/self.bus_vbase
+        if buses_mask is not None:
+            return Vmin_pu[buses_mask]
+        return Vmin_pu
  
     
     def get_vbus(self,the_bus):
         #This subroutine gets the voltages in all nodes for a specific bus.
+        #The values are taken from the voltages snapshot of the current solution.
 
         #Creating the list that will contain all voltage values by phase:
         V_bus = dict()
         for ph in ['A','B','C']:
             V_bus['V'+ph] = 0
-        #Getting the voltage value by node in each bus:
-        for bus in self.allBuses:
-            if bus == the_bus:
-                #Setting the active bus:
-                self.dssCircuit.SetActiveBus(bus)
-                for j in range(len(self.dssBus.Nodes)):
-                    active_node = self.dssBus.Nodes[j]
-                    #VA_:
-                    if active_node==1:
-                        V_bus['VA'] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[bus]*1000),6)
-                    #VB_:
-                    elif active_node==2:
-                        V_bus['VB'] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[bus]*1000),6)
-                    #VC_:  
-                    elif active_node==3:
-                        V_bus['VC'] = round(self.dssBus.VMagAngle[2*j]/(self.bus_kvbases[bus]*1000),6)
+        if the_bus in self.bus_index:
+            V_abc = self.get_snapshot().V_abc
+            i = self.bus_index[the_bus]
+            for j,ph in enumerate(['A','B','C']):
+                V_bus['V'+ph] = float(V_abc[j,i])
         return V_bus
-    
+
+
+    def get_vbuses(self,bus_list):
+        #This subroutine gets the voltages in all nodes for each bus in bus_list
+        #and returns them in a dictionary (bus: V_bus, see get_vbus).
+        #No engine access is made after the first call for the same solution.
+
+        V_buses = dict()
+        for bus in bus_list:
+            V_buses[bus] = self.get_vbus(bus)
+        return V_buses
+
 
     def get_currents(self,ckt_element):
         #This subroutine gets the current values in all phases of the circuit 
         #element first terminal.
 
-        #Setting the active ckt element:
-        self.dssCircuit.SetActiveElement(ckt_element)        
-        currents = list()
-        for i in range(int(len(self.dssCktElement.CurrentsMagAng)/2)):
-            if i%2==0:
-                currents.append(self.dssCktElement.CurrentsMagAng[i])
-        return currents
+        I_mag = self.get_elements_currents([ckt_element])[0][0,0]
+        return [float(current) for current in I_mag[~np.isnan(I_mag)]]
 
 
     def get_ICCcurrent(self,ckt_element):
@@ -2048,13 +2307,120 @@ class DSS(object):
         #The ICC current given will be the one with the greatest value in all
         #phases and in both terminals.
         
-        #Setting the active ckt element:
-        self.dssCircuit.SetActiveElement(ckt_element)        
-        currents = list()
-        for i in range(len(self.dssCktElement.CurrentsMagAng)):
-            if i%2==0:
-                currents.append(self.dssCktElement.CurrentsMagAng[i])
-        return max(currents)
+        return float(self.get_ICCcurrents([ckt_element])[0])
+
+
+    def get_elements_currents(self,ckt_elements):
+        #This subroutine gets the currents of all terminals and conductors of the
+        #given circuit elements in one pass. It returns the (I_mag [A], I_ang 
+        #[deg]) arrays with shape (n_elements x n_terminals x n_conductors),
+        #with NaN where an element has less terminals/conductors (see 
+        #dss.snapshot.SolutionSnapshot.get_currents).
+
+        return self.get_snapshot().get_currents(ckt_elements)
+
+
+    def get_ICCcurrents(self,ckt_elements):
+        #This subroutine gets the ICC current value of each given circuit element
+        #(the greatest current in all phases and terminals) as an array.
+
+        I_mag = self.get_elements_currents(ckt_elements)[0]
+        I_mag = np.where(np.isnan(I_mag),-np.inf,I_mag)
+        return I_mag.reshape(len(ckt_elements),-1).max(axis=1)
+
+
+###############################################################################
+#Circuit edits methods:
+###############################################################################
+
+    def apply_edits(self,edits,solve=True):
+        # This subroutine applies a list of edits to the compiled circuit and
+        # solves it once at the end. Each edit is a tuple (action, element,
+        # values...) with the action in EDIT_ACTIONS, e.g.:
+        #   ('open','line.sw1'), ('load_kw','load.ld1',45.0),
+        #   ('tap','transformer.t1',1.025), ('disable','capacitor.c1')
+        # The circuit isn't compiled again and the solution starts from the
+        # voltages of the previous one (warm start). Only the derived data that
+        # depends on the open/closed state of the PD-elements is discarded (see
+        # SWITCHING_STAGES); it is calculated again on the next access.
+        # The snapshot of the new solution is returned (None if solve is False).
+
+        for edit in edits:
+            if edit[0] not in EDIT_ACTIONS:
+                raise ValueError("Unknown circuit edit: '"+str(edit[0])+"'. Available edits: "+", ".join(EDIT_ACTIONS))
+            getattr(self,EDIT_ACTIONS[edit[0]])(*edit[1:])
+        if not solve:
+            return None
+        self.solve()
+        return self.get_snapshot()
+
+
+    def open_switch(self,element,terminal=1):
+        # This subroutine opens all conductors of the given terminal of the PD
+        # element (e.g. a line-switch).
+
+        self.dssText.Command = 'Open '+element+' '+str(terminal)
+        self.set_element_open(element,True)
+
+
+    def close_switch(self,element,terminal=1):
+        # This subroutine closes all conductors of the given terminal of the PD
+        # element.
+
+        self.dssText.Command = 'Close '+element+' '+str(terminal)
+        self.set_element_open(element,False)
+
+
+    def set_load_kw(self,load,kw):
+        # This subroutine changes the active power [kW] of the given load.
+
+        self.dssText.Command = 'Edit '+load+' kW='+repr(float(kw))
+
+
+    def set_tap(self,transformer,tap,winding=2):
+        # This subroutine changes the tap [pu] of the given transformer winding.
+
+        self.dssText.Command = 'Edit '+transformer+' wdg='+str(winding)+' tap='+repr(float(tap))
+
+
+    def enable_element(self,element):
+        # This subroutine enables the given circuit element.
+
+        self.dssCircuit.Enable(element)
+        if element.lower() in self.PD_elements:
+            self.set_element_open(element,False)
+
+
+    def disable_element(self,element):
+        # This subroutine disables the given circuit element.
+
+        self.dssCircuit.Disable(element)
+        if element.lower() in self.PD_elements:
+            self.set_element_open(element,True)
+
+
+    def set_element_open(self,element,is_open):
+        # This subroutine stores the open/closed state of the PD element and, in
+        # case it changed, updates the topology walks and discards the derived
+        # data that depends on it (see SWITCHING_STAGES).
+
+        element = element.lower()
+        if is_open:
+            self.open_elements.add(element)
+        else:
+            self.open_elements.discard(element)
+        topo = self.topology
+        if element in topo.element_id and topo.set_open(topo.element_id[element],is_open):
+            self.invalidate(*SWITCHING_STAGES)
+
+
+    def set_topology_open(self):
+        # This subroutine opens the PD elements of self.open_elements in a new
+        # topology object (e.g. built again after the circuit edits).
+
+        for element in self.open_elements:
+            if element in self.topology.element_id:
+                self.topology.set_open(self.topology.element_id[element],True)
 
 
 #_______________________________________________________________________________
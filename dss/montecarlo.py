@@ -0,0 +1,291 @@
+# Native-python libs:
+import time
+import multiprocessing
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+from dss.master import DSS
+
+
+# Monte Carlo setup:
+# Sampling modes of the load and DG multipliers (the multiplier of each element
+# scales its base kW, or the irradiance of the PV systems):
+#   'gaussian'        - independent Gaussian multipliers (mean 1, std) for each
+#                       load and DG
+#   'gaussian_shared' - one Gaussian multiplier (mean 1, std) for all loads and
+#                       another one for all DGs (fully correlated elements)
+#   'uniform'         - independent uniform multipliers in [low, high] for each
+#                       load and DG
+# These are not the OpenDSS Monte Carlo solution modes (Set mode=M1, M2 or M3),
+# which vary the loads through the OpenDSS Random option and the load shapes
+# inside the engine; the trials here are snapshot solutions with the 
+# multipliers sampled by NumPy.
+MC_MODES = ['gaussian','gaussian_shared','uniform']
+# Property scaled by the multipliers of each element class:
+MC_PROPS = {'load': 'kW','generator': 'kW','pvsystem': 'irradiance'}
+# Quantities of each trial whose statistics are calculated:
+#   'vbus'    - voltage [pu] of all nodes (self.allNodes order)
+#   'loading' - loading [%] of all lines (current/NormalAmps)
+#   'losses'  - circuit losses [kW, kvar]
+MC_QUANTITIES = ['vbus','loading','losses']
+# State of each worker process of the parallel Monte Carlo run (see
+# DSS_montecarlo.run_montecarlo): its own DSS_montecarlo object.
+WORKER = dict()
+
+
+class RunningStats(object):
+    # Class RunningStats definitions:
+    # This class keeps the streaming statistics (number of samples, mean, sum of
+    # squared deviations, minimum and maximum) of a vector of quantities. The
+    # samples are added in blocks and merged with the Welford/Chan update, so
+    # the samples themselves are never kept.
+
+    def __init__(self,n_values):
+        #This subroutine initializes the statistics of n_values quantities.
+
+        self.n = 0
+        self.mean = np.zeros(n_values)
+        self.M2 = np.zeros(n_values)
+        self.min = np.full(n_values,np.inf)
+        self.max = np.full(n_values,-np.inf)
+
+
+    def update(self,samples):
+        #This subroutine adds a block of samples (n_samples x n_values array, or
+        #one sample) to the statistics.
+
+        samples = np.asarray(samples,dtype=float).reshape(-1,len(self.mean))
+        if len(samples) == 0:
+            return
+        block_mean = samples.mean(axis=0)
+        block_M2 = ((samples - block_mean)**2).sum(axis=0)
+        self.merge_values(len(samples),block_mean,block_M2,samples.min(axis=0),samples.max(axis=0))
+
+
+    def merge(self,other):
+        #This subroutine adds the statistics of other RunningStats object (e.g.
+        #calculated by other worker process).
+
+        self.merge_values(other.n,other.mean,other.M2,other.min,other.max)
+
+
+    def merge_values(self,n,mean,M2,vmin,vmax):
+        #This subroutine merges the statistics of n samples with the current
+        #ones (parallel update of the mean and squared deviations).
+
+        if n == 0:
+            return
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta*n/total
+        self.M2 = self.M2 + M2 + delta**2*self.n*n/total
+        self.n = total
+        self.min = np.minimum(self.min,vmin)
+        self.max = np.maximum(self.max,vmax)
+
+
+    def get_var(self):
+        #This subroutine returns the sample variance of each quantity.
+
+        if self.n < 2:
+            return np.full(len(self.mean),np.nan)
+        return self.M2/(self.n - 1)
+
+
+    def get_std(self):
+        #This subroutine returns the sample standard deviation of each quantity.
+
+        return np.sqrt(self.get_var())
+
+
+def sample_multipliers(rng,mode,n_trials,n_loads,n_dgs,std=0.1,bounds=(0.5,1.5)):
+    #This subroutine samples the multipliers of the loads and DGs of n_trials
+    #trials at once (see MC_MODES). It returns a (n_trials x (n_loads+n_dgs))
+    #array, with the loads first. Negative multipliers are set to zero.
+
+    mode = mode.lower()
+    if mode == 'gaussian':
+        multipliers = rng.normal(1.0,std,size=(n_trials,n_loads+n_dgs))
+    elif mode == 'gaussian_shared':
+        shared = rng.normal(1.0,std,size=(n_trials,2))
+        multipliers = np.repeat(shared,[n_loads,n_dgs],axis=1)
+    elif mode == 'uniform':
+        multipliers = rng.uniform(bounds[0],bounds[1],size=(n_trials,n_loads+n_dgs))
+    else:
+        raise ValueError("Unknown Monte Carlo mode: '"+mode+"'. Available modes: "+", ".join(MC_MODES))
+    return np.maximum(multipliers,0.0)
+
+
+class DSS_montecarlo(DSS):
+    # Class DSS_montecarlo definitions:
+    # This class runs Monte Carlo simulations of the circuit: in each trial the
+    # loads and DGs are scaled by random multipliers (see MC_MODES), the circuit
+    # is solved in the snapshot mode and the selected quantities are added to
+    # streaming statistics. The trials can be run by several worker processes,
+    # each one with its own engine and independent random streams.
+
+    def __init__(self, dssFileName, std_unit = 'km', Dssview_disable = False, engine = 'com', cache_dir = None, lazy = False):
+        #This subroutine initializes the DSS_montecarlo object.
+
+        DSS.__init__(self,dssFileName,std_unit,Dssview_disable,engine,cache_dir,lazy)
+        self.mc_base = None
+        #Arguments used to create the same object in the worker processes:
+        self.init_args = (dssFileName,std_unit,False,engine,cache_dir,lazy)
+
+
+    def get_mc_elements(self):
+        #This subroutine returns the loads and DGs scaled in the trials and the
+        #base value of their scaled property (read from the engine once).
+
+        if self.mc_base is None:
+            loads = [pc for pc in self.PC_elements if self.PC_elements[pc][0] == 'load']
+            dgs = [dg for dg in self.allDGs if self.allDGs[dg][0] in MC_PROPS]
+            base = list()
+            for element in loads + dgs:
+                self.dssText.Command = '? '+element+'.'+MC_PROPS[element.split('.')[0]]
+                base.append(float(self.dssText.Result))
+            self.mc_base = (loads,dgs,np.array(base))
+        return self.mc_base
+
+
+    def set_multipliers(self,multipliers):
+        #This subroutine scales the loads and DGs by the given multipliers (same
+        #order of get_mc_elements). Multipliers equal to 1 restore the base
+        #values.
+
+        (loads,dgs,base) = self.get_mc_elements()
+        values = base*multipliers
+        for i,element in enumerate(loads + dgs):
+            self.dssText.Command = 'Edit '+element+' '+MC_PROPS[element.split('.')[0]]+'='+repr(float(values[i]))
+
+
+    def get_mc_columns(self,quantities=MC_QUANTITIES):
+        #This subroutine returns the columns names of each quantity.
+
+        columns = dict()
+        for quantity in quantities:
+            if quantity == 'vbus':
+                columns[quantity] = list(self.allNodes)
+            elif quantity == 'loading':
+                columns[quantity] = ['line.'+line for line in self.allLines]
+            elif quantity == 'losses':
+                columns[quantity] = ['kW','kvar']
+            else:
+                raise ValueError("Unknown Monte Carlo quantity: '"+quantity+"'. Available quantities: "+", ".join(MC_QUANTITIES))
+        return columns
+
+
+    def run_trials(self,seed,n_trials,mode='gaussian',quantities=MC_QUANTITIES,std=0.1,bounds=(0.5,1.5)):
+        #This subroutine runs n_trials trials with the random stream of the given
+        #seed (an int or np.random.SeedSequence). The multipliers of all trials
+        #are sampled at once and the results are added to the statistics in one
+        #block. It returns the dictionary quantity: RunningStats and the number
+        #of trials whose solution didn't converge (not added to the statistics).
+
+        (loads,dgs,base) = self.get_mc_elements()
+        columns = self.get_mc_columns(quantities)
+        rng = np.random.default_rng(seed)
+        multipliers = sample_multipliers(rng,mode,n_trials,len(loads),len(dgs),std,bounds)
+        if 'loading' in quantities:
+            norm_amps = np.zeros(len(columns['loading']))
+            for i,element in enumerate(columns['loading']):
+                self.dssCircuit.SetActiveElement(element)
+                norm_amps[i] = self.dssCktElement.NormalAmps
+            norm_amps[norm_amps <= 0] = np.nan
+        results = dict((quantity,np.zeros((n_trials,len(columns[quantity])))) for quantity in quantities)
+        converged = np.zeros(n_trials,dtype=bool)
+        for trial in range(n_trials):
+            self.set_multipliers(multipliers[trial])
+            self.solve()
+            snapshot = self.get_snapshot()
+            converged[trial] = snapshot.converged
+            for quantity in quantities:
+                if quantity == 'vbus':
+                    results[quantity][trial] = snapshot.node_vmag/self.node_vbase
+                elif quantity == 'loading':
+                    results[quantity][trial] = 100*self.get_ICCcurrents(columns['loading'])/norm_amps
+                elif quantity == 'losses':
+                    results[quantity][trial] = snapshot.losses
+        #Back to the base values:
+        self.set_multipliers(np.ones(len(base)))
+        stats = dict()
+        for quantity in quantities:
+            stats[quantity] = RunningStats(len(columns[quantity]))
+            stats[quantity].update(results[quantity][converged])
+        return (stats,int(np.count_nonzero(~converged)))
+
+
+    def run_montecarlo(self,n_trials,mode='gaussian',quantities=MC_QUANTITIES,std=0.1,bounds=(0.5,1.5),seed=None,
+                       n_workers=1,chunk_size=100):
+        #This subroutine runs a Monte Carlo simulation.
+        #n_trials - number of trials
+        #mode - sampling mode of the multipliers (see MC_MODES)
+        #quantities - quantities whose statistics are calculated (see MC_QUANTITIES)
+        #std - standard deviation of the Gaussian multipliers ('gaussian' and
+        #'gaussian_shared')
+        #bounds - limits of the uniform multipliers ('uniform')
+        #seed - seed of the simulation (None for a random one)
+        #n_workers - number of worker processes (1: the trials are run by this
+        #object; None: number of CPUs). The engine must be given by name (see
+        #dss.engine) to use more than one worker.
+        #chunk_size - number of trials of each chunk. Each chunk has its own
+        #random stream (spawned from the seed), so the results of a seed don't
+        #depend on the number of workers.
+        #The results are stored in:
+        #   self.mc_stats      - dictionary quantity: RunningStats
+        #   self.mc_columns    - dictionary quantity: columns names
+        #   self.mc_seed       - entropy of the seed used (to repeat the run)
+        #   self.mc_failed     - number of trials that didn't converge
+        #The self.mc_stats dictionary is returned.
+
+        if mode.lower() not in MC_MODES:
+            raise ValueError("Unknown Monte Carlo mode: '"+mode+"'. Available modes: "+", ".join(MC_MODES))
+        self.mc_columns = self.get_mc_columns(quantities)
+        seed_seq = np.random.SeedSequence(seed)
+        chunks = [min(chunk_size,n_trials-i) for i in range(0,n_trials,chunk_size)]
+        chunk_seeds = seed_seq.spawn(len(chunks))
+        tasks = [(chunk_seeds[i],chunks[i],mode,list(quantities),std,bounds) for i in range(len(chunks))]
+        if n_workers is None:
+            n_workers = multiprocessing.cpu_count()
+        n_workers = max(1,min(n_workers,len(chunks)))
+        if n_workers > 1 and not isinstance(self.init_args[3],str):
+            raise ValueError("The parallel Monte Carlo run needs the DSS engine given by name or 'package.module:factory' import path (see dss.engine).")
+        self.mc_stats = dict((quantity,RunningStats(len(self.mc_columns[quantity]))) for quantity in quantities)
+        self.mc_failed = 0
+        start_time = time.perf_counter()
+        if n_workers == 1:
+            results = (self.run_trials(*task) for task in tasks)
+            self.merge_mc_results(results)
+        else:
+            with multiprocessing.Pool(n_workers,initializer=init_mc_worker,initargs=(self.init_args,)) as pool:
+                self.merge_mc_results(pool.imap_unordered(run_mc_chunk,tasks))
+        wall_time = time.perf_counter() - start_time
+        self.mc_seed = seed_seq.entropy
+        print('\nMonte Carlo simulation:',n_trials,'trials in',round(wall_time,2),'[s] with',n_workers,'workers ('+str(round(n_trials/max(wall_time,1e-9),1))+' trials/s),',self.mc_failed,'not converged')
+        return self.mc_stats
+
+
+    def merge_mc_results(self,results):
+        #This subroutine merges the statistics of each chunk of trials as soon as
+        #they are received.
+
+        for (stats,n_failed) in results:
+            for quantity in stats:
+                self.mc_stats[quantity].merge(stats[quantity])
+            self.mc_failed += n_failed
+
+
+def init_mc_worker(init_args):
+    #This subroutine initializes a worker process of the parallel Monte Carlo
+    #run: it creates the DSS_montecarlo object (and its engine).
+
+    WORKER['dss'] = DSS_montecarlo(*init_args)
+
+
+def run_mc_chunk(task):
+    #This subroutine runs one chunk of trials in a worker process (see
+    #DSS_montecarlo.run_trials).
+
+    return WORKER['dss'].run_trials(*task)
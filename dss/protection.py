@@ -0,0 +1,334 @@
+# Native-python libs:
+import heapq
+import time
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+from dss.faultanalysis import DSS_Faultanalysis
+
+
+# Reclosing sequence setup:
+# Curve types used by each kind of protection device. The reclosers use the
+# fast curve in the first n_fast operations and the delayed one after them.
+DEVICE_CURVES = {'fuse': ['fusecurve'], 'recloser': ['phasefast','phasedelayed'],
+                 'relay': ['phasecurve']}
+# Curve types used in the coordination check (backup curves): the fuses own
+# curve, the reclosers delayed curve and the relays phase curve.
+COORD_CURVES = ['fusecurve','phasedelayed','phasecurve']
+
+
+class DSS_protection(DSS_Faultanalysis):
+    # Class DSS_protection definitions:
+    # This class analyses the protection devices of the circuit using the fault
+    # study results (see DSS_Faultanalysis) and the TCC models (see
+    # DSS.buid_TCCmodels): coordination of the upstream/downstream devices pairs
+    # and simulation of the reclosing sequences.
+
+    def invalidate(self,*stages):
+        #This subroutine discards the attributes of the given init stages (see
+        #DSS.invalidate) and the protection zones sets built from them (see
+        #get_zone_set).
+
+        invalid = DSS_Faultanalysis.invalidate(self,*stages)
+        if 'interrupt' in invalid:
+            self.__dict__.pop('zone_sets',None)
+        return invalid
+
+
+    def get_coordination_pairs(self):
+        #This subroutine finds the (upstream, downstream) protection devices pairs:
+        #the upstream device of each device is the nearest one whose protection
+        #zone (self.Protect_interrupt) contains its zone in the feeder tree.
+        #Devices with the same zone (e.g. in the same PD element) are not paired.
+
+        topo = self.topology
+        zones = self.Protect_interrupt
+        #Position of each device in the tree: the first bus of its zone.
+        heads = dict()
+        for device in zones:
+            if len(zones[device]) > 0:
+                zone_ids = np.array(topo.get_ids(zones[device]),dtype=np.int64)
+                heads[device] = int(zone_ids[np.argmin(topo.tin[zone_ids])])
+        #Devices in the tree order, with a stack of the devices upstream:
+        devices = sorted(heads,key=lambda device: (topo.tin[heads[device]],-topo.tout[heads[device]]))
+        pairs = list()
+        stack = list()
+        for device in devices:
+            head = heads[device]
+            while stack and not (topo.tin[heads[stack[-1]]] <= topo.tin[head] < topo.tout[heads[stack[-1]]]):
+                stack.pop()
+            if stack and heads[stack[-1]] != head:
+                pairs.append((stack[-1],device))
+            stack.append(device)
+        return pairs
+
+
+    def check_coordination(self,cti=300,curve_types=COORD_CURVES):
+        #This subroutine checks the coordination of all protection devices pairs.
+        #For each pair, the faults of the downstream device zone are used (see
+        #run_faults): each device TCC is evaluated with the current it sees in
+        #each fault, so the transformers and the DG infeed between the devices
+        #are taken into account. Only the faults cleared by the downstream
+        #device (finite action time) are checked.
+        #cti - minimum coordination time interval [ms]
+        #curve_types - curve types considered (see get_devices_actiontimes). By
+        #default, the backup curves (see COORD_CURVES), so the fuse-saving fast
+        #curves of the reclosers are not taken as miscoordination. None takes
+        #the fastest curve of each device.
+        #The results are stored in:
+        #   self.coord_pairs       - (upstream, downstream) devices (n_pairs)
+        #   self.coord_margins     - (n_buses x n_types x n_pairs) time intervals
+        #                            [ms] (upstream time - downstream time) of
+        #                            the faults of self.fault_currents, NaN for
+        #                            the faults not checked
+        #   self.coord_min_margin  - smallest time interval of each pair [ms]
+        #   self.coord_violations  - pairs with a time interval smaller than cti
+        #The list of violations is returned.
+
+        if 'fault_currents' not in self.__dict__:
+            self.run_faults()
+        pairs = self.get_coordination_pairs()
+        (n_buses,n_types,n_devices) = self.fault_currents.shape
+        #Faults in the zone of each device (n_devices x n_faults), with the
+        #faults in the order of the flattened (n_buses x n_types) arrays:
+        device_index = dict((device,j) for (j,device) in enumerate(self.fault_devices))
+        bus_pos = dict((bus,i) for (i,bus) in enumerate(self.fault_buses))
+        in_zone = np.zeros((n_devices,n_buses),dtype=bool)
+        for device in self.fault_devices:
+            rows = [bus_pos[bus] for bus in self.Protect_interrupt[device] if bus in bus_pos]
+            in_zone[device_index[device],rows] = True
+        in_zone = np.repeat(in_zone,n_types,axis=1)
+        #Action times of all devices in all faults (one pass):
+        Icc = self.fault_currents.reshape(-1,n_devices)
+        times = self.get_devices_actiontimes(self.fault_devices,np.nan_to_num(Icc),curve_types)
+        up = np.array([device_index[pair[0]] for pair in pairs],dtype=np.int64)
+        down = np.array([device_index[pair[1]] for pair in pairs],dtype=np.int64)
+        t_up = times[:,up]
+        t_down = times[:,down]
+        checked = in_zone[down].T & ~np.isnan(Icc[:,down]) & np.isfinite(t_down)
+        with np.errstate(invalid='ignore'):
+            margins = t_up - t_down
+        #Upstream devices that never act are coordinated:
+        margins[np.isinf(t_up)] = np.inf
+        margins[~checked] = np.nan
+        #Pairs with faults checked:
+        valid = checked.any(axis=0)
+        self.coord_pairs = [pair for (pair,ok) in zip(pairs,valid) if ok]
+        self.coord_margins = margins[:,valid].reshape(n_buses,n_types,-1)
+        self.coord_min_margin = np.where(checked[:,valid],margins[:,valid],np.inf).min(axis=0) if Icc.shape[0] > 0 else np.zeros(0)
+        self.coord_violations = [pair for (pair,margin) in zip(self.coord_pairs,self.coord_min_margin) if margin < cti]
+        print('\nCoordination check:',len(self.coord_pairs),'pairs,',len(self.coord_violations),'violations (CTI = '+str(cti)+' ms)')
+        return self.coord_violations
+
+
+    def get_sequence_times(self,fault_currents):
+        #This subroutine calculates the action times [s] of all curves used in the
+        #reclosing sequences (see DEVICE_CURVES) for the given fault currents.
+        #fault_currents - (n_faults x n_devices) array (self.fault_devices order)
+        #It returns a dictionary with one (n_faults x n_devices) array for each
+        #curve type (infinite where the device doesn't have the curve).
+
+        Icc = np.nan_to_num(np.asarray(fault_currents,dtype=float).reshape(-1,len(self.fault_devices)))
+        curve_times = dict()
+        for curve_type in set(sum(DEVICE_CURVES.values(),[])):
+            curve_times[curve_type] = self.get_devices_actiontimes(self.fault_devices,Icc,[curve_type])/1000
+        return curve_times
+
+
+    def get_state_currents(self,fault_bus,fault_type,open_elements,fault_active,state_cache=None):
+        #This subroutine solves the circuit with the given PD elements open (the
+        #switched objects of the devices that operated) and the fault placed
+        #(fault_active) or removed, and returns the current seen by each device
+        #(self.fault_devices order) as a list. The elements are closed and the
+        #fault is removed again afterwards, without a new solution.
+        #state_cache - dictionary with the currents of the states already solved
+        #(the state without the fault is the same for all faults).
+
+        key = (fault_bus,fault_type,open_elements) if fault_active else (None,None,open_elements)
+        if state_cache is not None and key in state_cache:
+            return state_cache[key]
+        if fault_active:
+            self.place_fault(fault_bus,fault_type)
+        else:
+            self.remove_fault()
+        self.apply_edits([('open',element) for element in sorted(open_elements)])
+        monitored = self.get_fault_devices()[1]
+        currents = np.maximum(np.nan_to_num(self.get_ICCcurrents(monitored),neginf=0.0),0.0).tolist()
+        self.apply_edits([('close',element) for element in sorted(open_elements)],solve=False)
+        self.remove_fault()
+        if state_cache is not None:
+            state_cache[key] = currents
+        return currents
+
+
+    def simulate_sequence(self,fault_bus,fault_type='3ph',fault_duration=np.inf,n_fast=1,max_time=60.0,curve_times=None,state_cache=None,restore=True):
+        #This subroutine simulates the operation sequence of the protection 
+        #devices for a fault, with a discrete-event scheduler (heapq): device
+        #trips (recloser/relay operations or fuse melting), reclosings and the
+        #end of a temporary fault.
+        #The currents of the faulted circuit with all devices closed are taken
+        #from the fault study (see run_faults). After each event that changes the
+        #circuit (a device opens or recloses, or the fault ends), the circuit is
+        #solved again with the switched objects of the open devices open (see
+        #get_state_currents), so the devices see the currents of the new 
+        #topology (e.g. no current downstream of an open device, the load 
+        #current after the fault is isolated or cleared).
+        #Each device accumulates dt/(action time) while it carries current (the
+        #reclosers and relays restart it at each operation) and acts when it
+        #reaches 1. The RecloseIntervals are given in seconds.
+        #fault_duration - time [s] after which the fault disappears (temporary)
+        #n_fast - number of recloser operations with the fast curve
+        #max_time - simulation time limit [s]
+        #curve_times - the get_sequence_times result of this fault (optional)
+        #state_cache - currents of the circuit states already solved (see
+        #get_state_currents), e.g. shared by the faults of simulate_sequences
+        #restore - if True, the pre-fault circuit is solved again at the end in
+        #case other states were solved.
+        #It returns the (sequence, I2t) tuple: the list of (time [s], device,
+        #action) events and the I2t [A2s] accumulated by each device.
+
+        if 'fault_currents' not in self.__dict__:
+            self.run_faults()
+        if state_cache is None:
+            state_cache = dict()
+        n_states = len(state_cache)
+        i = self.fault_buses.index(fault_bus)
+        k = self.fault_types.index(fault_type)
+        fault_currents = np.nan_to_num(self.fault_currents[i,k]).tolist()
+        if curve_times is None:
+            curve_times = self.get_sequence_times(fault_currents)
+            curve_times = dict((curve_type,curve_times[curve_type][0]) for curve_type in curve_times)
+        devices = self.fault_devices
+        n_devices = len(devices)
+        kinds = [self.Protect_elements[device][0] for device in devices]
+        switched = [self.Protect_elements[device][2] for device in devices]
+        intervals = [list(self.Protect_elements[device][4]) if isinstance(self.Protect_elements[device][4],list) else list() for device in devices]
+        #Devices state:
+        status = ['closed']*n_devices
+        shots = [0]*n_devices
+        exposure = [0.0]*n_devices
+        i2t = [0.0]*n_devices
+        version = [0]*n_devices
+        action_time = [np.inf]*n_devices
+        sequence = list()
+        events = list()
+        counter = 0
+        if np.isfinite(fault_duration):
+            heapq.heappush(events,(fault_duration,counter,'fault_end',-1,0))
+            counter += 1
+        fault_active = True
+        state = None
+        t = 0.0
+        while True:
+            #Currents of the circuit state (solved again when it changes):
+            open_elements = frozenset(switched[j] for j in range(n_devices) if status[j] != 'closed')
+            if (open_elements,fault_active) != state:
+                state = (open_elements,fault_active)
+                if state == (frozenset(),True):
+                    (currents,times) = (fault_currents,curve_times)
+                else:
+                    currents = self.get_state_currents(fault_bus,fault_type,open_elements,fault_active,state_cache)
+                    times = self.get_sequence_times(currents)
+                    times = dict((curve_type,times[curve_type][0]) for curve_type in times)
+            #Devices action times:
+            for j in range(n_devices):
+                version[j] += 1
+                action_time[j] = np.inf
+                if status[j] != 'closed' or currents[j] <= 0:
+                    continue
+                if kinds[j] == 'recloser':
+                    curve_type = 'phasefast' if shots[j] < n_fast else 'phasedelayed'
+                else:
+                    curve_type = DEVICE_CURVES.get(kinds[j],['phasecurve'])[0]
+                action_time[j] = float(times[curve_type][j])
+                if np.isfinite(action_time[j]):
+                    heapq.heappush(events,(t+max(0.0,1.0-exposure[j])*action_time[j],counter,'trip',j,version[j]))
+                    counter += 1
+            #Next valid event:
+            event = None
+            while events:
+                event = heapq.heappop(events)
+                if event[2] != 'trip' or event[4] == version[event[3]]:
+                    break
+                event = None
+            if event is None or event[0] > max_time:
+                break
+            (t_event,count,action,j,ver) = event
+            #Exposure and I2t accumulated until the event:
+            dt = t_event - t
+            if dt > 0:
+                for jj in range(n_devices):
+                    if status[jj] == 'closed' and currents[jj] > 0:
+                        i2t[jj] += currents[jj]**2*dt
+                        if np.isfinite(action_time[jj]):
+                            exposure[jj] += dt/action_time[jj]
+            t = t_event
+            #Event actions:
+            if action == 'fault_end':
+                fault_active = False
+                sequence.append((t,None,'fault_end'))
+            elif action == 'reclose':
+                status[j] = 'closed'
+                sequence.append((t,devices[j],'reclose'))
+            elif kinds[j] == 'fuse':
+                status[j] = 'melted'
+                sequence.append((t,devices[j],'melt'))
+            else:
+                shots[j] += 1
+                exposure[j] = 0.0
+                if shots[j] > len(intervals[j]):
+                    status[j] = 'lockout'
+                    sequence.append((t,devices[j],'lockout'))
+                else:
+                    status[j] = 'open'
+                    sequence.append((t,devices[j],'trip'))
+                    heapq.heappush(events,(t+intervals[j][shots[j]-1],counter,'reclose',j,0))
+                    counter += 1
+        #Back to the pre-fault condition:
+        if restore and len(state_cache) > n_states:
+            self.solve()
+        return (sequence,dict(zip(devices,[float(value) for value in i2t])))
+
+
+    def simulate_sequences(self,faults=None,fault_duration=np.inf,n_fast=1,max_time=60.0):
+        #This subroutine simulates the operation sequences (see simulate_sequence)
+        #of several faults. The curves action times of all faults are calculated
+        #in a single vectorised pass before the simulations, and the circuit 
+        #states solved during the sequences are shared by all faults.
+        #faults - list of (bus, fault type). If None, all faults placed by the
+        #fault study are simulated.
+        #It returns a dictionary: (bus, fault type): (sequence, I2t).
+
+        if 'fault_currents' not in self.__dict__:
+            self.run_faults()
+        if faults is None:
+            faults = [(bus,fault_type) for (i,bus) in enumerate(self.fault_buses)
+                      for (k,fault_type) in enumerate(self.fault_types) if self.fault_placed[i,k]]
+        rows = [(self.fault_buses.index(bus),self.fault_types.index(fault_type)) for (bus,fault_type) in faults]
+        start_time = time.perf_counter()
+        currents = np.array([self.fault_currents[i,k] for (i,k) in rows]).reshape(len(rows),len(self.fault_devices))
+        curve_times = self.get_sequence_times(currents)
+        state_cache = dict()
+        results = dict()
+        for (n,(bus,fault_type)) in enumerate(faults):
+            fault_times = dict((curve_type,curve_times[curve_type][n]) for curve_type in curve_times)
+            results[(bus,fault_type)] = self.simulate_sequence(bus,fault_type,fault_duration,n_fast,max_time,fault_times,state_cache,restore=False)
+        #Back to the pre-fault condition:
+        if len(state_cache) > 0:
+            self.solve()
+        elapsed = time.perf_counter() - start_time
+        print('\nReclosing sequences:',len(faults),'faults simulated in',round(elapsed,3),'[s] ('+str(round(len(faults)/max(elapsed,1e-9),1))+' faults/s,',len(state_cache),'circuit states solved)')
+        return results
+
+
+    def get_zone_set(self,device):
+        #This subroutine returns the protection zone of the device as a set (the
+        #sets are built once).
+
+        if 'zone_sets' not in self.__dict__:
+            self.zone_sets = dict()
+        if device not in self.zone_sets:
+            self.zone_sets[device] = set(self.Protect_interrupt[device])
+        return self.zone_sets[device]
@@ -0,0 +1,210 @@
+# Native-python libs:
+import os
+import json
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+
+
+# Results store setup:
+# Each dataset of a store (e.g. 'vbus') is a table with one row for each
+# simulation step (or sweep case) and one column for each bus/element. The rows
+# are kept in a buffer of chunk_rows rows and written in chunk files with the
+# columns as the first axis (<dataset>/chunk_000000.npy, ...), so each column of
+# a chunk is contiguous in the file. Reading one column of the whole dataset
+# maps every chunk file (np.load with mmap_mode) and copies just that column.
+# With compress=True the chunks are saved as compressed .npz files instead
+# (smaller, but they can't be memory-mapped).
+# The datasets, columns names and ids (bus/element ids of the circuit topology)
+# and the number of rows of each chunk are saved in the store.json file, so new
+# rows can be appended to an existing store (e.g. by a later simulation run).
+STORE_VERSION = 1
+
+
+class ResultsStore(object):
+    # Class ResultsStore definitions:
+    # This class writes and reads the columnar results files of a folder.
+
+    def __init__(self, folder, chunk_rows=1000, compress=False, overwrite=False):
+        #This subroutine opens the store of the given folder (a new one is created
+        #in case the folder doesn't have a store.json file).
+        #overwrite - if True, the chunk files of an existing store are deleted
+        #and a new store is created.
+
+        self.folder = folder
+        self.buffers = dict()
+        self.buffer_rows = dict()
+        meta_file = os.path.join(folder, 'store.json')
+        if overwrite and os.path.isfile(meta_file):
+            with open(meta_file) as inFile:
+                old_meta = json.load(inFile)
+            for dataset in old_meta['datasets']:
+                for file_name in os.listdir(os.path.join(folder, dataset)):
+                    if file_name.startswith('chunk_'):
+                        os.remove(os.path.join(folder, dataset, file_name))
+            os.remove(meta_file)
+        if os.path.isfile(meta_file):
+            with open(meta_file) as inFile:
+                self.meta = json.load(inFile)
+        else:
+            os.makedirs(folder, exist_ok=True)
+            self.meta = {'version': STORE_VERSION, 'chunk_rows': int(chunk_rows), 'compress': bool(compress),
+                         'datasets': dict()}
+
+
+    def add_dataset(self, dataset, columns, ids=None, dtype='float32'):
+        #This subroutine creates a new dataset (an existing one is kept).
+        #columns - names of the columns (e.g. buses or elements)
+        #ids - topology id of each column (e.g. Topology.bus_id values)
+
+        if dataset in self.meta['datasets']:
+            return
+        if ids is None:
+            ids = list(range(len(columns)))
+        self.meta['datasets'][dataset] = {'columns': list(columns), 'ids': [int(i) for i in ids],
+                                          'dtype': np.dtype(dtype).name, 'n_rows': 0, 'chunks_rows': list()}
+        os.makedirs(os.path.join(self.folder, dataset), exist_ok=True)
+        self.save_meta()
+
+
+    def append(self, dataset, values):
+        #This subroutine appends one row (1-D array) or several rows (2-D array)
+        #to the dataset. The rows are written to disk when a chunk is complete.
+        #Datasets without columns (e.g. the DGs of a circuit with no DG) keep no
+        #rows.
+
+        info = self.meta['datasets'][dataset]
+        if len(info['columns']) == 0:
+            return
+        values = np.asarray(values).reshape(-1, len(info['columns']))
+        if dataset not in self.buffers:
+            self.buffers[dataset] = np.zeros((self.meta['chunk_rows'], len(info['columns'])), dtype=info['dtype'])
+            self.buffer_rows[dataset] = 0
+        start = 0
+        while start < len(values):
+            row = self.buffer_rows[dataset]
+            n = min(len(values)-start, self.meta['chunk_rows']-row)
+            self.buffers[dataset][row:row+n] = values[start:start+n]
+            self.buffer_rows[dataset] += n
+            start += n
+            if self.buffer_rows[dataset] == self.meta['chunk_rows']:
+                self.flush(dataset)
+
+
+    def flush(self, dataset=None):
+        #This subroutine writes the rows in the buffer of the dataset (or of all
+        #datasets) to a new chunk file.
+
+        datasets = [dataset] if dataset is not None else list(self.buffers)
+        for dataset in datasets:
+            n = self.buffer_rows.get(dataset, 0)
+            if n == 0:
+                continue
+            info = self.meta['datasets'][dataset]
+            chunk = np.ascontiguousarray(self.buffers[dataset][:n].T)
+            file_path = self.chunk_file(dataset, len(info['chunks_rows']))
+            if self.meta['compress']:
+                np.savez_compressed(file_path, values=chunk)
+            else:
+                np.save(file_path, chunk)
+            info['chunks_rows'].append(n)
+            info['n_rows'] += n
+            self.buffer_rows[dataset] = 0
+        self.save_meta()
+
+
+    def close(self):
+        #This subroutine writes all the rows still in the buffers.
+
+        self.flush()
+        self.buffers = dict()
+        self.buffer_rows = dict()
+
+
+    def save_meta(self):
+        #This subroutine saves the store.json file.
+
+        tmp_path = os.path.join(self.folder, 'store.json.' + str(os.getpid()) + '.tmp')
+        with open(tmp_path, 'w') as outFile:
+            json.dump(self.meta, outFile)
+        os.replace(tmp_path, os.path.join(self.folder, 'store.json'))
+
+
+    def chunk_file(self, dataset, i):
+        #This subroutine returns the file name of the i-th chunk of the dataset.
+
+        extension = '.npz' if self.meta['compress'] else '.npy'
+        return os.path.join(self.folder, dataset, 'chunk_%06d' % i + extension)
+
+
+    def load_chunk(self, dataset, i):
+        #This subroutine returns the i-th chunk (columns x rows array) of the
+        #dataset, memory-mapped when it is not compressed.
+
+        if self.meta['compress']:
+            with np.load(self.chunk_file(dataset, i)) as inFile:
+                return inFile['values']
+        return np.load(self.chunk_file(dataset, i), mmap_mode='r')
+
+
+    def get_columns(self, dataset):
+        #This subroutine returns the (columns names, ids) of the dataset.
+
+        info = self.meta['datasets'][dataset]
+        return (info['columns'], np.array(info['ids'], dtype=np.int64))
+
+
+    def n_rows(self, dataset):
+        #This subroutine returns the number of rows written in the dataset.
+
+        return self.meta['datasets'][dataset]['n_rows']
+
+
+    def get_positions(self, dataset, columns=None, ids=None):
+        #This subroutine returns the positions of the given columns (names or
+        #positions) or topology ids in the dataset.
+
+        info = self.meta['datasets'][dataset]
+        if ids is not None:
+            return np.flatnonzero(np.isin(info['ids'], ids))
+        if columns is None:
+            return np.arange(len(info['columns']))
+        name_pos = dict((name, j) for (j, name) in enumerate(info['columns']))
+        return np.array([name_pos[column] if isinstance(column, str) else column for column in columns], dtype=np.int64)
+
+
+    def read(self, dataset, columns=None, ids=None, rows=None):
+        #This subroutine reads the dataset and returns a (rows x columns) array.
+        #Only the chunks of the selected rows are read and, when the chunks are
+        #memory-mapped, only the selected columns of each chunk.
+        #columns - names or positions of the columns (default: all)
+        #ids - topology ids of the columns (used instead of columns, all the
+        #columns of each id are read, e.g. all the nodes of a bus)
+        #rows - slice of the rows (default: all)
+
+        info = self.meta['datasets'][dataset]
+        positions = self.get_positions(dataset, columns, ids)
+        (start, stop, step) = (rows if rows is not None else slice(None)).indices(info['n_rows'])
+        if step < 1:
+            raise ValueError("Only increasing rows slices can be read from the results store.")
+        #First row of each chunk (the last chunk of each run may be shorter):
+        offsets = np.append(0, np.cumsum(info['chunks_rows']))
+        parts = list()
+        for i in range(len(info['chunks_rows'])):
+            if offsets[i+1] <= start or offsets[i] >= stop:
+                continue
+            lo = max(start, offsets[i]) - offsets[i]
+            hi = min(stop, offsets[i+1]) - offsets[i]
+            parts.append(np.asarray(self.load_chunk(dataset, i)[positions, lo:hi]).T)
+        if len(parts) == 0:
+            return np.zeros((0, len(positions)), dtype=info['dtype'])
+        return np.concatenate(parts)[::step]
+
+
+    def column(self, dataset, column):
+        #This subroutine returns the whole series of one column (name or
+        #position) of the dataset.
+
+        return self.read(dataset, [column])[:, 0]
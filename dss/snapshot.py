@@ -0,0 +1,85 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+
+
+class SolutionSnapshot(object):
+    # Class SolutionSnapshot definitions:
+    # This class stores the results of one solution of the circuit (node
+    # voltages, losses, convergence info and element currents/powers) in NumPy
+    # arrays, so the query and plot methods of the DSS class don't need to read
+    # them from the engine again. A snapshot belongs to the solution_version of
+    # the DSS object that created it and it gets out of date when that number
+    # changes (new solution or circuit edit, see DSS.circuit_changed).
+
+    def __init__(self, dss):
+        #This subroutine reads the results of the current solution.
+        #dss - the DSS object (its node map and kV bases are used).
+
+        self.dss = dss
+        self.version = dss.solution_version
+        #Node voltages [V] in the dss.allNodes order (one engine read):
+        volts = np.asarray(dss.dssCircuit.AllBusVolts,dtype=float)
+        self.node_volts = volts[0::2] + 1j*volts[1::2]
+        self.node_vmag = np.abs(self.node_volts)
+        self.node_vang = np.degrees(np.angle(self.node_volts))
+        #Node map:
+        self.node_bus = dss.node_bus
+        self.node_phase = dss.node_phase
+        self.bus_n_nodes = dss.bus_n_nodes
+        #Voltages [pu] of the phases A, B and C of all buses (3 x n_Buses):
+        #In case one phase is not defined for a specific bus, its value is zero.
+        vmag_pu = np.round(self.node_vmag/dss.node_vbase,6)
+        self.V_abc = np.zeros((3,dss.n_Buses))
+        abc = dss.node_abc & ~np.isnan(vmag_pu)
+        self.V_abc[self.node_phase[abc]-1,self.node_bus[abc]] = vmag_pu[abc]
+        #Circuit losses [kW, kvar] and total power [kW, kvar]:
+        self.losses = np.asarray(dss.dssCircuit.Losses,dtype=float)/1000
+        self.total_power = np.asarray(dss.dssCircuit.TotalPower,dtype=float)
+        #Convergence info:
+        self.converged = bool(dss.dssSolution.Converged)
+        self.iterations = int(dss.dssSolution.Iterations)
+        #Element results (element: (CurrentsMagAng, Powers, n° of terminals)), 
+        #read on request:
+        self.elements = dict()
+
+
+    def is_valid(self):
+        #This subroutine checks if the snapshot belongs to the current solution.
+
+        return self.version == self.dss.solution_version
+
+
+    def get_element(self,ckt_element):
+        #This subroutine returns the (CurrentsMagAng, Powers, n° of terminals) of
+        #the given circuit element. They are read from the engine only once.
+
+        if ckt_element not in self.elements:
+            if not self.is_valid():
+                raise RuntimeError("The solution snapshot is out of date: the circuit was edited or solved again.")
+            self.dss.dssCircuit.SetActiveElement(ckt_element)
+            currents = np.asarray(self.dss.dssCktElement.CurrentsMagAng,dtype=float)
+            powers = np.asarray(self.dss.dssCktElement.Powers,dtype=float)
+            n_terminals = int(self.dss.dssCktElement.NumTerminals)
+            self.elements[ckt_element] = (currents,powers,n_terminals)
+        return self.elements[ckt_element]
+
+
+    def get_currents(self,ckt_elements):
+        #This subroutine returns the currents magnitude [A] and angle [deg] of the
+        #given circuit elements as two (n_elements x n_terminals x n_conductors)
+        #arrays, where n_terminals and n_conductors are the greatest ones among
+        #the elements. The positions an element doesn't have are NaN.
+
+        data = [self.get_element(ckt_element) for ckt_element in ckt_elements]
+        shapes = [(n_terminals,int(len(currents)/2/max(n_terminals,1))) for (currents,powers,n_terminals) in data]
+        n_terminals = max([shape[0] for shape in shapes] + [1])
+        n_conductors = max([shape[1] for shape in shapes] + [1])
+        I_magang = np.full((len(data),n_terminals,n_conductors,2),np.nan)
+        for i,(currents,powers,n_terms) in enumerate(data):
+            (nt,nc) = shapes[i]
+            I_magang[i,:nt,:nc] = currents[:nt*nc*2].reshape(nt,nc,2)
+        return (I_magang[:,:,:,0],I_magang[:,:,:,1])
@@ -0,0 +1,223 @@
+# Native-python libs:
+import os
+import re
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+
+
+# TCC models setup:
+# The time-current curves (TCC) of the protection devices are modeled in two
+# ways:
+# - ('points', c_lo, c_hi, slope, intercept): curves given by points (e.g. the
+#   TCC_Curve.dss file), interpolated linearly in log-log scale. c_lo and c_hi
+#   are the currents of each segment (sorted) and slope/intercept are the
+#   coefficients of log(t) = slope*log(I) + intercept.
+# - ('analytic', A, B, p, I_pickup, T_delay, T_mult): inverse-time curves given
+#   by t = T_delay + T_mult*(A/(M^p - 1) + B), where M = I/I_pickup.
+# Analytic inverse-time curves (curve name: (A, B, p)):
+# IEEE C37.112 (moderately, very and extremely inverse) and IEC 60255
+# (standard, very, extremely and long-time inverse).
+ANALYTIC_CURVES = {'ieee_mi': (0.0515, 0.114, 0.02),
+                   'ieee_vi': (19.61, 0.491, 2.0),
+                   'ieee_ei': (28.2, 0.1217, 2.0),
+                   'iec_si': (0.14, 0.0, 0.02),
+                   'iec_vi': (13.5, 0.0, 1.0),
+                   'iec_ei': (80.0, 0.0, 2.0),
+                   'iec_lti': (120.0, 0.0, 1.0)}
+# Curve files parsing:
+# One token of an OpenDSS command: [property=]value, where value may be an 
+# array between brackets, parentheses, braces or quotes.
+TOKEN = re.compile(r'\s*(?:([A-Za-z_][\w.]*)\s*=\s*)?(\[[^\]]*\]|\([^)]*\)|\{[^}]*\}|"[^"]*"|\'[^\']*\'|[^\s,=]+)\s*,?')
+# Positional properties of the curve classes (the x/y arrays are returned as
+# the C/T arrays of the TCC curves). Other classes are read with the 
+# TCC_Curve properties:
+CURVE_PROPS = {'tcc_curve': ['npts', 'c_array', 't_array'],
+               'xycurve': ['npts', 'points', 'yarray', 'xarray']}
+ARRAY_PROPS = {'c_array': 'c_array', 't_array': 't_array', 'xarray': 'c_array', 'yarray': 't_array'}
+# Classes of the curves read by default (TCC curves of the protection devices)
+# and of the LVRT curves of the DGs protection (any class, e.g. TCC_Curve or
+# XYCurve):
+TCC_CLASSES = ['tcc_curve']
+LVRT_CLASSES = None
+
+
+def points_model(currents, times):
+    #This subroutine builds the log-log interpolation model of a curve given by
+    #points (no fitting is made, each segment joins two consecutive points).
+    #Points with non-positive values and vertical segments (repeated currents)
+    #are discarded, keeping the first time of the repeated current.
+
+    currents = np.asarray(currents, dtype=float)
+    times = np.asarray(times, dtype=float)
+    valid = (currents > 0) & (times > 0)
+    currents = currents[valid]
+    times = times[valid]
+    order = np.argsort(currents, kind='stable')
+    currents = currents[order]
+    times = times[order]
+    #Removing the repeated currents:
+    new_value = np.append(True, np.diff(currents) > 0)
+    currents = currents[new_value]
+    times = times[new_value]
+    if len(currents) < 2:
+        raise ValueError("A TCC curve needs at least two points with different currents.")
+    log_c = np.log(currents)
+    log_t = np.log(times)
+    slope = np.diff(log_t)/np.diff(log_c)
+    intercept = log_t[:-1] - slope*log_c[:-1]
+    return ('points', currents[:-1], currents[1:], slope, intercept)
+
+
+def analytic_model(curve_name, I_pickup, T_delay=0.0, T_mult=1.0):
+    #This subroutine builds the model of an analytic inverse-time curve (see
+    #ANALYTIC_CURVES).
+
+    (A, B, p) = ANALYTIC_CURVES[curve_name.lower()]
+    return ('analytic', A, B, p, float(I_pickup), float(T_delay), float(T_mult))
+
+
+def curves_times(models, Icc):
+    #This subroutine calculates the action times [s] of the given TCC models for
+    #several currents at once.
+    #models - list with the models of the n_devices.
+    #Icc - (n_faults x n_devices) array with the current seen by each device.
+    #In case the current is too small the time is infinite and in case it is
+    #larger than the last point of a points curve, the last point time is used.
+
+    Icc = np.array(Icc, dtype=float)
+    n_devices = len(models)
+    is_points = np.array([model[0] == 'points' for model in models], dtype=bool)
+    times = np.full(Icc.shape, np.inf)
+    #Points curves: the segments of all the curves are stacked (start and
+    #number of segments of each curve) and searched at once.
+    points = np.flatnonzero(is_points)
+    if len(points) > 0:
+        n_segments = np.array([len(models[j][1]) for j in points], dtype=np.int64)
+        start = np.cumsum(n_segments) - n_segments
+        c_lo = np.concatenate([models[j][1] for j in points])
+        c_hi = np.concatenate([models[j][2] for j in points])
+        slopes = np.concatenate([models[j][3] for j in points])
+        intercepts = np.concatenate([models[j][4] for j in points])
+        first_c = c_lo[start]
+        last = start + n_segments - 1
+        I = Icc[:, points]
+        too_small = ~(I >= first_c)
+        log_I = np.log(np.clip(I, first_c, c_hi[last]))
+        #Segment search: the log currents of each curve are shifted to a range
+        #of their own, so a single sorted array has the segments of all curves:
+        log_hi = np.log(c_hi)
+        span = log_hi.max() - np.log(first_c).min() + 1.0
+        shift = np.arange(len(points))*span
+        segment = np.searchsorted(log_hi + np.repeat(shift, n_segments), log_I + shift, side='left')
+        segment = np.minimum(segment, last)
+        log_t = slopes[segment]*log_I + intercepts[segment]
+        times[:, points] = np.where(too_small, np.inf, np.exp(log_t))
+    #Analytic curves (closed form):
+    if len(points) < n_devices:
+        params = np.array([models[j][1:] for j in range(n_devices) if not is_points[j]], dtype=float)
+        (A, B, p, I_pickup, T_delay, T_mult) = params.T
+        M = Icc[:, ~is_points]/I_pickup
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            t = T_delay + T_mult*(A/(np.power(M, p) - 1) + B)
+        times[:, ~is_points] = np.where(M > 1, t, np.inf)
+    return times
+
+
+def read_commands(file_path):
+    #This subroutine reads an OpenDSS file line by line and yields each command,
+    #with its "~" (or "more") continuation lines appended and without comments.
+
+    command = ''
+    with open(file_path, errors='ignore') as inFile:
+        for line in inFile:
+            line = line.split('!')[0].split('//')[0].strip()
+            if line == '':
+                continue
+            first = line.split(None, 1)
+            if first[0] == '~' or first[0].lower() == 'more':
+                command += ' ' + (first[1] if len(first) > 1 else '')
+            elif line[0] == '~':
+                command += ' ' + line[1:]
+            else:
+                if command != '':
+                    yield command
+                command = line
+    if command != '':
+        yield command
+
+
+def split_command(command):
+    #This subroutine splits an OpenDSS command in a list of (property, value)
+    #tokens. property is None for the positional values.
+
+    return [(prop.lower() if prop else None, value) for (prop, value) in TOKEN.findall(command)]
+
+
+def parse_array(value, folder=''):
+    #This subroutine converts an OpenDSS array value (e.g. "[1 2e-3 -4]",
+    #"(1, 2, 3)" or "(file=values.csv)") into a NumPy array.
+    #folder - folder of the files referenced by the array.
+
+    value = value.strip().strip('[](){}"\'').strip()
+    fields = value.split('=', 1)
+    if len(fields) == 2 and fields[0].strip().lower() in ['file', 'sngfile', 'dblfile']:
+        file_path = os.path.join(folder, fields[1].strip().strip('"\''))
+        if fields[0].strip().lower() == 'sngfile':
+            return np.fromfile(file_path, dtype=np.float32).astype(float)
+        if fields[0].strip().lower() == 'dblfile':
+            return np.fromfile(file_path, dtype=np.float64)
+        with open(file_path, errors='ignore') as inFile:
+            value = inFile.read()
+    #Malformed values raise a ValueError:
+    return np.array(value.replace(',', ' ').replace(';', ' ').split(), dtype=float)
+
+
+def read_curves(file_path, curve_classes=TCC_CLASSES):
+    #This subroutine reads the curves defined by "New" commands in the given
+    #file and returns them in a dictionary: curve name: (npts, C_array, T_array).
+    #curve_classes - classes of the curves that are read (other objects are
+    #ignored). If None, the objects of any class are read.
+
+    curves = dict()
+    folder = os.path.dirname(file_path)
+    for command in read_commands(file_path):
+        tokens = split_command(command)
+        if len(tokens) < 2 or tokens[0][1].lower() != 'new':
+            continue
+        #Object class and name (the "object=" property may be given):
+        full_name = tokens[1][1].strip('"\'').lower()
+        if '.' not in full_name:
+            continue
+        (curve_class, name) = full_name.split('.', 1)
+        if curve_classes is not None and curve_class not in curve_classes:
+            continue
+        positional = CURVE_PROPS.get(curve_class, CURVE_PROPS['tcc_curve'])
+        props = dict()
+        position = 0
+        for (prop, value) in tokens[2:]:
+            if prop is None:
+                if position < len(positional):
+                    props[positional[position]] = value
+                position += 1
+            else:
+                props[prop] = value
+                if prop in positional:
+                    position = positional.index(prop) + 1
+        arrays = dict()
+        for prop in props:
+            if prop in ARRAY_PROPS:
+                arrays[ARRAY_PROPS[prop]] = parse_array(props[prop], folder)
+        #Points given as x1, y1, x2, y2...:
+        if 'points' in props and ('c_array' not in arrays or 't_array' not in arrays):
+            points = parse_array(props['points'], folder)
+            arrays = {'c_array': points[0::2], 't_array': points[1::2]}
+        if 'c_array' not in arrays or 't_array' not in arrays:
+            continue
+        C_array = arrays['c_array']
+        T_array = arrays['t_array']
+        npts = int(float(props['npts'])) if 'npts' in props else min(len(C_array), len(T_array))
+        curves[name] = (npts, C_array[:npts], T_array[:npts])
+    return curves
@@ -0,0 +1,132 @@
+# Native-python libs:
+import os
+import time
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+from dss.master import DSS
+from dss.results import ResultsStore
+
+
+# Time-series setup:
+# Time-series modes: (OpenDSS mode, default number of steps, default step size)
+TIME_MODES = {'daily': ('Daily', 24, '1h'),
+              'yearly': ('Yearly', 8760, '1h'),
+              'dutycycle': ('Dutycycle', 3600, '1s')}
+# Quantities that can be captured at each step:
+#   'vbus'    - voltage [pu] of all nodes (self.allNodes order)
+#   'loading' - loading [%] of the selected PD elements (current/NormalAmps)
+#   'dg'      - active power [kW] delivered by each DG (self.allDGs order)
+#   'losses'  - circuit losses [kW, kvar]
+TIME_QUANTITIES = ['vbus','loading','dg','losses']
+
+
+class DSS_time_sim(DSS):
+    # Class DSS_time_sim definitions:
+    # This class runs the time-series solution modes (Daily, Yearly and
+    # Dutycycle) step by step, appending the selected quantities of each step to
+    # a results store (dss.results.ResultsStore), which writes them to disk in
+    # chunks, so the whole series never needs to be kept in memory.
+
+    def run_timeseries(self,mode='daily',n_steps=None,step_size=None,quantities=TIME_QUANTITIES,elements=None,
+                       chunk_size=1000,out_dir=None):
+        #This subroutine runs a time-series simulation.
+        #mode - 'daily', 'yearly' or 'dutycycle' (see TIME_MODES)
+        #n_steps - number of steps (default given by the mode)
+        #step_size - OpenDSS step size (e.g. '1h', '15m', '1s')
+        #quantities - quantities captured (see TIME_QUANTITIES). The quantities
+        #without columns (e.g. 'dg' in a circuit with no DG) are not captured.
+        #elements - PD elements of the 'loading' quantity (default: all lines)
+        #chunk_size - number of steps kept in memory (rows of each chunk file)
+        #out_dir - folder of the results store. If None, the folder
+        #"__timesim_<mode>" is created in the circuit folder. Each quantity is
+        #a dataset of the store, with the buses (nodes) and elements indexed by
+        #their topology ids. The mode and step size are saved in store.json.
+        #The folder name is returned.
+
+        (dss_mode,default_steps,default_step_size) = TIME_MODES[mode.lower()]
+        if n_steps is None:
+            n_steps = default_steps
+        if step_size is None:
+            step_size = default_step_size
+        if out_dir is None:
+            out_dir = os.path.join(self.filepath,'__timesim_'+mode.lower())
+        if elements is None:
+            elements = ['line.'+line for line in self.allLines]
+        for quantity in quantities:
+            if quantity not in TIME_QUANTITIES:
+                raise ValueError("Unknown time-series quantity: '"+quantity+"'. Available quantities: "+", ".join(TIME_QUANTITIES))
+        #Quantities with columns in this circuit:
+        n_columns = {'vbus': len(self.allNodes),'loading': len(elements),'dg': len(self.allDGs),'losses': 2}
+        quantities = [quantity for quantity in quantities if n_columns[quantity] > 0]
+        #Columns and topology ids of each quantity:
+        chunk_size = max(1,min(chunk_size,n_steps))
+        store = ResultsStore(out_dir,chunk_rows=chunk_size,overwrite=True)
+        for quantity in quantities:
+            if quantity == 'vbus':
+                ids = [self.topology.bus_id.get(self.allBuses[bus],-1) for bus in self.node_bus]
+                store.add_dataset(quantity,self.allNodes,ids)
+            elif quantity == 'loading':
+                ids = [self.topology.element_id.get(element.lower(),-1) for element in elements]
+                store.add_dataset(quantity,elements,ids)
+            elif quantity == 'dg':
+                store.add_dataset(quantity,self.allDGs)
+            elif quantity == 'losses':
+                store.add_dataset(quantity,['kW','kvar'])
+        store.meta['timeseries'] = {'mode': mode.lower(),'step_size': step_size}
+        #Normal ampacity of the elements (read once):
+        if 'loading' in quantities:
+            norm_amps = np.zeros(len(elements))
+            for i,element in enumerate(elements):
+                self.dssCircuit.SetActiveElement(element)
+                norm_amps[i] = self.dssCktElement.NormalAmps
+            norm_amps[norm_amps <= 0] = np.nan
+        #Time-series mode:
+        self.dssText.Command = "Set mode="+dss_mode+" stepsize="+step_size+" number=1"
+        self.dssText.Command = "Set hour=0 sec=0"
+        start_time = time.perf_counter()
+        for step in range(n_steps):
+            self.solve()
+            snapshot = self.get_snapshot()
+            for quantity in quantities:
+                if quantity == 'vbus':
+                    store.append(quantity,snapshot.node_vmag/self.node_vbase)
+                elif quantity == 'loading':
+                    store.append(quantity,100*self.get_ICCcurrents(elements)/norm_amps)
+                elif quantity == 'dg':
+                    store.append(quantity,[self.get_dgpower(snapshot,dg) for dg in self.allDGs])
+                elif quantity == 'losses':
+                    store.append(quantity,snapshot.losses)
+        #Writing the last steps to disk:
+        store.close()
+        elapsed = time.perf_counter() - start_time
+        #Back to the snapshot mode:
+        self.dssText.Command = "Set mode=Snapshot"
+        self.solve()
+        print('\nTime-series simulation:',n_steps,'steps in',round(elapsed,2),'[s] ('+str(round(n_steps/max(elapsed,1e-9),1))+' steps/s)')
+        return out_dir
+
+
+    def get_dgpower(self,snapshot,dg):
+        #This subroutine gets the active power [kW] delivered by the DG in the
+        #given solution snapshot (the power of its first terminal).
+
+        (currents,powers,n_terminals) = snapshot.get_element(dg)
+        n_conductors = int(len(powers)/2/max(n_terminals,1))
+        return -float(np.sum(powers[0:2*n_conductors:2]))
+
+
+def load_timeseries(out_dir,quantity,columns=None,ids=None,steps=None):
+    #This subroutine loads one quantity saved by DSS_time_sim.run_timeseries.
+    #It returns the (steps x columns) array and the columns names.
+    #columns - names of the columns (default: all)
+    #ids - topology ids of the buses/elements (used instead of columns)
+    #steps - slice of the steps (default: all)
+    #Only the selected columns are read from the memory-mapped chunk files.
+
+    store = ResultsStore(out_dir)
+    positions = store.get_positions(quantity,columns,ids)
+    names = store.get_columns(quantity)[0]
+    return (store.read(quantity,positions,rows=steps),[names[j] for j in positions])
@@ -0,0 +1,332 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+
+# My libraries:
+
+
+class Topology(object):
+    # Class Topology definitions:
+    # This class stores the circuit connections given by the DSS Bus_connect
+    # and PD_elements dictionaries in a compact form: buses and PD-elements are
+    # identified by integer ids and the bus adjacency is kept in CSR arrays.
+    # The circuit walks are made by iterative kernels, so there is no recursion
+    # limit for long feeders and each walk is linear in the buses visited.
+    #
+    # Adjacency of the bus b (CSR entries p in indptr[b]:indptr[b+1]):
+    #   adj_bus[p]  - bus reached from b
+    #   adj_elem[p] - PD-element id connecting b to adj_bus[p]
+    #   adj_fw[p]   - True if b is the PD-element bus1 (forward direction)
+    # The entries keep the Bus_connect order: forward PDs first, then backward PDs.
+
+    def __init__(self, Bus_connect, PD_elements):
+        #This subroutine builds the topology arrays.
+
+        #Buses ids:
+        self.buses = list(Bus_connect.keys())
+        self.bus_id = dict()
+        for i,bus in enumerate(self.buses):
+            self.bus_id[bus] = i
+        self.n_buses = len(self.buses)
+        #PD-elements ids:
+        self.elements = list(PD_elements.keys())
+        self.element_id = dict()
+        for i,element in enumerate(self.elements):
+            self.element_id[element] = i
+        self.n_elements = len(self.elements)
+        self.is_line = np.array([PD_elements[pd][0] == 'line' for pd in self.elements],dtype=bool)
+        self.is_transformer = np.array([PD_elements[pd][0] == 'transformer' for pd in self.elements],dtype=bool)
+        #PD-elements buses ids (first bus and next buses):
+        self.elem_bus1 = np.array([self.bus_id.get(PD_elements[pd][2][0],-1) for pd in self.elements],dtype=np.int64)
+        self.elem_buses2 = [self.get_ids(PD_elements[pd][2][1:]) for pd in self.elements]
+        #Adjacency entries:
+        indptr = [0]
+        adj_bus = list()
+        adj_elem = list()
+        adj_fw = list()
+        for bus in self.buses:
+            #Going forward (bus is the PD first bus):
+            for pd in Bus_connect[bus][1]:
+                if pd in PD_elements:
+                    for new_bus in PD_elements[pd][2][1:]:
+                        if new_bus != bus and new_bus != 'none':
+                            adj_bus.append(self.bus_id[new_bus])
+                            adj_elem.append(self.element_id[pd])
+                            adj_fw.append(True)
+            #Going backward (bus is one of the PD next buses):
+            for pd in Bus_connect[bus][0]:
+                if pd in PD_elements:
+                    new_bus = PD_elements[pd][2][0]
+                    if new_bus != bus and new_bus != 'none':
+                        adj_bus.append(self.bus_id[new_bus])
+                        adj_elem.append(self.element_id[pd])
+                        adj_fw.append(False)
+            indptr.append(len(adj_bus))
+        self.indptr = np.array(indptr,dtype=np.int64)
+        self.adj_bus = np.array(adj_bus,dtype=np.int64)
+        self.adj_elem = np.array(adj_elem,dtype=np.int64)
+        self.adj_fw = np.array(adj_fw,dtype=bool)
+        #Source bus of each entry:
+        self.adj_src = np.repeat(np.arange(self.n_buses),np.diff(self.indptr))
+        #Python lists used by the walking kernels (faster item access):
+        self._indptr = self.indptr.tolist()
+        self._adj_bus = self.adj_bus.tolist()
+        self._adj_elem = self.adj_elem.tolist()
+        self._masks = dict()
+        #Open PD-elements (see set_open), not walked through by any walk:
+        self.elem_open = np.zeros(self.n_elements,dtype=bool)
+        #Rooted spanning tree (see build_tree):
+        self.tree_root = None
+
+
+    def get_arrays(self):
+        #This subroutine returns all the topology data as NumPy arrays (used to
+        #save the topology in the cache files).
+
+        arrays = dict()
+        arrays['buses'] = np.array(self.buses,dtype=str)
+        arrays['elements'] = np.array(self.elements,dtype=str)
+        for key in ['is_line','is_transformer','elem_bus1','indptr','adj_bus','adj_elem','adj_fw']:
+            arrays[key] = getattr(self,key)
+        #The next buses of each element in CSR form:
+        arrays['elem_buses2_ptr'] = np.cumsum([0]+[len(buses) for buses in self.elem_buses2])
+        arrays['elem_buses2'] = np.array([bus for buses in self.elem_buses2 for bus in buses],dtype=np.int64)
+        #The tree is only saved when it was built with all elements closed:
+        if self.tree_root is not None and not self.elem_open.any():
+            arrays['tree_root'] = np.array(self.tree_root)
+            for key in ['order','parent','parent_elem','tin','tout','nontree_src','nontree_dst']:
+                arrays[key] = getattr(self,key)
+        return arrays
+
+
+    @classmethod
+    def from_arrays(cls,arrays):
+        #This subroutine creates a Topology object from the arrays given by
+        #get_arrays, without walking through the circuit again.
+
+        topo = cls(dict(),dict())
+        topo.buses = arrays['buses'].tolist()
+        topo.bus_id = dict()
+        for i,bus in enumerate(topo.buses):
+            topo.bus_id[bus] = i
+        topo.n_buses = len(topo.buses)
+        topo.elements = arrays['elements'].tolist()
+        topo.element_id = dict()
+        for i,element in enumerate(topo.elements):
+            topo.element_id[element] = i
+        topo.n_elements = len(topo.elements)
+        for key in ['is_line','is_transformer','elem_bus1','indptr','adj_bus','adj_elem','adj_fw']:
+            setattr(topo,key,arrays[key])
+        ptr = arrays['elem_buses2_ptr'].tolist()
+        buses2 = arrays['elem_buses2'].tolist()
+        topo.elem_buses2 = [buses2[ptr[i]:ptr[i+1]] for i in range(topo.n_elements)]
+        topo.adj_src = np.repeat(np.arange(topo.n_buses),np.diff(topo.indptr))
+        topo._indptr = topo.indptr.tolist()
+        topo._adj_bus = topo.adj_bus.tolist()
+        topo._adj_elem = topo.adj_elem.tolist()
+        topo.elem_open = np.zeros(topo.n_elements,dtype=bool)
+        if 'tree_root' in arrays:
+            for key in ['order','parent','parent_elem','tin','tout','nontree_src','nontree_dst']:
+                setattr(topo,key,arrays[key])
+            topo.tree_root = int(arrays['tree_root'])
+        return topo
+
+
+    def get_ids(self,buses):
+        #This subroutine returns the ids of the given buses names ('none' and
+        #unknown buses are ignored).
+
+        return [self.bus_id[bus] for bus in buses if bus in self.bus_id]
+
+
+    def get_names(self,bus_ids):
+        #This subroutine returns the names of the given buses ids.
+
+        return [self.buses[i] for i in bus_ids]
+
+
+    def entries_mask(self,mode='all',closed_only=True):
+        #This subroutine returns the mask of the adjacency entries that can be
+        #walked through in each kind of circuit walk:
+        # 'all'       - all PD-elements in both directions
+        # 'no_transf' - all PD-elements but the transformers
+        # 'sec_net'   - non-transformer PDs forward and lines backward
+        #The entries of the open PD-elements are removed from all masks, unless
+        #closed_only is False.
+
+        if mode == 'all':
+            mask = None
+        elif mode == 'no_transf':
+            mask = ~self.is_transformer[self.adj_elem]
+        elif mode == 'sec_net':
+            mask = (self.adj_fw & ~self.is_transformer[self.adj_elem]) | (~self.adj_fw & self.is_line[self.adj_elem])
+        else:
+            raise ValueError("Unknown walk mode: '" + mode + "'")
+        if closed_only and self.elem_open.any():
+            closed = ~self.elem_open[self.adj_elem]
+            mask = closed if mask is None else mask & closed
+        return mask
+
+
+    def set_open(self,element,is_open=True):
+        #This subroutine opens (or closes) the given PD-element id, so the walks
+        #don't go through it (e.g. an open switch). The walk masks and the tree
+        #are discarded and built again on the next use.
+        #It returns True if the state of the element changed.
+
+        if self.elem_open[element] == is_open:
+            return False
+        self.elem_open[element] = is_open
+        self._masks = dict()
+        self.tree_root = None
+        return True
+
+
+    def dfs(self,start_buses,mode='all',exclude_element=-1,visited=None,closed_only=True):
+        #This subroutine walks through the circuit in depth-first order starting
+        #from each bus id in start_buses, following the same order of a
+        #recursive walk over Bus_connect.
+        #mode - kind of walk (see entries_mask)
+        #exclude_element - PD-element id that can't be walked through
+        #visited - set of bus ids already visited (it is updated in place)
+        #closed_only - if False, the walk also goes through the open PD-elements
+        #It returns the buses reached (in visiting order) and the adjacency
+        #entry used to reach each of them (-1 for the starting buses).
+
+        if visited is None:
+            visited = set()
+        if (mode,closed_only) not in self._masks:
+            mask = self.entries_mask(mode,closed_only)
+            if mask is not None:
+                mask = mask.tolist()
+            self._masks[(mode,closed_only)] = mask
+        mask = self._masks[(mode,closed_only)]
+        indptr = self._indptr
+        adj_bus = self._adj_bus
+        adj_elem = self._adj_elem
+        order = list()
+        via = list()
+        for start in start_buses:
+            if start in visited:
+                continue
+            visited.add(start)
+            order.append(start)
+            via.append(-1)
+            stack = [start]
+            pos = [indptr[start]]
+            while stack:
+                p = pos[-1]
+                if p == indptr[stack[-1]+1]:
+                    stack.pop()
+                    pos.pop()
+                    continue
+                pos[-1] = p+1
+                if (mask is not None and not mask[p]) or adj_elem[p] == exclude_element:
+                    continue
+                new_bus = adj_bus[p]
+                if new_bus in visited:
+                    continue
+                visited.add(new_bus)
+                order.append(new_bus)
+                via.append(p)
+                stack.append(new_bus)
+                pos.append(indptr[new_bus])
+        return (order,via)
+
+
+    def distances(self,start_bus,elem_length,dist=None):
+        #This subroutine calculates the distance from start_bus to all the buses
+        #reached from it, using the length of each PD-element (elem_length array).
+        #dist - dictionary {bus id: distance} with the buses already calculated.
+
+        if dist is None:
+            dist = dict()
+        if start_bus not in dist:
+            dist[start_bus] = 0
+        visited = set(dist.keys())
+        visited.discard(start_bus)
+        (order,via) = self.dfs([start_bus],visited=visited)
+        adj_src = self.adj_src
+        for bus,p in zip(order,via):
+            if p >= 0:
+                dist[bus] = dist[int(adj_src[p])] + elem_length[self._adj_elem[p]]
+        return dist
+
+
+    def build_tree(self,root):
+        #This subroutine builds a rooted spanning tree of the circuit with a single
+        #depth-first walk from the root bus id (the other circuit islands become
+        #new trees). The tree is stored as:
+        #   parent[b]      - parent bus id of b (-1 for the roots)
+        #   parent_elem[b] - PD-element id between b and its parent (-1 for roots)
+        #   order          - buses ids in visiting order (Euler tour)
+        #   tin[b],tout[b] - interval of the subtree of b in order, so the buses
+        #                    downstream b are order[tin[b]:tout[b]]
+        #The non-tree entries (loops and parallel PDs, open PDs excluded) are
+        #kept so the queries can tell when a subtree is not closed.
+
+        (order,via) = self.dfs([root]+list(range(self.n_buses)))
+        order = np.array(order,dtype=np.int64)
+        via = np.array(via,dtype=np.int64)
+        n = self.n_buses
+        self.order = order
+        self.parent = np.full(n,-1,dtype=np.int64)
+        self.parent_elem = np.full(n,-1,dtype=np.int64)
+        has_parent = via >= 0
+        self.parent[order[has_parent]] = self.adj_src[via[has_parent]]
+        self.parent_elem[order[has_parent]] = self.adj_elem[via[has_parent]]
+        self.tin = np.empty(n,dtype=np.int64)
+        self.tin[order] = np.arange(n)
+        #Subtree sizes, accumulated from the last visited buses to the first:
+        size = np.ones(n,dtype=np.int64)
+        for b in order[::-1].tolist():
+            if self.parent[b] >= 0:
+                size[self.parent[b]] += size[b]
+        self.tout = self.tin + size
+        #Non-tree entries:
+        src = self.adj_src
+        dst = self.adj_bus
+        elem = self.adj_elem
+        tree_entry = ((self.parent[dst] == src) & (self.parent_elem[dst] == elem)) | ((self.parent[src] == dst) & (self.parent_elem[src] == elem))
+        nontree = ~tree_entry & ~self.elem_open[elem]
+        self.nontree_src = src[nontree]
+        self.nontree_dst = dst[nontree]
+        self.tree_root = root
+
+
+    def subtree(self,bus):
+        #This subroutine returns the buses ids in the subtree of the given bus id
+        #(the bus itself and all the buses downstream it).
+
+        return self.order[self.tin[bus]:self.tout[bus]]
+
+
+    def is_closed(self,bus):
+        #This subroutine checks if there is no loop connecting the subtree of the
+        #given bus to the rest of the circuit.
+
+        lo = self.tin[bus]
+        hi = self.tout[bus]
+        src_in = (self.tin[self.nontree_src] >= lo) & (self.tin[self.nontree_src] < hi)
+        dst_in = (self.tin[self.nontree_dst] >= lo) & (self.tin[self.nontree_dst] < hi)
+        return not np.any(src_in != dst_in)
+
+
+    def downstream(self,element):
+        #This subroutine returns the buses ids located downstream the given 
+        #PD-element id, i.e. the buses reached from its next buses without 
+        #walking through the element itself.
+        #When the element is a tree edge and its subtrees are closed, the result 
+        #is a slice of the tree order; otherwise the circuit is walked.
+
+        bus1 = self.elem_bus1[element]
+        buses2 = [bus for bus in self.elem_buses2[element] if bus != bus1]
+        children = list()
+        for bus in buses2:
+            if self.parent[bus] == bus1 and self.parent_elem[bus] == element and self.is_closed(bus):
+                children.append(bus)
+        if len(children) > 0 and len(children) == len(buses2):
+            return np.concatenate([self.subtree(bus) for bus in children])
+        (order,via) = self.dfs(buses2,exclude_element=element)
+        return np.array(order,dtype=np.int64)
@@ -0,0 +1,28 @@
+# Native-python libs:
+import functools
+
+# Third-party libraries:
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+
+# My libraries:
+from dss import engine
+from tests.fake_engine import FakeDSS
+
+
+# Fake engines (see tests.fake_engine), with and without DGs:
+engine.register_engine('fake', FakeDSS)
+engine.register_engine('fake_nodg', functools.partial(FakeDSS, dgs=False))
+
+
+@pytest.fixture
+def circuit_file(tmp_path):
+    #This fixture writes the DSS files of the fake circuit (the fake engine
+    #doesn't read them, but the DSS class and the cache do) and returns the
+    #master file name.
+
+    (tmp_path / 'lines.dss').write_text('New Line.l1 bus1=sourcebus bus2=b1\n')
+    master = tmp_path / 'master.dss'
+    master.write_text('Clear\nNew Circuit.fake\nRedirect lines.dss\n')
+    return str(master)
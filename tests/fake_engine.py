@@ -0,0 +1,569 @@
+# Native-python libs:
+import math
+import json
+
+# Third-party libraries:
+
+# My libraries:
+
+
+# Fake engine setup:
+# A small in-memory engine with the same interfaces of the OpenDSS COM object
+# used by the DSS class (see dss.engine), so the package can be tested without
+# OpenDSS. The text commands that change the circuit (Compile, New, Edit,
+# Open...) are only logged; the queries ('? element.property') are answered
+# from the circuit below. The voltages are the kV bases times a factor that
+# changes with the number of solutions, and the currents are fixed values.
+# Each solution finds the buses energized from the sourcebus through the 
+# enabled PD elements not opened by Open/Close commands: the other buses and
+# the elements they feed get no voltage and no current. The faults placed by 
+# New/Edit "fault" commands in an energized bus add FAULT_CURRENT times the 
+# number of faulted phases times the position of the faulted bus (1, 2...) to
+# the currents of the elements in the path from the source to the fault. The
+# generator placed by New/Edit "generator" commands in an energized bus raises
+# the voltages of all buses by DG_RISE [pu] per kW.
+# The ActiveClass interface has the JSON export of the DSS C-API engines
+# (ToJSON), unless the engine is created with bulk=False (as the COM object).
+# Circuit elements: name: (buses, properties)
+FAKE_CIRCUIT = {'vsource.source': (['sourcebus.1.2.3','sourcebus.0.0.0'],
+                                   {'basekv': 12.47, 'basefreq': 60, 'pu': 1.0, 'mvasc1': 100, 'mvasc3': 200,
+                                    'basemva': 100}),
+                'line.l1': (['sourcebus.1.2.3','b1.1.2.3'], {'switch': 'False', 'length': 1, 'units': 'km'}),
+                'line.sw1': (['b1.1.2.3','b2.1.2.3'], {'switch': 'True', 'length': 0.001, 'units': 'km'}),
+                'capacitor.c1': (['b1.1.2.3','b1.0.0.0'], {}),
+                'line.l4': (['b1.1','b6.1'], {'switch': 'False', 'length': 2, 'units': 'mi'}),
+                'transformer.t1': (['b2.1.2.3','b3.1.2.3'], {'kvs': '[12.47, 0.48, ]', 'kvas': '[500, 500, ]'}),
+                'line.l2': (['b3.1.2.3','b4.1.2.3'], {'switch': 'False', 'length': 100, 'units': 'm'}),
+                'line.l3': (['b4.1.2.3','b5.1.2.3'], {'switch': 'False', 'length': 200, 'units': 'ft'}),
+                'load.ld1': (['b5.1.2.3'], {'kva': 50, 'kw': 45}),
+                'load.ld2': (['b6.1'], {'kva': 10, 'kw': 9}),
+                'pvsystem.pv1': (['b4.1.2.3'], {'kv': 0.48, 'kva': 100, 'pf': 1, 'pmpp': 100, 'irradiance': 1}),
+                'recloser.r1': ([], {'monitoredobj': 'line.l1', 'switchedobj': 'line.l1', 'delay': 0,
+                                     'phasefast': 'a', 'phasetrip': 200, 'tdphfast': 1, 'phasedelayed': 'd',
+                                     'tdphdelayed': 1, 'recloseintervals': '(0.5, 2, 2, )'}),
+                'fuse.f1': ([], {'monitoredobj': 'line.l2', 'switchedobj': '', 'fusecurve': 'tlink',
+                                 'ratedcurrent': 65, 'delay': 0}),
+                'fuse.f2': ([], {'monitoredobj': 'line.l4', 'switchedobj': 'line.l4', 'fusecurve': 'tlink',
+                                 'ratedcurrent': 10, 'delay': 0})}
+# DG elements (removed by FakeDSS(dgs=False)):
+FAKE_DGS = ['pvsystem.pv1']
+# kV bases (line-to-line) of the buses and of the circuit:
+FAKE_KVBASES = {'sourcebus': 12.47, 'b1': 12.47, 'b2': 12.47, 'b6': 12.47, 'b3': 0.48, 'b4': 0.48, 'b5': 0.48}
+FAKE_VOLTAGEBASES = '[12.47, 0.48]'
+# Line units codes (OpenDSS order):
+FAKE_UNITS = ['none','mi','kft','km','m','ft','in','cm']
+FAULT_CURRENT = 1000.0
+DG_RISE = 1e-4
+
+
+class FakeDSS(object):
+    # Class FakeDSS definitions:
+    # This class is the fake engine (the "OpenDSSEngine.DSS" object).
+
+    def __init__(self, dgs=True, bulk=True, fixed_voltages=False):
+        #This subroutine creates the engine with the fake circuit.
+        #dgs - if False, the circuit has no DG.
+        #bulk - if False, the ActiveClass interface has no ToJSON method.
+        #fixed_voltages - if True, the voltages factor doesn't change with the
+        #number of solutions.
+
+        self.elements = dict()
+        for name in FAKE_CIRCUIT:
+            if dgs or name not in FAKE_DGS:
+                (buses,props) = FAKE_CIRCUIT[name]
+                self.elements[name] = {'buses': list(buses), 'enabled': True,
+                                       'props': dict((prop,str(value)) for (prop,value) in props.items())}
+        self.active_element = None
+        self.active_bus = None
+        self.n_solves = 0
+        self.scale = 0.98
+        self.fixed_voltages = fixed_voltages
+        #Generator object (bus1, kw and enabled properties) and the voltage rise
+        #[pu] it causes in the last solution:
+        self.generator = None
+        self.dg_rise = 0.0
+        #Fault object (bus1, bus2 and enabled properties) and the fault of the
+        #last solution, (bus, n° of faulted phases) or None:
+        self.fault = None
+        self.solved_fault = None
+        #Opened PD elements, buses energized in the last solution (bus: (element,
+        #previous bus) of the path from the source) and the path of the fault:
+        self.open_elements = set()
+        self.energized = dict()
+        self.fault_path = set()
+        self.Version = 'Fake engine 1.0'
+        #Number of calls of the element data getters:
+        self.n_element_reads = 0
+        self.n_class_reads = 0
+        self.Text = FakeText(self)
+        self.ActiveClass = FakeJSONClass(self) if bulk else FakeActiveClass(self)
+        self.ActiveCircuit = FakeCircuit(self)
+        self.update_solution()
+
+    def ClearAll(self):
+        pass
+
+    def get_buses(self):
+        #This subroutine returns the buses names in the order they are defined.
+
+        buses = list()
+        for element in self.elements.values():
+            for bus in element['buses']:
+                bus = bus.split('.')[0]
+                if bus not in buses:
+                    buses.append(bus)
+        return buses
+
+    def get_nodes(self, bus):
+        #This subroutine returns the nodes (phases) of the bus.
+
+        nodes = set()
+        for element in self.elements.values():
+            for element_bus in element['buses']:
+                fields = element_bus.split('.')
+                if fields[0] == bus:
+                    nodes.update(int(node) for node in fields[1:] if node != '0')
+        return sorted(nodes) if nodes else [1,2,3]
+
+    def get_vmag(self, bus, node):
+        #This subroutine returns the voltage magnitude [V] of the node.
+
+        if bus not in self.energized:
+            return 0.0
+        return FAKE_KVBASES[bus]/math.sqrt(3)*1000*(self.scale+self.dg_rise-0.01*node)
+
+    def get_currents(self, name):
+        #This subroutine returns the currents (magnitude, angle) of all
+        #terminals and conductors of the element.
+
+        buses = self.elements[name]['buses']
+        n_conductors = len(buses[0].split('.'))-1 if buses else 1
+        currents = list()
+        fault_current = 0.0
+        if self.solved_fault is not None and name in self.fault_path:
+            (bus,n_phases) = self.solved_fault
+            fault_current = FAULT_CURRENT*n_phases*(self.get_buses().index(bus)+1)
+        fed = (len(buses) == 0 or buses[0].split('.')[0] in self.energized) and name not in self.open_elements
+        for terminal in range(max(len(buses),1)):
+            for conductor in range(n_conductors):
+                current = 100.0*(conductor+1)+terminal+fault_current if fed else 0.0
+                currents.extend([current,0.0])
+        return currents
+
+    def set_fault(self, command):
+        #This subroutine applies the properties of a New/Edit fault command.
+
+        if self.fault is None or command.lower().startswith('new'):
+            self.fault = {'bus1': '', 'bus2': '', 'enabled': 'yes'}
+        for field in command.split()[2:]:
+            (prop,value) = field.split('=',1)
+            if prop.lower() in self.fault:
+                self.fault[prop.lower()] = value.lower()
+
+    def set_generator(self, command):
+        #This subroutine applies the properties of a New/Edit generator command.
+
+        if self.generator is None or command.lower().startswith('new'):
+            self.generator = {'bus1': '', 'kw': '0', 'enabled': 'yes'}
+        for field in command.split()[2:]:
+            (prop,value) = field.split('=',1)
+            if prop.lower() in self.generator:
+                self.generator[prop.lower()] = value.lower()
+
+    def solve(self):
+        self.n_solves += 1
+        if not self.fixed_voltages:
+            self.scale = 0.98-0.001*(self.n_solves % 24)
+        self.update_solution()
+
+    def update_solution(self):
+        #This subroutine finds the energized buses and the fault of the solution.
+
+        self.energized = {'sourcebus': (None,None)}
+        queue = ['sourcebus']
+        while queue:
+            bus = queue.pop(0)
+            for (name,element) in self.elements.items():
+                buses = [element_bus.split('.')[0] for element_bus in element['buses']]
+                if len(buses) < 2 or bus not in buses or not element['enabled'] or name in self.open_elements:
+                    continue
+                for other in buses:
+                    if other not in self.energized:
+                        self.energized[other] = (name,bus)
+                        queue.append(other)
+        self.dg_rise = 0.0
+        if self.generator is not None and self.generator['enabled'] in ['yes','true']:
+            if self.generator['bus1'].split('.')[0] in self.energized:
+                self.dg_rise = DG_RISE*float(self.generator['kw'])
+        self.solved_fault = None
+        self.fault_path = set()
+        if self.fault is not None and self.fault['enabled'] in ['yes','true']:
+            bus1 = self.fault['bus1'].split('.')
+            phases = set(bus1[1:]) | set(self.fault['bus2'].split('.')[1:])
+            phases.discard('0')
+            bus = bus1[0]
+            if bus in self.energized:
+                self.solved_fault = (bus,len(phases))
+                while self.energized[bus][0] is not None:
+                    (name,bus) = self.energized[bus]
+                    self.fault_path.add(name)
+
+
+
+def fixed_voltages_engine():
+    #This subroutine creates the fake engine with fixed voltages (the factory
+    #used by the worker processes through its import path).
+
+    return FakeDSS(fixed_voltages=True)
+
+class FakeText(object):
+    # Class FakeText definitions:
+    # This class is the Text interface: it answers the queries and logs the
+    # other commands.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.Result = ''
+        self.log = list()
+
+    @property
+    def Command(self):
+        return ''
+
+    @Command.setter
+    def Command(self, command):
+        self.log.append(command)
+        command = command.strip()
+        self.Result = ''
+        if command.startswith('?'):
+            (name,prop) = command[1:].strip().rsplit('.',1)
+            element = self.engine.elements[name.lower()]
+            if prop.lower() == 'bus1':
+                self.Result = element['buses'][0]
+            elif prop.lower() == 'bus2':
+                self.Result = element['buses'][1] if len(element['buses']) > 1 else ''
+            elif prop.lower() == 'buses':
+                self.Result = '['+', '.join(element['buses'])+', ]'
+            else:
+                self.Result = element['props'].get(prop.lower(),'')
+        elif command.lower().startswith('get voltagebases'):
+            self.Result = FAKE_VOLTAGEBASES
+        elif command.lower().startswith(('new fault.','edit fault.')):
+            self.engine.set_fault(command)
+        elif command.lower().startswith(('new generator.','edit generator.')):
+            self.engine.set_generator(command)
+        elif command.lower().startswith('open '):
+            self.engine.open_elements.add(command.split()[1].lower())
+        elif command.lower().startswith('close '):
+            self.engine.open_elements.discard(command.split()[1].lower())
+
+
+class FakeCktElement(object):
+    # Class FakeCktElement definitions:
+    # This class is the ActiveCktElement interface.
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def element(self):
+        return self.engine.elements[self.engine.active_element]
+
+    @property
+    def Name(self):
+        return self.engine.active_element
+
+    @property
+    def BusNames(self):
+        self.engine.n_element_reads += 1
+        return list(self.element()['buses'])
+
+    @property
+    def Enabled(self):
+        return self.element()['enabled']
+
+    @property
+    def NumTerminals(self):
+        return max(len(self.element()['buses']),1)
+
+    @property
+    def NumConductors(self):
+        buses = self.element()['buses']
+        return len(buses[0].split('.'))-1 if buses else 1
+
+    @property
+    def NormalAmps(self):
+        return 400.0
+
+    @property
+    def CurrentsMagAng(self):
+        return self.engine.get_currents(self.engine.active_element)
+
+    @property
+    def Powers(self):
+        return [value/10.0 for value in self.engine.get_currents(self.engine.active_element)]
+
+    def Properties(self, prop):
+        self.engine.n_element_reads += 1
+        return FakeProperty(self.element()['props'].get(prop.lower(),''))
+
+
+class FakeProperty(object):
+    # Class FakeProperty definitions:
+    # This class is a property of the ActiveCktElement interface.
+
+    def __init__(self, value):
+        self.Val = value
+
+
+class FakeActiveClass(object):
+    # Class FakeActiveClass definitions:
+    # This class is the ActiveClass interface (iteration over the elements of
+    # the active class).
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.class_name = None
+        self.i = 0
+
+    def get_names(self):
+        return [name for name in self.engine.elements if name.split('.')[0] == self.class_name]
+
+    def set_active(self):
+        names = self.get_names()
+        if self.i < len(names):
+            self.engine.active_element = names[self.i]
+            return self.i+1
+        return 0
+
+    @property
+    def First(self):
+        self.i = 0
+        return self.set_active()
+
+    @property
+    def Next(self):
+        self.i += 1
+        return self.set_active()
+
+    @property
+    def Name(self):
+        return self.engine.active_element.split('.',1)[1]
+
+    @property
+    def AllNames(self):
+        return [name.split('.',1)[1] for name in self.get_names()]
+
+
+class FakeJSONClass(FakeActiveClass):
+    # Class FakeJSONClass definitions:
+    # This class is the ActiveClass interface of the DSS C-API engines, with
+    # the JSON export of all elements of the class (typed values: numbers,
+    # booleans and arrays).
+
+    def ToJSON(self, options=0):
+        self.engine.n_class_reads += 1
+        elements = list()
+        for name in self.get_names():
+            element = self.engine.elements[name]
+            data = {'DSSClass': self.class_name.capitalize(), 'Name': name.split('.',1)[1]}
+            if self.class_name == 'transformer':
+                data['Buses'] = list(element['buses'])
+            else:
+                for (i,bus) in enumerate(element['buses'][:2]):
+                    data['Bus'+str(i+1)] = bus
+            for (prop,value) in element['props'].items():
+                data[prop.capitalize()] = json_value(value)
+            elements.append(data)
+        return json.dumps(elements)
+
+
+def json_value(value):
+    #This subroutine converts a property string to the JSON export type.
+
+    if value.lower() in ['true','false']:
+        return value.lower() == 'true'
+    if value[:1] in ['[','(']:
+        return [json_value(item) for item in value.strip('[]() ').replace(',',' ').split()]
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+class FakeLines(FakeActiveClass):
+    # Class FakeLines definitions:
+    # This class is the Lines interface.
+
+    def __init__(self, engine):
+        FakeActiveClass.__init__(self,engine)
+        self.class_name = 'line'
+
+    def props(self):
+        return self.engine.elements[self.engine.active_element]['props']
+
+    @property
+    def Count(self):
+        return len(self.get_names())
+
+    @property
+    def Length(self):
+        return float(self.props()['length'])
+
+    @property
+    def Units(self):
+        return FAKE_UNITS.index(self.props()['units'])
+
+    @property
+    def Bus1(self):
+        return self.engine.elements[self.engine.active_element]['buses'][0]
+
+    @property
+    def Bus2(self):
+        return self.engine.elements[self.engine.active_element]['buses'][1]
+
+
+class FakeBus(object):
+    # Class FakeBus definitions:
+    # This class is the ActiveBus interface.
+
+    Coorddefined = False
+    x = 0
+    y = 0
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @property
+    def Name(self):
+        return self.engine.active_bus
+
+    @property
+    def Nodes(self):
+        return self.engine.get_nodes(self.engine.active_bus)
+
+    @property
+    def kVBase(self):
+        return FAKE_KVBASES[self.engine.active_bus]/math.sqrt(3)
+
+    @property
+    def VMagAngle(self):
+        values = list()
+        for node in self.Nodes:
+            values.extend([self.engine.get_vmag(self.engine.active_bus,node),-120.0*(node-1)])
+        return values
+
+    @property
+    def puVmagAngle(self):
+        values = self.VMagAngle
+        values[0::2] = [vmag/(self.kVBase*1000) for vmag in values[0::2]]
+        return values
+
+
+class FakeSolution(object):
+    # Class FakeSolution definitions:
+    # This class is the Solution interface.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.Converged = True
+        self.Iterations = 3
+        self.Mode = 0
+        self.Number = 1
+        self.StepSize = 3600
+        self.Hour = 0
+        self.Seconds = 0.0
+        self.ControlMode = 0
+
+    def Solve(self):
+        self.engine.solve()
+
+
+class FakeInterface(object):
+    # Class FakeInterface definitions:
+    # This class is an interface of the circuit not used by the tests.
+    pass
+
+
+class FakeCircuit(object):
+    # Class FakeCircuit definitions:
+    # This class is the ActiveCircuit interface.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.Name = 'fake'
+        self.ActiveCktElement = FakeCktElement(engine)
+        self.ActiveBus = FakeBus(engine)
+        self.ActiveClass = engine.ActiveClass
+        self.Solution = FakeSolution(engine)
+        self.Lines = FakeLines(engine)
+        for interface in ['CtrlQueue','Monitors','Meters','PDElements','Transformers','Loads','PVSystems',
+                          'Generators','Fuses','Reclosers','Relays','SwtControls','RegControls']:
+            setattr(self,interface,FakeInterface())
+
+    def get_nodes(self):
+        return [(bus,node) for bus in self.engine.get_buses() for node in self.engine.get_nodes(bus)]
+
+    @property
+    def AllElementNames(self):
+        return [name.split('.')[0].capitalize()+'.'+name.split('.',1)[1] for name in self.engine.elements]
+
+    @property
+    def AllBusNames(self):
+        return self.engine.get_buses()
+
+    @property
+    def AllNodeNames(self):
+        return [bus+'.'+str(node) for (bus,node) in self.get_nodes()]
+
+    @property
+    def AllBusVmag(self):
+        return [self.engine.get_vmag(bus,node) for (bus,node) in self.get_nodes()]
+
+    @property
+    def AllBusVmagPu(self):
+        return [self.engine.get_vmag(bus,node)/(FAKE_KVBASES[bus]/math.sqrt(3)*1000) for (bus,node) in self.get_nodes()]
+
+    @property
+    def AllBusVolts(self):
+        values = list()
+        for (bus,node) in self.get_nodes():
+            vmag = self.engine.get_vmag(bus,node)
+            angle = math.radians(-120.0*(node-1))
+            values.extend([vmag*math.cos(angle),vmag*math.sin(angle)])
+        return values
+
+    @property
+    def Losses(self):
+        return [1000.0,200.0]
+
+    @property
+    def TotalPower(self):
+        return [-100.0,-20.0]
+
+    @property
+    def AllElementLosses(self):
+        return [0.0]
+
+    def SetActiveBus(self, bus):
+        self.engine.active_bus = bus.lower().split('.')[0]
+        return 0
+
+    def SetActiveBusi(self, i):
+        self.engine.active_bus = self.engine.get_buses()[i]
+        return 0
+
+    def SetActiveElement(self, name):
+        self.engine.active_element = name.lower()
+        return 0
+
+    def SetActiveClass(self, class_name):
+        if any(name.split('.')[0] == class_name for name in self.engine.elements):
+            self.engine.ActiveClass.class_name = class_name
+            return 1
+        return 0
+
+    def Enable(self, name):
+        self.engine.elements[name.lower()]['enabled'] = True
+
+    def Disable(self, name):
+        self.engine.elements[name.lower()]['enabled'] = False
@@ -0,0 +1,55 @@
+# Native-python libs:
+import os
+
+# Third-party libraries:
+import pytest
+
+# My libraries:
+from dss import cache
+from dss.master import DSS
+
+
+def test_key_changes_with_files_contents(circuit_file):
+    folder = os.path.dirname(circuit_file)
+    key = cache.cache_filename(folder, circuit_file, 'km')
+    assert key == cache.cache_filename(folder, circuit_file, 'km')
+    assert key != cache.cache_filename(folder, circuit_file, 'm')
+    #Changing a redirected file:
+    with open(os.path.join(folder, 'lines.dss'), 'a') as outFile:
+        outFile.write('New Line.l2 bus1=b1 bus2=b2\n')
+    assert key != cache.cache_filename(folder, circuit_file, 'km')
+
+
+def test_files_are_absolute(circuit_file, monkeypatch):
+    monkeypatch.chdir(os.path.dirname(circuit_file))
+    files = cache.dss_files(os.path.basename(circuit_file))
+    assert files == [circuit_file, os.path.join(os.path.dirname(circuit_file), 'lines.dss')]
+
+
+def test_missing_files_raise(circuit_file):
+    folder = os.path.dirname(circuit_file)
+    with pytest.raises(FileNotFoundError):
+        cache.dss_files(os.path.join(folder, 'missing.dss'))
+    os.remove(os.path.join(folder, 'lines.dss'))
+    with pytest.raises(FileNotFoundError):
+        cache.dss_files(circuit_file)
+
+
+def test_cache_is_used(circuit_file):
+    cache_dir = os.path.join(os.path.dirname(circuit_file), 'cache')
+    first = DSS(circuit_file, engine='fake', cache_dir=cache_dir)
+    assert os.path.isfile(first.cache_file)
+    second = DSS(circuit_file, engine='fake', cache_dir=cache_dir)
+    assert second.cache_file == first.cache_file
+    #The stages data was loaded from the cache file:
+    assert {'elements', 'busconnect', 'kvbases', 'dist2subs', 'interrupt'} <= second.stages_done
+    assert not any(command.lower().endswith('.kvs') for command in second.dssText.log)
+    assert second.Protect_interrupt == first.Protect_interrupt
+    assert second.bus_kvbases == first.bus_kvbases
+
+
+def test_cache_disabled_on_missing_redirect(circuit_file):
+    os.remove(os.path.join(os.path.dirname(circuit_file), 'lines.dss'))
+    dss = DSS(circuit_file, engine='fake', cache_dir='cache')
+    assert dss.cache_dir is None
+    assert 'b1' in dss.bus_kvbases
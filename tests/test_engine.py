@@ -0,0 +1,43 @@
+# Native-python libs:
+
+# Third-party libraries:
+import pytest
+
+# My libraries:
+from dss import engine
+from dss.master import DSS
+from tests.fake_engine import FakeDSS
+
+
+def test_start_engine_by_name_and_path():
+    assert isinstance(engine.start_engine('fake'), FakeDSS)
+    assert isinstance(engine.start_engine('tests.fake_engine:FakeDSS'), FakeDSS)
+    fake = FakeDSS()
+    assert engine.start_engine(fake) is fake
+    with pytest.raises(ValueError):
+        engine.start_engine('unknown')
+    with pytest.raises(TypeError):
+        engine.start_engine(object())
+    assert 'dss_python' in engine.ENGINES
+
+
+def test_dss_by_import_path(circuit_file):
+    dss = DSS(circuit_file, engine='tests.fake_engine:FakeDSS')
+    assert isinstance(dss.dssObj, FakeDSS)
+    assert dss.allBuses[0] == 'sourcebus'
+
+
+def test_watched_interfaces():
+    changes = list()
+    fake = FakeDSS()
+    text = engine.WatchedText(fake.Text, lambda: changes.append(1))
+    text.Command = '? line.l1.length'
+    assert text.Result == '1' and len(changes) == 0
+    text.Command = 'Edit line.l1 length=2'
+    assert len(changes) == 1
+    solution = engine.WatchedInterface(fake.ActiveCircuit.Solution, lambda: changes.append(1), engine.SOLVE_METHODS)
+    solution.Solve()
+    assert len(changes) == 2 and fake.n_solves == 1
+    circuit = engine.WatchedInterface(fake.ActiveCircuit, lambda: changes.append(1))
+    circuit.Disable('line.l1')
+    assert len(changes) == 2
@@ -0,0 +1,109 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.faultanalysis import DSS_Faultanalysis
+from tests.fake_engine import FAKE_KVBASES, FAULT_CURRENT, FakeDSS
+
+
+# Position of each bus in the fake engine (the faults currents grow with it):
+BUS_POSITION = {'sourcebus': 1, 'b1': 2, 'b2': 3, 'b6': 4, 'b3': 5, 'b4': 6, 'b5': 7}
+# Pre-fault current (greatest one) of the element monitored by each device
+# and the buses whose faults it carries:
+DEVICE_CURRENT = {'recloser.r1': 301.0, 'fuse.f1': 301.0, 'fuse.f2': 101.0}
+DEVICE_FAULTS = {'recloser.r1': ['b1', 'b2', 'b6', 'b3', 'b4', 'b5'], 'fuse.f1': ['b4', 'b5'], 'fuse.f2': ['b6']}
+
+
+def expected_currents(buses, devices):
+    #This subroutine returns the fault currents of the fake engine (NaN for
+    #the faults not possible in the single-phase bus b6).
+
+    currents = np.full((len(buses), 3, len(devices)), np.nan)
+    for i, bus in enumerate(buses):
+        for k in range(3 if bus != 'b6' else 1):
+            currents[i, k] = [DEVICE_CURRENT[device] + FAULT_CURRENT*(k+1)*BUS_POSITION[bus]*(bus in DEVICE_FAULTS[device])
+                              for device in devices]
+    return currents
+
+
+def test_run_faults(circuit_file):
+    dss = DSS_Faultanalysis(circuit_file, engine='fake', lazy=True)
+    #Buses of the lines (the switch sw1 excluded):
+    assert dss.get_fault_buses() == ['sourcebus', 'b1', 'b6', 'b3', 'b4', 'b5']
+    assert dss.get_fault_devices() == (['recloser.r1', 'fuse.f1', 'fuse.f2'], ['line.l1', 'line.l2', 'line.l4'])
+    currents = dss.run_faults()
+    assert np.array_equal(currents, expected_currents(dss.fault_buses, dss.fault_devices), equal_nan=True)
+    assert dss.fault_types == ['1ph', '2ph', '3ph']
+    assert np.array_equal(dss.fault_placed, ~np.isnan(currents[:, :, 0]))
+    assert np.array_equal(dss.fault_converged, dss.fault_placed)
+    #Line-to-neutral kV bases (rounded):
+    assert dss.fault_kvbases == pytest.approx([FAKE_KVBASES[bus]/np.sqrt(3) for bus in dss.fault_buses], rel=1e-3)
+    #The fault is removed and the pre-fault circuit is solved again:
+    assert dss.dssObj.Text.log[-1] == 'Edit fault.dss_faultstudy enabled=no'
+    assert dss.dssObj.solved_fault is None
+    assert dss.get_ICCcurrents(['line.l1'])[0] == 301
+
+
+def test_run_faults_no_restore(circuit_file):
+    dss = DSS_Faultanalysis(circuit_file, engine='fake')
+    dss.run_faults(['b3', 'b4'], ['3ph', '1ph'], restore=False)
+    assert dss.fault_currents[:, :, 0] == pytest.approx(np.array([[301+3000*5, 301+1000*5], [301+3000*6, 301+1000*6]]))
+    assert dss.fault_currents[:, :, 1] == pytest.approx(np.array([[301, 301], [301+3000*6, 301+1000*6]]))
+    #The last fault stays placed:
+    assert dss.dssObj.solved_fault == ('b4', 1)
+
+
+def test_fault_actiontimes(circuit_file):
+    dss = DSS_Faultanalysis(circuit_file, engine='fake')
+    dss.run_faults(['b1', 'b6'], ['1ph', '3ph'])
+    dss.config_TCCcurves({'recloser.r1 phasefast': 'iec_si', 'recloser.r1 phasedelayed': 'iec_vi',
+                          'tlink': 'iec_ei'})
+    dss.buid_TCCmodels()
+    times = dss.get_fault_actiontimes()
+    assert times.shape == dss.fault_currents.shape
+    #Fastest curve of each device:
+    for (device, curves) in [('recloser.r1', ['phasefast', 'phasedelayed']), ('fuse.f1', ['fusecurve'])]:
+        j = dss.fault_devices.index(device)
+        Icc = dss.fault_currents[:, :, j].ravel()
+        placed = ~np.isnan(Icc)
+        curve_times = dss.get_protactiontimes([(device, curve) for curve in curves], Icc[placed])
+        assert times[:, :, j].ravel()[placed] == pytest.approx(curve_times.min(axis=1))
+    #No time for the faults not placed (3ph in b6):
+    assert np.isnan(times[1, 1]).all() and not np.isnan(times[1, 0]).any()
+
+
+def test_read_faultstudy(circuit_file, tmp_path):
+    dss = DSS_Faultanalysis(circuit_file, engine='fake')
+    report = tmp_path / 'faultstudy.csv'
+    report.write_text('Bus, 3-Phase, 1-Phase, L-L\n'
+                      '"SOURCEBUS", 9000, 8000, 7000\n'
+                      '"B6", , 500, \n'
+                      '"UNKNOWN", 1, 1, 1\n')
+    bus_isc = dss.read_faultstudy(str(report))
+    assert list(bus_isc[dss.bus_index['sourcebus']]) == [8000, 7000, 9000]
+    assert np.array_equal(bus_isc[dss.bus_index['b6']], [500, np.nan, np.nan], equal_nan=True)
+    assert np.isnan(bus_isc[dss.bus_index['b3']]).all()
+
+
+def test_run_faults_parallel(circuit_file):
+    #The workers start the engine from its import path:
+    dss = DSS_Faultanalysis(circuit_file, engine='tests.fake_engine:FakeDSS')
+    currents = dss.run_faults_parallel(n_workers=2, chunk_size=2)
+    assert np.array_equal(currents, expected_currents(dss.fault_buses, dss.fault_devices), equal_nan=True)
+    assert np.array_equal(dss.fault_placed, ~np.isnan(currents[:, :, 0]))
+    assert np.array_equal(dss.fault_converged, dss.fault_placed)
+    assert dss.fault_sweep_stats['n_faults'] == np.count_nonzero(dss.fault_placed)
+    #Same results of the serial sweep:
+    serial = DSS_Faultanalysis(circuit_file, engine='fake')
+    serial.run_faults()
+    assert np.array_equal(currents, serial.fault_currents, equal_nan=True)
+    assert list(dss.fault_kvbases) == list(serial.fault_kvbases)
+
+
+def test_run_faults_parallel_needs_engine_name(circuit_file):
+    dss = DSS_Faultanalysis(circuit_file, engine=FakeDSS())
+    with pytest.raises(ValueError):
+        dss.run_faults_parallel(n_workers=1)
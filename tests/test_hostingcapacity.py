@@ -0,0 +1,66 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.hostingcapacity import DSS_hostingcapacity, HC_LIMITS, HC_METRICS
+from tests.fake_engine import DG_RISE, FakeDSS
+
+
+# Highest node voltage [pu] of the fake circuit with fixed voltages and no DG
+# (see tests.fake_engine) and the DG size [kW] that raises it to 1.05 pu (the
+# kV bases of the DSS class are rounded, so the voltages are approximated):
+V_NODG = 0.97
+HC_KW = (1.05 - V_NODG)/DG_RISE
+
+
+def metric(results, name):
+    #This subroutine returns the column of the given metric.
+
+    return results[:, HC_METRICS.index(name)]
+
+
+def test_hostingcapacity(circuit_file):
+    dss = DSS_hostingcapacity(circuit_file, engine=FakeDSS(fixed_voltages=True))
+    assert dss.get_hc_buses() == ['b1', 'b2', 'b6', 'b3', 'b4', 'b5']
+    results = dss.run_hostingcapacity(max_kw=2000, tol_kw=10)
+    assert results.shape == (6, len(HC_METRICS))
+    #Bisection until the interval is smaller than the tolerance:
+    hc_kw = metric(results, 'hc_kw')
+    assert np.all((hc_kw > HC_KW - 12) & (hc_kw <= HC_KW + 2))
+    assert np.all(metric(results, 'limit') == HC_LIMITS.index('overvoltage'))
+    assert np.all(metric(results, 'n_solves') == 1 + 8)
+    assert metric(results, 'vmax_pu') == pytest.approx(V_NODG + DG_RISE*hc_kw, rel=1e-3)
+    assert np.all(metric(results, 'vmax_pu') <= 1.05)
+    assert metric(results, 'loading_max') == pytest.approx(np.full(6, 301/4))
+    assert dss.hc_stats['n_solves'] == 6*9
+    #The DG is removed and the circuit without it is solved again:
+    assert dss.dssObj.generator['enabled'] == 'no' and dss.dssObj.dg_rise == 0
+    #Single-phase DG in the single-phase bus:
+    assert 'phases=1 bus1=b6.1' in [command for command in dss.dssObj.Text.log if 'bus1=b6' in command][0]
+
+
+def test_hostingcapacity_limits(circuit_file):
+    dss = DSS_hostingcapacity(circuit_file, engine=FakeDSS(fixed_voltages=True))
+    #No violation with the largest size:
+    results = dss.run_hostingcapacity(['b3'], max_kw=100)
+    assert list(results[0, :HC_METRICS.index('time')]) == pytest.approx([100, V_NODG + DG_RISE*100, 0.95 + DG_RISE*100,
+                                                                          301/4, 0, 1], rel=1e-3)
+    #Violations with every size: the values of the circuit without the DG.
+    results = dss.run_hostingcapacity(['b3'], max_kw=50, tol_kw=1, v_min=0.96)
+    assert metric(results, 'hc_kw')[0] == 0 and metric(results, 'limit')[0] == HC_LIMITS.index('undervoltage')
+    assert metric(results, 'vmin_pu')[0] == pytest.approx(0.95, rel=1e-3)
+    assert metric(results, 'n_solves')[0] == 1 + 6 + 1
+    results = dss.run_hostingcapacity(['b3'], max_kw=50, tol_kw=1, loading_limit=50)
+    assert metric(results, 'limit')[0] == HC_LIMITS.index('thermal')
+
+
+def test_hostingcapacity_parallel(circuit_file):
+    dss = DSS_hostingcapacity(circuit_file, engine='tests.fake_engine:fixed_voltages_engine')
+    parallel = dss.run_hostingcapacity(max_kw=2000, tol_kw=10, n_workers=2, chunk_size=2)
+    serial = dss.run_hostingcapacity(max_kw=2000, tol_kw=10)
+    columns = [HC_METRICS.index(name) for name in HC_METRICS if name != 'time']
+    assert parallel[:, columns] == pytest.approx(serial[:, columns])
+    assert sum(worker[0] for worker in dss.hc_stats['workers'].values()) == 6
@@ -0,0 +1,54 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.master import DSS
+
+
+def lvrt_circuit(circuit_file):
+    #This subroutine returns the fake circuit with two LVRT curves: "steps"
+    #(with a vertical segment at 0.5 pu) and "flat" (1 s below 0.9 pu).
+
+    dss = DSS(circuit_file, engine='fake')
+    dss.LVRT_curves = {'steps': (4, [0.2, 0.5, 0.5, 0.9], [0.15, 1, 2, 3]),
+                       'flat': (2, [0.9, 0.5], [1, 1])}
+    dss.buid_LVRTmodels()
+    return dss
+
+
+def test_DGprotactiontimes(circuit_file):
+    dss = lvrt_circuit(circuit_file)
+    #The vertical segment is discarded and the points are sorted:
+    assert np.array_equal(dss.LVRT_models['steps'][0], [0.2, 0.5])
+    assert np.array_equal(dss.LVRT_models['flat'][1], [0.9])
+    vmag = np.array([[0.2, 0.5, 0.7], [0.9, 0.95, 1.0]])
+    times = dss.get_DGprotactiontimes(vmag)
+    assert times['steps'].shape == vmag.shape
+    assert times['steps'] == pytest.approx(np.array([[150, 1000, 2500], [3000, np.inf, np.inf]]))
+    assert times['flat'] == pytest.approx(np.array([[1000, 1000, 1000], [1000, np.inf, np.inf]]))
+    assert dss.get_DGprotactiontime(0.7) == pytest.approx({'steps': 2500, 'flat': 1000})
+
+
+def test_DGexposure(circuit_file):
+    dss = lvrt_circuit(circuit_file)
+    #The first DG recovers at the third step (the exposure restarts) and is
+    #disconnected after four steps below the curve; the second one never sags:
+    vmag = np.array([[0.8, 1], [0.8, 1], [1, 1], [0.8, 1], [0.8, 1], [0.8, 1], [0.8, 1], [0.8, 1]])
+    (exposure, disc_time) = dss.get_DGexposure(vmag, 0.25)['flat']
+    assert exposure[:, 0] == pytest.approx([0.25, 0.5, 0, 0.25, 0.5, 0.75, 1, 1.25])
+    assert np.all(exposure[:, 1] == 0)
+    assert disc_time == pytest.approx([1.75, np.inf])
+    #An instantaneous actuation disconnects the DG at the first step:
+    dss.LVRT_models['instant'] = (np.array([0.5]), np.array([0.9]), np.array([0.0]), np.array([0.0]))
+    assert dss.get_DGexposure(vmag, 0.25)['instant'][1] == pytest.approx([0.25, np.inf])
+
+
+def test_DGvmin(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    assert list(dss.allDGs) == ['pvsystem.pv1']
+    #Lowest node voltage of the PV bus (b4, nodes 1 to 3):
+    assert dss.get_DGvmin() == pytest.approx([dss.dssObj.scale-0.03], rel=1e-3)
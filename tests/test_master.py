@@ -0,0 +1,156 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.master import DSS
+from tests.fake_engine import FakeDSS
+
+
+ELEMENTS_ATTRS = ['PD_elements', 'PC_elements', 'Protect_elements', 'DG_Protect', 'Other_elements', 'subs',
+                  'allLines', 'allSwitches', 'feeder_length']
+
+
+def test_classes_read_in_bulk(circuit_file):
+    bulk = FakeDSS()
+    dss = DSS(circuit_file, engine=bulk)
+    #One JSON export per class (the lines are read once) and no element reads:
+    assert bulk.n_class_reads == len(set(name.split('.')[0] for name in bulk.elements))
+    assert bulk.n_element_reads == 0
+    #Same data of the engines without the JSON export:
+    single = DSS(circuit_file, engine=FakeDSS(bulk=False))
+    for attr in ELEMENTS_ATTRS:
+        assert getattr(dss, attr) == getattr(single, attr)
+    assert dss.Protect_elements['recloser.r1'] == ('recloser', 'line.l1', 'line.l1',
+                                                   [('phasefast', 'a', 0.0, 200.0, 1.0),
+                                                    ('phasedelayed', 'd', 0.0, 200.0, 1.0)],
+                                                   [0.5, 2.0, 2.0], 'r1')
+    #Switched object not given:
+    assert dss.Protect_elements['fuse.f1'][1:3] == ('line.l2', 'line.l2')
+    assert dss.PD_elements['line.l4'] == ('line', ['b1.1', 'b6.1'], ['b1', 'b6'], 'l4')
+    assert dss.PD_elements['transformer.t1'][2] == ['b2', 'b3']
+    assert dss.allSwitches == ['sw1']
+    assert dss.feeder_length == pytest.approx(1 + 2*1.6093 + 0.1 + 0.2*0.3048)
+
+
+def test_lazy_stages(circuit_file):
+    dss = DSS(circuit_file, engine='fake', lazy=True)
+    assert 'kvbases' not in dss.stages_done
+    assert dss.bus_kvbases['b3'] == pytest.approx(0.48/3**0.5, rel=1e-3)
+    #The stage and the stages it depends on were run:
+    assert {'lines', 'elements', 'busconnect', 'kvbases'} <= dss.stages_done
+    assert 'dist2subs' not in dss.stages_done
+
+
+def test_lazy_kvbases_use_initial_voltages(circuit_file):
+    eager = DSS(circuit_file, engine='fake')
+    lazy = DSS(circuit_file, engine='fake', lazy=True)
+    #Voltage sag (e.g. a fault) before the first access:
+    lazy.dssObj.scale = 0.5
+    assert lazy.bus_kvbases == eager.bus_kvbases
+
+
+def test_invalidate_cascades(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    kvbases = dict(dss.bus_kvbases)
+    invalid = dss.invalidate('busconnect')
+    assert {'busconnect', 'kvbases', 'dist2subs', 'interrupt', 'secnets', 'vbases'} <= invalid
+    assert 'lines' not in invalid and 'elements' not in invalid
+    assert 'bus_kvbases' not in dss.__dict__
+    assert 'node_vbase' not in dss.__dict__
+    #Calculated again on the next access:
+    assert dss.bus_kvbases == kvbases
+    assert 'kvbases' in dss.stages_done
+
+
+def expected_vpu(dss, node):
+    #This subroutine returns the fake engine voltage [pu] of the given node
+    #(the kV bases of the DSS class are rounded, so it is approximated).
+
+    return pytest.approx(dss.dssObj.scale-0.01*node, rel=1e-3)
+
+
+def test_allvbus(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    V_abc = dss.get_allvbus()
+    assert [len(V) for V in V_abc] == [len(dss.allBuses)]*3
+    i = dss.allBuses.index('b3')
+    assert [V[i] for V in V_abc] == [expected_vpu(dss, node) for node in [1, 2, 3]]
+    #Single-phase bus: the phases B and C are zero.
+    i = dss.allBuses.index('b6')
+    assert [V[i] for V in V_abc] == [expected_vpu(dss, 1), 0, 0]
+
+
+def test_minvbus(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    Vmin = dss.get_minvbus()
+    assert sorted(Vmin) == sorted(dss.allBuses)
+    assert Vmin['b3'] == expected_vpu(dss, 3)
+    assert Vmin['b6'] == expected_vpu(dss, 1)
+    assert dss.get_minvbus(['b6', 'b1']) == {'b6': Vmin['b6'], 'b1': Vmin['b1']}
+    #Stored voltages and selected buses:
+    vmag = 2*dss.get_snapshot().node_vmag
+    mask = np.isin(dss.allBuses, ['b3', 'b6'])
+    assert dss.calc_minvbus(vmag, mask) == pytest.approx(2*dss.calc_minvbus()[mask])
+
+
+def test_vbus_lookup(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    assert dss.get_vbus('b3') == {'VA': expected_vpu(dss, 1), 'VB': expected_vpu(dss, 2), 'VC': expected_vpu(dss, 3)}
+    assert dss.get_vbus('unknown') == {'VA': 0, 'VB': 0, 'VC': 0}
+    snapshot = dss.get_snapshot()
+    V_buses = dss.get_vbuses(['b6', 'b1'])
+    assert V_buses['b6'] == {'VA': expected_vpu(dss, 1), 'VB': 0, 'VC': 0}
+    #The voltages of the same solution are read once:
+    assert dss.get_snapshot() is snapshot
+
+
+def test_elements_currents(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    (I_mag, I_ang) = dss.get_elements_currents(['line.l1', 'line.l4'])
+    assert I_mag.shape == (2, 2, 3)
+    assert np.array_equal(I_mag[0], [[100, 200, 300], [101, 201, 301]])
+    #Single-phase line: the conductors it doesn't have are NaN.
+    assert np.array_equal(I_mag[1], [[100, np.nan, np.nan], [101, np.nan, np.nan]], equal_nan=True)
+    assert np.array_equal(dss.get_ICCcurrents(['line.l1', 'line.l4', 'load.ld1']), [301, 101, 300])
+    assert dss.get_ICCcurrent('line.l4') == 101
+    assert dss.get_currents('line.l1') == [100, 200, 300]
+
+
+def test_apply_edits(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    zone = list(dss.Protect_interrupt['recloser.r1'])
+    assert 'b2' in zone
+    version = dss.solution_version
+    snapshot = dss.apply_edits([('open', 'line.sw1'), ('load_kw', 'load.ld1', 30), ('tap', 'transformer.t1', 1.02)])
+    assert dss.solution_version > version
+    assert snapshot.is_valid()
+    assert dss.open_elements == {'line.sw1'}
+    assert 'b2' not in dss.Protect_interrupt['recloser.r1']
+    assert 'b2' not in dss.bus_dist2subs
+    assert dss.apply_edits([('close', 'line.sw1')], solve=False) is None
+    assert dss.open_elements == set()
+    assert dss.Protect_interrupt['recloser.r1'] == zone
+    with pytest.raises(ValueError):
+        dss.apply_edits([('foo', 'line.l1')])
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_deenergized_bus_voltage(circuit_file, lazy):
+    dss = DSS(circuit_file, engine='fake', lazy=lazy)
+    n_commands = len(dss.dssObj.Text.log)
+    dss.apply_edits([('open', 'line.l4')])
+    #The de-energized bus keeps its kV base (the kV bases aren't read again):
+    assert dss.get_minvbus(['b6']) == {'b6': 0}
+    assert dss.get_minvbus(['b5'])['b5'] == expected_vpu(dss, 3)
+    assert dss.bus_kvbases['b6'] == dss.bus_kvbases['b1']
+    if not lazy:
+        assert not any(command.startswith('?') for command in dss.dssObj.Text.log[n_commands:])
+    dss.apply_edits([('close', 'line.l4')])
+    assert dss.get_minvbus(['b6'])['b6'] == expected_vpu(dss, 1)
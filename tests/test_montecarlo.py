@@ -0,0 +1,83 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.montecarlo import DSS_montecarlo, RunningStats, sample_multipliers
+
+
+def test_sample_multipliers():
+    rng = np.random.default_rng(1)
+    multipliers = sample_multipliers(rng, 'gaussian', 20000, 3, 2, std=0.1)
+    assert multipliers.shape == (20000, 5)
+    assert multipliers.mean(axis=0) == pytest.approx(np.ones(5), abs=0.005)
+    assert multipliers.std(axis=0) == pytest.approx(np.full(5, 0.1), rel=0.03)
+    #Independent elements:
+    assert abs(np.corrcoef(multipliers[:, 0], multipliers[:, 1])[0, 1]) < 0.05
+    #One multiplier for the loads and another one for the DGs:
+    shared = sample_multipliers(rng, 'Gaussian_Shared', 1000, 3, 2)
+    assert np.all(shared[:, :3] == shared[:, [0]]) and np.all(shared[:, 3:] == shared[:, [3]])
+    assert not np.all(shared[:, 0] == shared[:, 3])
+    uniform = sample_multipliers(rng, 'uniform', 1000, 2, 0, bounds=(0.8, 1.2))
+    assert uniform.shape == (1000, 2) and uniform.min() >= 0.8 and uniform.max() < 1.2
+    #Negative multipliers are set to zero:
+    assert sample_multipliers(rng, 'gaussian', 1000, 1, 0, std=2).min() == 0
+    #Same seed, same multipliers:
+    assert np.array_equal(sample_multipliers(np.random.default_rng(5), 'uniform', 3, 2, 1),
+                          sample_multipliers(np.random.default_rng(5), 'uniform', 3, 2, 1))
+    with pytest.raises(ValueError):
+        sample_multipliers(rng, 'm1', 1, 1, 1)
+
+
+def test_running_stats_merge():
+    samples = np.random.default_rng(2).normal(5, 3, (1001, 4))
+    #Blocks of different sizes (and one sample) merged in two objects:
+    stats = RunningStats(4)
+    other = RunningStats(4)
+    stats.update(samples[:10])
+    stats.update(samples[10])
+    stats.update(samples[11:11])
+    other.update(samples[11:600])
+    other.update(samples[600:])
+    stats.merge(other)
+    stats.merge(RunningStats(4))
+    assert stats.n == 1001
+    assert stats.mean == pytest.approx(samples.mean(axis=0))
+    assert stats.get_var() == pytest.approx(samples.var(axis=0, ddof=1))
+    assert stats.get_std() == pytest.approx(samples.std(axis=0, ddof=1))
+    assert np.array_equal(stats.min, samples.min(axis=0)) and np.array_equal(stats.max, samples.max(axis=0))
+    #Merged into empty statistics:
+    empty = RunningStats(4)
+    empty.merge(stats)
+    assert empty.mean == pytest.approx(stats.mean) and empty.M2 == pytest.approx(stats.M2)
+    single = RunningStats(4)
+    single.update(samples[0])
+    assert np.isnan(single.get_var()).all()
+
+
+def test_run_montecarlo(circuit_file):
+    dss = DSS_montecarlo(circuit_file, engine='fake')
+    stats = dss.run_montecarlo(25, 'uniform', seed=3, chunk_size=10)
+    assert stats['vbus'].n == 25 and dss.mc_failed == 0
+    assert dss.mc_columns['vbus'] == list(dss.allNodes)
+    assert stats['losses'].mean == pytest.approx([1, 0.2])
+    #The loads and DGs are restored after the trials:
+    (loads, dgs, base) = dss.get_mc_elements()
+    assert (loads, dgs) == (['load.ld1', 'load.ld2'], ['pvsystem.pv1'])
+    assert dss.dssObj.Text.log[-3:] == ['Edit load.ld1 kW=45.0', 'Edit load.ld2 kW=9.0',
+                                        'Edit pvsystem.pv1 irradiance=1.0']
+    with pytest.raises(ValueError):
+        dss.run_montecarlo(1, 'm2')
+
+
+def test_run_montecarlo_parallel(circuit_file):
+    #The results of a seed don't depend on the number of workers:
+    dss = DSS_montecarlo(circuit_file, engine='tests.fake_engine:FakeDSS')
+    serial = dss.run_montecarlo(30, 'gaussian', ['loading', 'losses'], seed=7, chunk_size=8)
+    serial = dict((quantity, (serial[quantity].n, serial[quantity].mean)) for quantity in serial)
+    parallel = dss.run_montecarlo(30, 'gaussian', ['loading', 'losses'], seed=7, n_workers=2, chunk_size=8)
+    for quantity in serial:
+        assert parallel[quantity].n == serial[quantity][0]
+        assert parallel[quantity].mean == pytest.approx(serial[quantity][1])
@@ -0,0 +1,144 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.protection import DSS_protection
+
+
+# Analytic curves of the fake circuit devices (see DSS.config_TCCcurves):
+ANALYTIC_CURVES = {'recloser.r1 phasefast': 'iec_ei', 'recloser.r1 phasedelayed': 'iec_vi', 'tlink': 'iec_ei'}
+
+
+def protection_circuit(circuit_file):
+    #This subroutine returns the fake circuit with the fault study done and
+    #the TCC models built.
+
+    dss = DSS_protection(circuit_file, engine='fake')
+    dss.run_faults()
+    dss.config_TCCcurves(ANALYTIC_CURVES)
+    dss.buid_TCCmodels()
+    return dss
+
+
+def test_coordination_pairs(circuit_file):
+    dss = DSS_protection(circuit_file, engine='fake')
+    assert dss.Protect_interrupt['fuse.f1'] == ['b4', 'b5']
+    assert dss.get_coordination_pairs() == [('recloser.r1', 'fuse.f1'), ('recloser.r1', 'fuse.f2')]
+
+
+def test_check_coordination(circuit_file):
+    dss = protection_circuit(circuit_file)
+    violations = dss.check_coordination(cti=300)
+    assert dss.coord_pairs == [('recloser.r1', 'fuse.f1'), ('recloser.r1', 'fuse.f2')]
+    #Only the faults in the downstream device zone are checked, each device
+    #with its own current and the recloser with its delayed curve:
+    for (n, (up, down)) in enumerate(dss.coord_pairs):
+        j_up = dss.fault_devices.index(up)
+        j_down = dss.fault_devices.index(down)
+        for (i, bus) in enumerate(dss.fault_buses):
+            for k in range(len(dss.fault_types)):
+                Icc = dss.fault_currents[i, k]
+                if bus not in dss.Protect_interrupt[down] or np.isnan(Icc[j_down]):
+                    assert np.isnan(dss.coord_margins[i, k, n])
+                    continue
+                t_up = dss.get_protactiontime(up, 'phasedelayed', Icc[j_up])
+                t_down = dss.get_protactiontime(down, 'fusecurve', Icc[j_down])
+                assert dss.coord_margins[i, k, n] == pytest.approx(t_up - t_down)
+    assert dss.coord_min_margin == pytest.approx([np.nanmin(dss.coord_margins[:, :, n]) for n in range(2)])
+    assert violations == [pair for (pair, margin) in zip(dss.coord_pairs, dss.coord_min_margin) if margin < 300]
+    assert dss.check_coordination(cti=0) == []
+    #With the fastest curves the recloser fast curve is taken:
+    min_margin = dss.coord_min_margin
+    dss.check_coordination(cti=0, curve_types=None)
+    assert np.all(dss.coord_min_margin < min_margin)
+
+
+def test_upstream_device_not_acting(circuit_file):
+    dss = protection_circuit(circuit_file)
+    #A recloser pickup above all fault currents: always coordinated.
+    dss.TCC_analytic['recloser.r1 phasedelayed'] = ('iec_vi', 1e9, 0.0, 1.0)
+    dss.buid_TCCmodels()
+    assert dss.check_coordination(cti=300) == []
+    assert np.all(np.isinf(dss.coord_min_margin))
+
+
+def reclosing_circuit(circuit_file):
+    #This subroutine returns the fake circuit with the fault study done and
+    #with pickup currents above the load currents: the recloser fast curve is
+    #faster than the fuses and the delayed one is slower.
+
+    dss = DSS_protection(circuit_file, engine='fake')
+    dss.run_faults()
+    dss.config_TCCcurves(ANALYTIC_CURVES)
+    dss.TCC_analytic = {'recloser.r1 phasefast': ('iec_ei', 500, 0.0, 1.0),
+                        'recloser.r1 phasedelayed': ('iec_vi', 500, 0.0, 2.0),
+                        'fuse.f1 fusecurve': ('iec_vi', 400, 0.0, 1.0),
+                        'fuse.f2 fusecurve': ('iec_vi', 400, 0.0, 1.0)}
+    dss.buid_TCCmodels()
+    return dss
+
+
+def test_state_currents(circuit_file):
+    dss = reclosing_circuit(circuit_file)
+    n_solves = dss.dssObj.n_solves
+    state_cache = dict()
+    #Fault isolated by the fuse f1 (line.l2 open): load currents upstream.
+    assert dss.get_state_currents('b5', '3ph', frozenset(['line.l2']), True, state_cache) == [301, 0, 101]
+    #Recloser open: no current at all.
+    assert dss.get_state_currents('b5', '3ph', frozenset(['line.l1']), True, state_cache) == [0, 0, 0]
+    assert dss.get_state_currents('b5', '1ph', frozenset(), False, state_cache) == [301, 301, 101]
+    assert dss.dssObj.n_solves == n_solves + 3
+    #The circuit is restored (without a new solution) and the states are
+    #solved once:
+    assert dss.dssObj.open_elements == set() and dss.dssObj.fault['enabled'] == 'no'
+    assert dss.get_state_currents('b4', '2ph', frozenset(), False, state_cache) == [301, 301, 101]
+    assert dss.dssObj.n_solves == n_solves + 3
+
+
+def test_sequence_resolves_after_operations(circuit_file):
+    dss = reclosing_circuit(circuit_file)
+    I_fault = 301 + 3000*7
+    t_fast = 80/((I_fault/500)**2 - 1)
+    t_fuse = 13.5/(I_fault/400 - 1)
+    #Permanent fault: fast trip, reclosing and fuse melting (fuse saving). The
+    #fault is isolated by the fuse, so the recloser only sees the load current.
+    n_solves = dss.dssObj.n_solves
+    (sequence, i2t) = dss.simulate_sequence('b5', '3ph')
+    t_melt = t_fast + 0.5 + (1 - t_fast/t_fuse)*t_fuse
+    assert [event[1:] for event in sequence] == [('recloser.r1', 'trip'), ('recloser.r1', 'reclose'),
+                                                 ('fuse.f1', 'melt')]
+    assert [event[0] for event in sequence] == pytest.approx([t_fast, t_fast + 0.5, t_melt])
+    faulted_time = t_melt - 0.5
+    assert i2t == pytest.approx({'recloser.r1': I_fault**2*faulted_time, 'fuse.f1': I_fault**2*faulted_time,
+                                 'fuse.f2': 101**2*faulted_time})
+    #Two states solved (recloser open, fuse melted) and the pre-fault circuit:
+    assert dss.dssObj.n_solves == n_solves + 3
+    assert dss.dssObj.solved_fault is None
+    #Temporary fault: it ends while the recloser is open and the reclosing
+    #restores the load.
+    (sequence, i2t) = dss.simulate_sequence('b5', '3ph', fault_duration=0.3)
+    assert [event[1:] for event in sequence] == [('recloser.r1', 'trip'), (None, 'fault_end'),
+                                                 ('recloser.r1', 'reclose')]
+
+
+def test_sequences_share_states(circuit_file):
+    dss = reclosing_circuit(circuit_file)
+    faults = [('b5', '3ph'), ('b4', '1ph')]
+    results = dss.simulate_sequences(faults, fault_duration=0.3)
+    for fault in faults:
+        assert results[fault] == dss.simulate_sequence(*fault, fault_duration=0.3)
+    #States: recloser open with each fault and the circuit without the fault
+    #(solved once for both), plus the pre-fault solution at the end.
+    n_solves = dss.dssObj.n_solves
+    dss.simulate_sequences(faults, fault_duration=0.3)
+    assert dss.dssObj.n_solves == n_solves + 4
+
+
+def test_switching_clears_zone_sets(circuit_file):
+    dss = DSS_protection(circuit_file, engine='fake')
+    assert 'b2' in dss.get_zone_set('recloser.r1')
+    dss.apply_edits([('open', 'line.sw1')])
+    assert 'b2' not in dss.get_zone_set('recloser.r1')
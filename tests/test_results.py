@@ -0,0 +1,51 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.results import ResultsStore
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_append_and_read(tmp_path, compress):
+    store = ResultsStore(str(tmp_path), chunk_rows=4, compress=compress)
+    store.add_dataset('x', ['a', 'b', 'c'], ids=[7, 8, 7])
+    values = np.arange(33, dtype='float32').reshape(11, 3)
+    store.append('x', values[:5])
+    for row in values[5:]:
+        store.append('x', row)
+    store.close()
+    store = ResultsStore(str(tmp_path))
+    assert store.n_rows('x') == 11
+    assert store.meta['datasets']['x']['chunks_rows'] == [4, 4, 3]
+    assert np.array_equal(store.read('x'), values)
+    assert np.array_equal(store.read('x', ['c', 'a'], rows=slice(3, 10, 2)), values[3:10:2][:, [2, 0]])
+    assert np.array_equal(store.read('x', ids=[7]), values[:, [0, 2]])
+    assert np.array_equal(store.column('x', 'b'), values[:, 1])
+    with pytest.raises(ValueError):
+        store.read('x', rows=slice(None, None, -1))
+
+
+def test_append_to_existing_store(tmp_path):
+    store = ResultsStore(str(tmp_path), chunk_rows=4)
+    store.add_dataset('x', ['a'])
+    store.append('x', np.arange(3))
+    store.close()
+    store = ResultsStore(str(tmp_path))
+    store.append('x', np.arange(3, 9))
+    store.close()
+    assert np.array_equal(ResultsStore(str(tmp_path)).column('x', 'a'), np.arange(9))
+    store = ResultsStore(str(tmp_path), overwrite=True)
+    assert store.meta['datasets'] == dict()
+
+
+def test_dataset_without_columns(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    store.add_dataset('dg', [])
+    store.append('dg', [])
+    store.append('dg', np.zeros((3, 0)))
+    store.close()
+    assert store.n_rows('dg') == 0
+    assert store.read('dg').shape == (0, 0)
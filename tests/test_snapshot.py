@@ -0,0 +1,45 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.master import DSS
+
+
+def test_snapshot_invalidation(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    snapshot = dss.get_snapshot()
+    assert snapshot.is_valid() and dss.get_snapshot() is snapshot
+    #Queries don't change the solution:
+    dss.dssText.Command = '? line.l1.length'
+    assert snapshot.is_valid()
+    #New solution:
+    dss.solve()
+    assert not snapshot.is_valid()
+    new_snapshot = dss.get_snapshot()
+    assert new_snapshot is not snapshot
+    assert not np.array_equal(new_snapshot.node_vmag, snapshot.node_vmag)
+    #Circuit edits through the Text and Circuit interfaces:
+    dss.dssText.Command = 'Edit load.ld1 kW=10'
+    assert not new_snapshot.is_valid()
+    snapshot = dss.get_snapshot()
+    dss.dssCircuit.Disable('capacitor.c1')
+    assert not snapshot.is_valid()
+    with pytest.raises(RuntimeError):
+        snapshot.get_element('line.l1')
+
+
+def test_snapshot_values(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    dss.solve()
+    snapshot = dss.get_snapshot()
+    assert snapshot.converged
+    assert np.allclose(snapshot.losses, [1.0, 0.2])
+    assert np.allclose(snapshot.node_vmag, dss.dssCircuit.AllBusVmag)
+    (currents, powers, n_terminals) = snapshot.get_element('line.l1')
+    assert n_terminals == 2 and len(currents) == 12
+    #Element results are read once:
+    assert snapshot.get_element('line.l1')[0] is currents
@@ -0,0 +1,124 @@
+# Native-python libs:
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss import tcc
+from dss.master import DSS
+
+
+def reference_times(model, Icc):
+    #This subroutine evaluates one TCC model for each current (reference of
+    #the vectorised curves_times).
+
+    times = list()
+    for I in Icc:
+        if model[0] == 'analytic':
+            (kind, A, B, p, I_pickup, T_delay, T_mult) = model
+            M = I/I_pickup
+            times.append(T_delay + T_mult*(A/(M**p - 1) + B) if M > 1 else np.inf)
+            continue
+        (kind, c_lo, c_hi, slopes, intercepts) = model
+        if not I >= c_lo[0]:
+            times.append(np.inf)
+            continue
+        I = min(I, c_hi[-1])
+        k = min(int(np.searchsorted(c_hi, I)), len(c_hi)-1)
+        times.append(np.exp(slopes[k]*np.log(I) + intercepts[k]))
+    return np.array(times)
+
+
+def random_models(rng, n_models):
+    models = list()
+    for i in range(n_models):
+        if i % 4 == 3:
+            models.append(tcc.analytic_model(['ieee_vi', 'iec_si', 'iec_ei'][i % 3], rng.uniform(50, 500),
+                                              rng.uniform(0, 0.1), rng.uniform(0.5, 2)))
+        else:
+            n_points = rng.integers(2, 12)
+            currents = np.cumsum(rng.uniform(1, 300, n_points))*10**rng.uniform(-1, 2)
+            times = np.sort(rng.uniform(0.01, 100, n_points))[::-1]
+            models.append(tcc.points_model(currents, times))
+    return models
+
+
+def test_curves_times_match_reference():
+    rng = np.random.default_rng(7)
+    models = random_models(rng, 40)
+    Icc = 10**rng.uniform(-1, 5, (200, len(models)))
+    #Currents below the curves, exactly on the points, zero and NaN:
+    Icc[0] = 0
+    Icc[1] = np.nan
+    for j, model in enumerate(models):
+        if model[0] == 'points':
+            Icc[2:2+len(model[2]), j] = model[2]
+            Icc[20, j] = model[1][0]
+    times = tcc.curves_times(models, Icc)
+    assert times.shape == Icc.shape
+    for j, model in enumerate(models):
+        assert np.allclose(times[:, j], reference_times(model, Icc[:, j]), rtol=1e-9)
+
+
+def test_points_model_interpolation():
+    model = tcc.points_model([100, 200, 400, 400, 0], [10, 1, 0.1, 0.05, 5])
+    #Repeated and non-positive points are discarded:
+    assert np.array_equal(model[1], [100, 200]) and np.array_equal(model[2], [200, 400])
+    times = tcc.curves_times([model], [[50], [100], [np.sqrt(100*200)], [400], [1e6]])[:, 0]
+    assert times == pytest.approx([np.inf, 10, np.sqrt(10), 0.1, 0.1])
+    with pytest.raises(ValueError):
+        tcc.points_model([100, 100], [1, 2])
+
+
+def test_analytic_curves_mapping(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    assert dss.TCC_analytic == dict()
+    #Device curve, device and curve name keys (in this order of priority):
+    dss.config_TCCcurves({'recloser.r1 phasefast': 'IEEE_VI', 'recloser.r1': 'iec_ei', 'tlink': 'iec_vi'})
+    assert dss.TCC_analytic == {'recloser.r1 phasefast': ('ieee_vi', 200.0, 0.0, 1.0),
+                                'recloser.r1 phasedelayed': ('iec_ei', 200.0, 0.0, 1.0),
+                                'fuse.f1 fusecurve': ('iec_vi', 65.0, 0.0, 1),
+                                'fuse.f2 fusecurve': ('iec_vi', 10.0, 0.0, 1)}
+    dss.buid_TCCmodels()
+    times = dss.get_protactiontimes([('recloser.r1', 'phasefast'), ('fuse.f1', 'fusecurve')], [400, 650])
+    assert times[:, 0] == pytest.approx(1000*(19.61/(np.array([2, 3.25])**2 - 1) + 0.491))
+    assert times[:, 1] == pytest.approx(1000*(13.5/(np.array([400/65, 10]) - 1)))
+    #The mapping is kept by the next calls:
+    dss.config_TCCcurves()
+    assert len(dss.TCC_analytic) == 4
+    with pytest.raises(ValueError):
+        dss.config_TCCcurves({'tlink': 'unknown'})
+    assert dss.TCC_analytic_curves['tlink'] == 'iec_vi'
+
+
+def test_read_tcc_file(tmp_path):
+    (tmp_path / 'times.csv').write_text('10\n1\n0.1\n')
+    (tmp_path / 'TCC_Curve.dss').write_text(
+        '! TCC curves\n'
+        'New TCC_Curve.A npts=3 C_array=[1, 2, 10] T_array=[5 1 0.1]\n'
+        'New "TCC_Curve.tlink" 3 (100 200 1000)\n'
+        '~ (file=times.csv)  // times from a file\n'
+        'New XYCurve.eff npts=2 xarray=[0 1] yarray=[0.9 1]\n')
+    curves = tcc.read_curves(str(tmp_path / 'TCC_Curve.dss'))
+    assert sorted(curves) == ['a', 'tlink']
+    assert curves['a'][0] == 3 and np.array_equal(curves['a'][2], [5, 1, 0.1])
+    assert np.array_equal(curves['tlink'][1], [100, 200, 1000]) and np.array_equal(curves['tlink'][2], [10, 1, 0.1])
+
+
+def test_read_lvrt_file(tmp_path, circuit_file):
+    lvrt_file = tmp_path / 'LVRT_Curve.dss'
+    lvrt_file.write_text(
+        'New TCC_Curve.lvrt_a npts=3 C_array=[0.2 0.5 0.9] T_array=[0.15 1 3]\n'
+        'New XYCurve.lvrt_b npts=2 yarray=[0.2 2] xarray=[0.3 0.85]\n'
+        'New XYCurve.lvrt_c npts=3 points=[0.1 0.1, 0.5 0.5, 0.8 2]\n')
+    #All the curve classes of the LVRT file are read:
+    curves = tcc.read_curves(str(lvrt_file), tcc.LVRT_CLASSES)
+    assert sorted(curves) == ['lvrt_a', 'lvrt_b', 'lvrt_c']
+    assert np.array_equal(curves['lvrt_b'][1], [0.3, 0.85]) and np.array_equal(curves['lvrt_b'][2], [0.2, 2])
+    assert np.array_equal(curves['lvrt_c'][1], [0.1, 0.5, 0.8]) and np.array_equal(curves['lvrt_c'][2], [0.1, 0.5, 2])
+    assert list(tcc.read_curves(str(lvrt_file), ['xycurve'])) == ['lvrt_b', 'lvrt_c']
+    dss = DSS(circuit_file, engine='fake')
+    dss.DSS_LVRT_filename = str(lvrt_file)
+    dss.config_LVRTcurves()
+    assert sorted(dss.LVRT_curves) == ['lvrt_a', 'lvrt_b', 'lvrt_c']
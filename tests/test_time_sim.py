@@ -0,0 +1,36 @@
+# Native-python libs:
+import os
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.results import ResultsStore
+from dss.time_sim import DSS_time_sim, load_timeseries
+
+
+def test_defaults_without_dgs(circuit_file):
+    dss = DSS_time_sim(circuit_file, engine='fake_nodg')
+    assert dss.n_DGs == 0
+    out_dir = dss.run_timeseries()
+    assert out_dir == os.path.join(os.path.dirname(circuit_file), '__timesim_daily')
+    store = ResultsStore(out_dir)
+    #The 'dg' quantity has no columns:
+    assert sorted(store.meta['datasets']) == ['loading', 'losses', 'vbus']
+    (vbus, names) = load_timeseries(out_dir, 'vbus')
+    assert vbus.shape == (24, len(dss.allNodes))
+    assert names == list(dss.allNodes)
+    assert np.all((vbus > 0.9) & (vbus < 1.0))
+    assert load_timeseries(out_dir, 'losses')[0].shape == (24, 2)
+
+
+def test_dgs_and_steps(circuit_file):
+    dss = DSS_time_sim(circuit_file, engine='fake')
+    out_dir = dss.run_timeseries(n_steps=10, chunk_size=4, quantities=['dg', 'vbus'])
+    (dg, names) = load_timeseries(out_dir, 'dg')
+    assert dg.shape == (10, 1)
+    assert names == ['pvsystem.pv1']
+    assert ResultsStore(out_dir).meta['datasets']['vbus']['chunks_rows'] == [4, 4, 2]
+    with pytest.raises(ValueError):
+        dss.run_timeseries(quantities=['foo'])
@@ -0,0 +1,172 @@
+# Native-python libs:
+import sys
+
+# Third-party libraries:
+import numpy as np
+import pytest
+
+# My libraries:
+from dss.master import DSS
+from dss.topology import Topology
+
+
+def make_circuit(elements):
+    #This subroutine builds the DSS Bus_connect and PD_elements dictionaries
+    #of the given (element, type, bus1, bus2) list.
+
+    PD_elements = dict()
+    Bus_connect = dict()
+    for (element, element_type, bus1, bus2) in elements:
+        PD_elements[element] = (element_type, [bus1, bus2], [bus1, bus2], element.split('.')[1])
+        for bus in [bus1, bus2]:
+            Bus_connect.setdefault(bus, [list(), list()])
+        Bus_connect[bus1][1].append(element)
+        Bus_connect[bus2][0].append(element)
+    return (Bus_connect, PD_elements)
+
+
+def recursive_walk(Bus_connect, PD_elements, bus, visited, mode='all'):
+    #This subroutine is the recursive walk over Bus_connect replaced by the
+    #topology kernels (reference order).
+
+    visited.append(bus)
+    for element in Bus_connect[bus][1]:
+        if mode == 'no_transf' and PD_elements[element][0] == 'transformer':
+            continue
+        for new_bus in PD_elements[element][2][1:]:
+            if new_bus not in visited:
+                recursive_walk(Bus_connect, PD_elements, new_bus, visited, mode)
+    for element in Bus_connect[bus][0]:
+        if mode == 'no_transf' and PD_elements[element][0] == 'transformer':
+            continue
+        new_bus = PD_elements[element][2][0]
+        if new_bus not in visited:
+            recursive_walk(Bus_connect, PD_elements, new_bus, visited, mode)
+    return visited
+
+
+# Feeder with a transformer, a loop (l5) and a parallel line (l6):
+FEEDER = [('line.l1', 'line', 's', 'a'), ('line.l2', 'line', 'a', 'b'), ('transformer.t1', 'transformer', 'b', 'c'),
+          ('line.l3', 'line', 'c', 'd'), ('line.l4', 'line', 'a', 'e'), ('line.l5', 'line', 'e', 'b'),
+          ('line.l6', 'line', 'c', 'd'), ('capacitor.c1', 'capacitor', 'e', 'f')]
+
+
+@pytest.mark.parametrize('mode', ['all', 'no_transf'])
+def test_dfs_order(mode):
+    (Bus_connect, PD_elements) = make_circuit(FEEDER)
+    topo = Topology(Bus_connect, PD_elements)
+    for start in ['s', 'c', 'e']:
+        (order, via) = topo.dfs([topo.bus_id[start]], mode=mode)
+        assert topo.get_names(order) == recursive_walk(Bus_connect, PD_elements, start, list(), mode)
+        assert via[0] == -1 and all(p >= 0 for p in via[1:])
+
+
+def test_sec_net_walk():
+    (Bus_connect, PD_elements) = make_circuit(FEEDER)
+    topo = Topology(Bus_connect, PD_elements)
+    #Forward through the non-transformer PDs, backward through the lines only:
+    (order, via) = topo.dfs([topo.bus_id['c']], mode='sec_net')
+    assert sorted(topo.get_names(order)) == ['c', 'd']
+    (order, via) = topo.dfs([topo.bus_id['f']], mode='sec_net')
+    assert topo.get_names(order) == ['f']
+
+
+def test_long_feeder_without_recursion():
+    n = 5*sys.getrecursionlimit()
+    feeder = [('line.l'+str(i), 'line', 'b'+str(i), 'b'+str(i+1)) for i in range(n)]
+    topo = Topology(*make_circuit(feeder))
+    (order, via) = topo.dfs([topo.bus_id['b0']])
+    assert len(order) == n+1
+    dist = topo.distances(topo.bus_id['b0'], np.ones(topo.n_elements))
+    assert dist[topo.bus_id['b'+str(n)]] == n
+
+
+def test_distances_and_open_elements():
+    (Bus_connect, PD_elements) = make_circuit(FEEDER)
+    topo = Topology(Bus_connect, PD_elements)
+    length = np.arange(1, topo.n_elements+1, dtype=float)
+    dist = topo.distances(topo.bus_id['s'], length)
+    assert dist[topo.bus_id['a']] == 1
+    assert dist[topo.bus_id['f']] == 1 + length[topo.element_id['line.l2']] + 6 + 8
+    #Opening l2 and l5 leaves b (and downstream) without supply:
+    assert topo.set_open(topo.element_id['line.l2'])
+    assert not topo.set_open(topo.element_id['line.l2'])
+    topo.set_open(topo.element_id['line.l5'])
+    (order, via) = topo.dfs([topo.bus_id['s']])
+    assert sorted(topo.get_names(order)) == ['a', 'e', 'f', 's']
+    #Walk through the open elements too (e.g. the kV bases):
+    assert len(topo.dfs([topo.bus_id['s']], closed_only=False)[0]) == topo.n_buses
+    topo.set_open(topo.element_id['line.l2'], False)
+    assert 'b' in topo.get_names(topo.dfs([topo.bus_id['s']])[0])
+
+
+def test_arrays_round_trip():
+    topo = Topology(*make_circuit(FEEDER))
+    topo.build_tree(topo.bus_id['s'])
+    copy = Topology.from_arrays(topo.get_arrays())
+    assert copy.buses == topo.buses and copy.elements == topo.elements
+    for start in range(topo.n_buses):
+        assert copy.dfs([start]) == topo.dfs([start])
+    assert copy.tree_root == topo.tree_root
+    assert np.array_equal(copy.tin, topo.tin) and np.array_equal(copy.tout, topo.tout)
+
+
+def test_circuit_walks(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    assert sorted(dss.topology.buses) == sorted(dss.allBuses)
+    #Distances [km] from the substation (the switch has no length):
+    assert dss.bus_dist2subs['b1'] == pytest.approx(1)
+    assert dss.bus_dist2subs['b6'] == pytest.approx(1 + 2*1.6093)
+    #Secondary network of the transformer and kV bases:
+    assert sorted(dss.allTransfs_sec_buses['transformer.t1']) == ['b3', 'b4', 'b5']
+    assert sorted(dss.LV_buses) == ['b3', 'b4', 'b5']
+    assert dss.get_interruption_path('line.l2', ['b4'], list()) == ['b4', 'b5']
+
+
+def reference_downstream(Bus_connect, PD_elements, element):
+    #This subroutine finds the buses downstream the PD-element by walking the
+    #circuit without it (reference of the tree queries).
+
+    topo = Topology(Bus_connect, PD_elements)
+    buses2 = topo.get_ids(PD_elements[element][2][1:])
+    return sorted(topo.get_names(topo.dfs(buses2, exclude_element=topo.element_id[element])[0]))
+
+
+def test_tree_intervals():
+    topo = Topology(*make_circuit(FEEDER))
+    topo.build_tree(topo.bus_id['s'])
+    assert topo.parent[topo.bus_id['s']] == -1
+    for bus in range(topo.n_buses):
+        subtree = topo.subtree(bus)
+        assert subtree[0] == bus
+        #All the subtree buses have their parents in the subtree:
+        for child in subtree[1:]:
+            assert topo.parent[child] in subtree
+
+
+@pytest.mark.parametrize('element', [element for (element, element_type, bus1, bus2) in FEEDER])
+def test_downstream_buses(element):
+    (Bus_connect, PD_elements) = make_circuit(FEEDER)
+    topo = Topology(Bus_connect, PD_elements)
+    topo.build_tree(topo.bus_id['s'])
+    buses = sorted(topo.get_names(topo.downstream(topo.element_id[element]).tolist()))
+    assert buses == reference_downstream(Bus_connect, PD_elements, element)
+
+
+def test_downstream_radial_slice():
+    (Bus_connect, PD_elements) = make_circuit(FEEDER[:4])
+    topo = Topology(Bus_connect, PD_elements)
+    topo.build_tree(topo.bus_id['s'])
+    #Closed subtree: the tree slice, with no walk:
+    topo.dfs = None
+    assert sorted(topo.get_names(topo.downstream(topo.element_id['line.l2']).tolist())) == ['b', 'c', 'd']
+
+
+def test_protection_zones(circuit_file):
+    dss = DSS(circuit_file, engine='fake')
+    assert sorted(dss.Protect_interrupt['recloser.r1']) == ['b1', 'b2', 'b3', 'b4', 'b5', 'b6']
+    assert sorted(dss.Protect_interrupt['fuse.f1']) == ['b4', 'b5']
+    assert dss.Protect_interrupt['fuse.f2'] == ['b6']
+    #Zones of other PD elements, on demand:
+    assert sorted(dss.get_protection_zone('line.sw1')) == ['b2', 'b3', 'b4', 'b5']
+    assert sorted(dss.get_protection_zone('transformer.t1')) == ['b3', 'b4', 'b5']